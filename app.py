@@ -5,31 +5,176 @@ Production-ready version with report enhancements
 
 # -*- coding: utf-8 -*-
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, g, render_template, send_file
+from flask.json.provider import DefaultJSONProvider
+import argparse
+import base64
+import csv
+import gzip
+import hashlib
+import html
+import json
+import mimetypes
+import os
+import queue
+import re
 import sqlite3
-from datetime import datetime
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from datetime import date  # For isocalendar
 from datetime import timedelta
-from io import BytesIO
+from functools import wraps
+from io import BytesIO, StringIO
+from types import MappingProxyType
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer
-from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, PageBreak
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib import colors
+try:
+    import brotli  # optional: enables br responses and .br asset variants
+except ImportError:
+    brotli = None
+try:
+    import zstandard  # optional: enables zstd responses
+except ImportError:
+    zstandard = None
+try:
+    import orjson  # optional: faster JSON responses
+except ImportError:
+    orjson = None
+try:
+    import fcntl  # POSIX only: serialises database initialisation across worker processes
+except ImportError:
+    fcntl = None
 
 # ========== CONFIGURATION ==========
 SECRET_CODE = "CYERP"
-PORT = 5000
+PORT = int(os.environ.get('ERP_PORT', 5000))
 DEBUG = False
-
-app = Flask(__name__)
+DB_PATH = os.environ.get('ERP_DB_PATH', 'erp_observations.db')
+CRITICALITIES = ('Vital', 'Essential', 'Desirable')
+STATUSES = ('OPEN', 'RESURFACED', 'CLOSED')
+DB_POOL_SIZE = int(os.environ.get('ERP_DB_POOL_SIZE', 8))
+SERVER_THREADS = int(os.environ.get('ERP_THREADS', 128))  # request threads per server process; most hold live streams
+DB_POOL_TIMEOUT = 10          # seconds to wait for a free pooled connection
+DB_BUSY_TIMEOUT_MS = 5000     # how long a writer waits on a lock before "database is locked"
+DB_CACHE_SIZE_KIB = 16384     # page cache per connection
+DB_MMAP_SIZE = 256 * 1024 * 1024
+REPORT_MEMO_TTL = 30          # seconds a computed report is reused (e.g. View -> Download PDF)
+RESPONSE_CACHE_BACKEND = os.environ.get('ERP_RESPONSE_CACHE', 'memory')   # memory, disk or off
+RESPONSE_CACHE_PATH = os.environ.get('ERP_RESPONSE_CACHE_PATH', 'response_cache.db')
+RESPONSE_CACHE_TTL = 300      # seconds; entries are also dropped as soon as the data changes
+RESPONSE_CACHE_MAXSIZE = 256  # entries kept per process (memory) or in the cache file (disk)
+EXPORT_BATCH_SIZE = 1000      # rows fetched and written per chunk of an export
+BULK_CHUNK_SIZE = 500         # default rows per executemany() in a bulk import
+BULK_MAX_ROWS = 20000         # largest bulk import accepted in one request
+
+app = Flask(__name__, static_folder=None)  # assets are served by static_asset()
 
 # ========== DATABASE ==========
 def get_db_connection():
-    conn = sqlite3.connect('erp_observations.db')
+    """
+    Open a new tuned connection. Request handlers should use get_db(), which
+    borrows a pooled connection for the lifetime of the app context.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
     return conn
 
+class ConnectionPool:
+    """
+    Bounded pool of tuned SQLite connections shared by all request threads.
+    Idle connections are reused most-recently-released first so their page
+    cache stays warm; when all `size` connections are busy, callers wait up
+    to DB_POOL_TIMEOUT seconds.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'acquired': 0, 'reused': 0, 'waited': 0, 'in_use': 0, 'peak_in_use': 0}
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._stats['created'] < self.size:
+                    self._stats['created'] += 1
+                    create = True
+                else:
+                    self._stats['waited'] += 1
+                    create = False
+            if create:
+                try:
+                    conn = get_db_connection()
+                except Exception:
+                    with self._lock:
+                        self._stats['created'] -= 1
+                    raise
+                reused = False
+            else:
+                try:
+                    conn = self._idle.get(timeout=DB_POOL_TIMEOUT)
+                except queue.Empty:
+                    raise sqlite3.OperationalError('Timed out waiting for a database connection')
+                reused = True
+        with self._lock:
+            self._stats['acquired'] += 1
+            self._stats['reused'] += reused
+            self._stats['in_use'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+        return conn
+
+    def release(self, conn):
+        with self._lock:
+            self._stats['in_use'] -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._stats['created'] -= 1
+            return
+        self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['size'] = self.size
+        stats['idle'] = self._idle.qsize()
+        return stats
+
+db_pool = ConnectionPool(DB_POOL_SIZE)
+
+def get_db():
+    """Connection for the current app context, returned to the pool on teardown."""
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.release(conn)
+
 def init_database():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -69,922 +214,1223 @@ def init_database():
     for name, gid in modules_data:
         cursor.execute("INSERT OR IGNORE INTO modules (module_name, group_id) VALUES (?, ?)", (name, gid))
     conn.commit()
+    apply_migrations(conn)
     conn.close()
     print("Database initialized")
 
+# Versioned schema changes, tracked in PRAGMA user_version. Append new entries;
+# never edit one that has shipped.
+SEARCH_MIGRATION = 8
+
+SCHEMA_MIGRATIONS = [
+    (1, """
+        CREATE INDEX IF NOT EXISTS idx_observations_module_status_ts ON observations (module_id, status, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_observations_criticality_ts ON observations (criticality, timestamp, module_id);
+        CREATE INDEX IF NOT EXISTS idx_observations_status_closed ON observations (status, closed_on);
+        CREATE INDEX IF NOT EXISTS idx_observations_status_resurfaced ON observations (status, resurfaced_on);
+        CREATE INDEX IF NOT EXISTS idx_observations_timestamp ON observations (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_observations_report ON observations (criticality, module_id, status, timestamp, closed_on, resurfaced_on);
+    """),
+    # Daily rollup of lifecycle transitions for the chart endpoints, kept
+    # current by triggers in the same transaction as the observation write.
+    (2, """
+        CREATE TABLE IF NOT EXISTS daily_observation_stats (
+            stat_date TEXT NOT NULL,
+            module_id INTEGER NOT NULL,
+            criticality TEXT NOT NULL,
+            transition TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stat_date, module_id, criticality, transition)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS trg_daily_stats_new AFTER INSERT ON observations
+        BEGIN
+            INSERT INTO daily_observation_stats (stat_date, module_id, criticality, transition, count)
+            VALUES (date(NEW.timestamp), NEW.module_id, NEW.criticality, 'NEW', 1)
+            ON CONFLICT (stat_date, module_id, criticality, transition) DO UPDATE SET count = count + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_daily_stats_transition AFTER UPDATE OF status ON observations
+        WHEN NEW.status IN ('CLOSED', 'RESURFACED') AND NEW.status IS NOT OLD.status
+        BEGIN
+            INSERT INTO daily_observation_stats (stat_date, module_id, criticality, transition, count)
+            VALUES (date(CASE NEW.status WHEN 'CLOSED' THEN NEW.closed_on ELSE NEW.resurfaced_on END), NEW.module_id, NEW.criticality, NEW.status, 1)
+            ON CONFLICT (stat_date, module_id, criticality, transition) DO UPDATE SET count = count + 1;
+        END;
+        DELETE FROM daily_observation_stats;
+        INSERT INTO daily_observation_stats (stat_date, module_id, criticality, transition, count)
+            SELECT date(timestamp), module_id, criticality, 'NEW', COUNT(*) FROM observations GROUP BY 1, 2, 3;
+        INSERT INTO daily_observation_stats (stat_date, module_id, criticality, transition, count)
+            SELECT date(closed_on), module_id, criticality, 'CLOSED', COUNT(*) FROM observations WHERE closed_on IS NOT NULL GROUP BY 1, 2, 3;
+        INSERT INTO daily_observation_stats (stat_date, module_id, criticality, transition, count)
+            SELECT date(resurfaced_on), module_id, criticality, 'RESURFACED', COUNT(*) FROM observations WHERE resurfaced_on IS NOT NULL GROUP BY 1, 2, 3;
+    """),
+    # Keyset pagination of /api/observations/range walks each module newest-first.
+    (3, """
+        CREATE INDEX IF NOT EXISTS idx_observations_module_ts ON observations (module_id, timestamp);
+    """),
+    # Pending (OPEN + RESURFACED) counters per module, per group and in total,
+    # maintained by triggers so they always agree with observations.
+    (4, """
+        CREATE TABLE IF NOT EXISTS pending_counters (
+            scope TEXT NOT NULL,
+            scope_id INTEGER NOT NULL,
+            pending INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, scope_id)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS trg_pending_counters_group AFTER INSERT ON module_groups
+        BEGIN
+            INSERT OR IGNORE INTO pending_counters (scope, scope_id, pending) VALUES ('group', NEW.group_id, 0);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pending_counters_module AFTER INSERT ON modules
+        BEGIN
+            INSERT OR IGNORE INTO pending_counters (scope, scope_id, pending) VALUES ('module', NEW.module_id, 0);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pending_counters_insert AFTER INSERT ON observations
+        WHEN NEW.status IN ('OPEN', 'RESURFACED')
+        BEGIN
+            UPDATE pending_counters SET pending = pending + 1
+            WHERE (scope = 'module' AND scope_id = NEW.module_id)
+               OR (scope = 'group' AND scope_id = (SELECT group_id FROM modules WHERE module_id = NEW.module_id))
+               OR (scope = 'total' AND scope_id = 0);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pending_counters_update AFTER UPDATE OF status, module_id ON observations
+        BEGIN
+            UPDATE pending_counters SET pending = pending - 1
+            WHERE OLD.status IN ('OPEN', 'RESURFACED')
+              AND ((scope = 'module' AND scope_id = OLD.module_id)
+                OR (scope = 'group' AND scope_id = (SELECT group_id FROM modules WHERE module_id = OLD.module_id))
+                OR (scope = 'total' AND scope_id = 0));
+            UPDATE pending_counters SET pending = pending + 1
+            WHERE NEW.status IN ('OPEN', 'RESURFACED')
+              AND ((scope = 'module' AND scope_id = NEW.module_id)
+                OR (scope = 'group' AND scope_id = (SELECT group_id FROM modules WHERE module_id = NEW.module_id))
+                OR (scope = 'total' AND scope_id = 0));
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pending_counters_delete AFTER DELETE ON observations
+        WHEN OLD.status IN ('OPEN', 'RESURFACED')
+        BEGIN
+            UPDATE pending_counters SET pending = pending - 1
+            WHERE (scope = 'module' AND scope_id = OLD.module_id)
+               OR (scope = 'group' AND scope_id = (SELECT group_id FROM modules WHERE module_id = OLD.module_id))
+               OR (scope = 'total' AND scope_id = 0);
+        END;
+        DELETE FROM pending_counters;
+        INSERT INTO pending_counters (scope, scope_id, pending) VALUES ('total', 0, 0);
+        INSERT INTO pending_counters (scope, scope_id, pending) SELECT 'group', group_id, 0 FROM module_groups;
+        INSERT INTO pending_counters (scope, scope_id, pending) SELECT 'module', module_id, 0 FROM modules;
+        UPDATE pending_counters SET pending = (SELECT COUNT(*) FROM observations o WHERE o.status IN ('OPEN', 'RESURFACED') AND o.module_id = pending_counters.scope_id) WHERE scope = 'module';
+        UPDATE pending_counters SET pending = (SELECT COUNT(*) FROM observations o JOIN modules m ON o.module_id = m.module_id WHERE o.status IN ('OPEN', 'RESURFACED') AND m.group_id = pending_counters.scope_id) WHERE scope = 'group';
+        UPDATE pending_counters SET pending = (SELECT COUNT(*) FROM observations WHERE status IN ('OPEN', 'RESURFACED')) WHERE scope = 'total';
+    """),
+    # Small key/value store for cross-process metadata. catalogue_version and
+    # catalogue_modified change whenever module_groups or modules do.
+    (5, """
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID;
+        INSERT OR IGNORE INTO app_meta (key, value) VALUES ('catalogue_version', '1'), ('catalogue_modified', CURRENT_TIMESTAMP);
+        CREATE TRIGGER IF NOT EXISTS trg_catalogue_groups_insert AFTER INSERT ON module_groups
+        BEGIN
+            UPDATE app_meta SET value = CASE key WHEN 'catalogue_version' THEN value + 1 ELSE CURRENT_TIMESTAMP END WHERE key IN ('catalogue_version', 'catalogue_modified');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogue_groups_update AFTER UPDATE ON module_groups
+        BEGIN
+            UPDATE app_meta SET value = CASE key WHEN 'catalogue_version' THEN value + 1 ELSE CURRENT_TIMESTAMP END WHERE key IN ('catalogue_version', 'catalogue_modified');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogue_groups_delete AFTER DELETE ON module_groups
+        BEGIN
+            UPDATE app_meta SET value = CASE key WHEN 'catalogue_version' THEN value + 1 ELSE CURRENT_TIMESTAMP END WHERE key IN ('catalogue_version', 'catalogue_modified');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogue_modules_insert AFTER INSERT ON modules
+        BEGIN
+            UPDATE app_meta SET value = CASE key WHEN 'catalogue_version' THEN value + 1 ELSE CURRENT_TIMESTAMP END WHERE key IN ('catalogue_version', 'catalogue_modified');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogue_modules_update AFTER UPDATE ON modules
+        BEGIN
+            UPDATE app_meta SET value = CASE key WHEN 'catalogue_version' THEN value + 1 ELSE CURRENT_TIMESTAMP END WHERE key IN ('catalogue_version', 'catalogue_modified');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogue_modules_delete AFTER DELETE ON modules
+        BEGIN
+            UPDATE app_meta SET value = CASE key WHEN 'catalogue_version' THEN value + 1 ELSE CURRENT_TIMESTAMP END WHERE key IN ('catalogue_version', 'catalogue_modified');
+        END;
+    """),
+    # data_generation moves on every write to observations, whichever worker
+    # (or sqlite3 shell) made it; cached responses are keyed by it.
+    (6, """
+        INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_generation', '1');
+        CREATE TRIGGER IF NOT EXISTS trg_data_generation_insert AFTER INSERT ON observations
+        BEGIN
+            UPDATE app_meta SET value = value + 1 WHERE key = 'data_generation';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_data_generation_update AFTER UPDATE ON observations
+        BEGIN
+            UPDATE app_meta SET value = value + 1 WHERE key = 'data_generation';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_data_generation_delete AFTER DELETE ON observations
+        BEGIN
+            UPDATE app_meta SET value = value + 1 WHERE key = 'data_generation';
+        END;
+    """),
+    # Background PDF jobs (see REPORT JOBS); cache_key points into pdf_cache.
+    (7, """
+        CREATE TABLE IF NOT EXISTS report_jobs (
+            id TEXT PRIMARY KEY,
+            from_date TEXT NOT NULL,
+            to_date TEXT NOT NULL,
+            cache_key TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME
+        );
+        CREATE INDEX IF NOT EXISTS idx_report_jobs_cache_key ON report_jobs (cache_key, created_at);
+        CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs (status, created_at);
+    """),
+    # Full-text index over observation text for /api/observations/search. It is
+    # an external-content table: only the index is stored, the text stays in
+    # observations.
+    (SEARCH_MIGRATION, """
+        CREATE VIRTUAL TABLE IF NOT EXISTS observations_fts USING fts5(
+            observation, content='observations', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS trg_observations_fts_insert AFTER INSERT ON observations
+        BEGIN
+            INSERT INTO observations_fts (rowid, observation) VALUES (NEW.id, NEW.observation);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_observations_fts_delete AFTER DELETE ON observations
+        BEGIN
+            INSERT INTO observations_fts (observations_fts, rowid, observation) VALUES ('delete', OLD.id, OLD.observation);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_observations_fts_update AFTER UPDATE OF observation ON observations
+        BEGIN
+            INSERT INTO observations_fts (observations_fts, rowid, observation) VALUES ('delete', OLD.id, OLD.observation);
+            INSERT INTO observations_fts (rowid, observation) VALUES (NEW.id, NEW.observation);
+        END;
+        INSERT INTO observations_fts (observations_fts) VALUES ('rebuild');
+    """),
+    # MinHash signatures and LSH buckets for duplicate detection, written by
+    # index_signatures(). Existing rows are indexed by `find-duplicates`; rows
+    # whose text changes drop out of the index until it runs again.
+    (9, """
+        CREATE TABLE IF NOT EXISTS observation_signatures (
+            observation_id INTEGER PRIMARY KEY,
+            module_id INTEGER NOT NULL,
+            signature BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS observation_lsh (
+            module_id INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            observation_id INTEGER NOT NULL,
+            PRIMARY KEY (module_id, bucket, observation_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_observation_lsh_observation ON observation_lsh (observation_id);
+        CREATE TRIGGER IF NOT EXISTS trg_signatures_delete AFTER DELETE ON observations
+        BEGIN
+            DELETE FROM observation_signatures WHERE observation_id = OLD.id;
+            DELETE FROM observation_lsh WHERE observation_id = OLD.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_signatures_text AFTER UPDATE OF observation ON observations WHEN NEW.observation IS NOT OLD.observation
+        BEGIN
+            DELETE FROM observation_signatures WHERE observation_id = OLD.id;
+            DELETE FROM observation_lsh WHERE observation_id = OLD.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_signatures_module AFTER UPDATE OF module_id ON observations WHEN NEW.module_id IS NOT OLD.module_id
+        BEGIN
+            UPDATE observation_signatures SET module_id = NEW.module_id WHERE observation_id = OLD.id;
+            UPDATE observation_lsh SET module_id = NEW.module_id WHERE observation_id = OLD.id;
+        END;
+    """),
+    # Append-only lifecycle history: one row per creation and status change,
+    # written by triggers in the same transaction. pending_delta is +1 when an
+    # observation becomes pending (OPEN/RESURFACED), -1 when it stops, so the
+    # pending count as of T is SUM(pending_delta) over events before T.
+    # History before this migration is reconstructed from timestamp,
+    # closed_on and resurfaced_on (earlier close/resurface cycles are lost).
+    (10, """
+        CREATE TABLE IF NOT EXISTS observation_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            observation_id INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            criticality TEXT NOT NULL,
+            from_status TEXT,
+            to_status TEXT NOT NULL,
+            pending_delta INTEGER NOT NULL,
+            at DATETIME NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_observation ON observation_events (observation_id, id);
+        CREATE INDEX IF NOT EXISTS idx_events_report ON observation_events (criticality, at, module_id, from_status, pending_delta);
+        CREATE TRIGGER IF NOT EXISTS trg_events_insert AFTER INSERT ON observations
+        BEGIN
+            INSERT INTO observation_events (observation_id, module_id, criticality, from_status, to_status, pending_delta, at)
+            VALUES (NEW.id, NEW.module_id, NEW.criticality, NULL, NEW.status, NEW.status IN ('OPEN', 'RESURFACED'), COALESCE(NEW.timestamp, CURRENT_TIMESTAMP));
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_events_status AFTER UPDATE OF status ON observations WHEN NEW.status IS NOT OLD.status
+        BEGIN
+            INSERT INTO observation_events (observation_id, module_id, criticality, from_status, to_status, pending_delta, at)
+            VALUES (NEW.id, NEW.module_id, NEW.criticality, OLD.status, NEW.status,
+                    (NEW.status IN ('OPEN', 'RESURFACED')) - (OLD.status IN ('OPEN', 'RESURFACED')),
+                    CASE NEW.status WHEN 'CLOSED' THEN COALESCE(NEW.closed_on, CURRENT_TIMESTAMP)
+                                    WHEN 'RESURFACED' THEN COALESCE(NEW.resurfaced_on, CURRENT_TIMESTAMP)
+                                    ELSE CURRENT_TIMESTAMP END);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_events_attributes AFTER UPDATE OF module_id, criticality ON observations
+        WHEN NEW.module_id IS NOT OLD.module_id OR NEW.criticality IS NOT OLD.criticality
+        BEGIN
+            UPDATE observation_events SET module_id = NEW.module_id, criticality = NEW.criticality WHERE observation_id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_events_delete AFTER DELETE ON observations
+        BEGIN
+            DELETE FROM observation_events WHERE observation_id = OLD.id;
+        END;
+        INSERT INTO observation_events (observation_id, module_id, criticality, from_status, to_status, pending_delta, at)
+        SELECT observation_id, module_id, criticality, from_status, to_status, pending_delta, at FROM (
+            SELECT id AS observation_id, module_id, criticality, NULL AS from_status, 'OPEN' AS to_status, 1 AS pending_delta, timestamp AS at, 1 AS seq
+            FROM observations
+            UNION ALL
+            SELECT id, module_id, criticality, 'OPEN', 'CLOSED', -1,
+                   CASE WHEN status = 'RESURFACED' AND closed_on IS NOT NULL AND closed_on <= resurfaced_on THEN closed_on ELSE resurfaced_on END, 2
+            FROM observations WHERE resurfaced_on IS NOT NULL
+            UNION ALL
+            SELECT id, module_id, criticality, 'CLOSED', 'RESURFACED', 1, resurfaced_on, 3
+            FROM observations WHERE resurfaced_on IS NOT NULL
+            UNION ALL
+            SELECT id, module_id, criticality, CASE WHEN resurfaced_on IS NOT NULL THEN 'RESURFACED' ELSE 'OPEN' END, 'CLOSED', -1, COALESCE(closed_on, timestamp), 4
+            FROM observations WHERE status = 'CLOSED'
+        )
+        ORDER BY observation_id, seq;
+    """),
+    # Point-in-time pending counts: the snapshot for day D holds, per module and
+    # criticality, SUM(pending_delta) over events before D 00:00 (zero counts
+    # are not stored; snapshot_days records which days exist). Snapshots are
+    # filled in by fill_snapshots() off the request path; any event at or
+    # before a snapshot day (a backdated import, a deletion, a module or
+    # criticality change) drops the snapshots it would alter so they are
+    # recomputed on the next fill.
+    (11, """
+        CREATE TABLE IF NOT EXISTS snapshot_days (
+            snapshot_date TEXT PRIMARY KEY
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS pending_snapshots (
+            snapshot_date TEXT NOT NULL,
+            criticality TEXT NOT NULL,
+            module_id INTEGER NOT NULL,
+            pending INTEGER NOT NULL,
+            PRIMARY KEY (snapshot_date, criticality, module_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_events_at ON observation_events (at, module_id, criticality, pending_delta);
+        CREATE TRIGGER IF NOT EXISTS trg_snapshots_event_insert AFTER INSERT ON observation_events
+        BEGIN
+            DELETE FROM snapshot_days WHERE snapshot_date > NEW.at;
+            DELETE FROM pending_snapshots WHERE snapshot_date > NEW.at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_snapshots_event_update AFTER UPDATE ON observation_events
+        BEGIN
+            DELETE FROM snapshot_days WHERE snapshot_date > MIN(OLD.at, NEW.at);
+            DELETE FROM pending_snapshots WHERE snapshot_date > MIN(OLD.at, NEW.at);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_snapshots_event_delete AFTER DELETE ON observation_events
+        BEGIN
+            DELETE FROM snapshot_days WHERE snapshot_date > OLD.at;
+            DELETE FROM pending_snapshots WHERE snapshot_date > OLD.at;
+        END;
+    """),
+]
+
+def fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def apply_migrations(conn):
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, script in SCHEMA_MIGRATIONS:
+        if version <= current:
+            continue
+        if version == SEARCH_MIGRATION and not fts5_available(conn):
+            print("SQLite was built without FTS5: observation search will use LIKE")
+            script = ""
+        conn.executescript(f"BEGIN; {script} PRAGMA user_version = {version}; COMMIT;")
+        print(f"Applied schema migration {version}")
+    conn.execute("PRAGMA optimize")
+
+DAILY_STATS_QUERY = """
+    SELECT date(at), module_id, criticality, CASE WHEN from_status IS NULL THEN 'NEW' ELSE to_status END, COUNT(*)
+    FROM observation_events
+    WHERE from_status IS NULL OR to_status IN ('CLOSED', 'RESURFACED')
+    GROUP BY 1, 2, 3, 4
+"""
+
+def rebuild_daily_stats(conn):
+    """Regenerate daily_observation_stats from the observation_events history."""
+    with conn:
+        conn.execute("DELETE FROM daily_observation_stats")
+        conn.execute(f"INSERT INTO daily_observation_stats (stat_date, module_id, criticality, transition, count) {DAILY_STATS_QUERY}")
+    return conn.execute("SELECT COUNT(*) FROM daily_observation_stats").fetchone()[0]
+
+PENDING_COUNTERS_QUERY = """
+    SELECT 'module' AS scope, m.module_id AS scope_id, COUNT(o.id) AS pending
+    FROM modules m LEFT JOIN observations o ON o.module_id = m.module_id AND o.status IN ('OPEN', 'RESURFACED')
+    GROUP BY m.module_id
+    UNION ALL
+    SELECT 'group', g.group_id, COUNT(o.id)
+    FROM module_groups g LEFT JOIN modules m ON m.group_id = g.group_id
+    LEFT JOIN observations o ON o.module_id = m.module_id AND o.status IN ('OPEN', 'RESURFACED')
+    GROUP BY g.group_id
+    UNION ALL
+    SELECT 'total', 0, COUNT(*) FROM observations WHERE status IN ('OPEN', 'RESURFACED')
+"""
+
+def rebuild_pending_counters(conn):
+    """Recount pending_counters from the observations table."""
+    with conn:
+        conn.execute("DELETE FROM pending_counters")
+        conn.execute(f"INSERT INTO pending_counters (scope, scope_id, pending) {PENDING_COUNTERS_QUERY}")
+    return conn.execute("SELECT pending FROM pending_counters WHERE scope = 'total' AND scope_id = 0").fetchone()[0]
+
+# Pending per module as of :ts: the latest snapshot at or before :ts's day
+# plus the events since (all events when there is no snapshot yet). One
+# statement, so a concurrent write cannot drop the snapshot between the two.
+PENDING_AS_OF_QUERY = """
+    WITH d AS (SELECT MAX(snapshot_date) AS day FROM snapshot_days WHERE snapshot_date <= substr(:ts, 1, 10))
+    SELECT module_id, SUM(pending) FROM (
+        SELECT s.module_id, s.pending FROM d JOIN pending_snapshots s
+        ON s.snapshot_date = d.day AND s.criticality = :criticality
+        UNION ALL
+        SELECT e.module_id, e.pending_delta FROM d JOIN observation_events e
+        ON e.criticality = :criticality AND e.at >= IFNULL(d.day, '') AND e.at < :ts
+    )
+    GROUP BY module_id
+"""
+
+# Net pending change per day between two snapshot days; substr() rather than
+# date() so the day agrees with the string comparisons on `at`.
+SNAPSHOT_EXTEND_QUERY = """
+    SELECT substr(at, 1, 10) AS day, criticality, module_id, SUM(pending_delta) AS delta
+    FROM observation_events
+    WHERE at >= ? AND at < ?
+    GROUP BY 1, 2, 3
+"""
+
+def latest_snapshot_day(conn, day):
+    return conn.execute("SELECT MAX(snapshot_date) FROM snapshot_days WHERE snapshot_date <= ?", (day,)).fetchone()[0]
+
+def fill_snapshots(conn, ts):
+    """
+    Fill in the missing snapshot days up to timestamp ts's day and return it.
+    Today is the newest day ever snapshotted: its events are still arriving.
+    Writes, so it runs from snapshot_filler and the CLI, never from a request.
+    """
+    target = min(ts[:10], datetime.now(timezone.utc).date().isoformat())
+    if latest_snapshot_day(conn, target) == target:
+        return target
+    conn.execute("BEGIN IMMEDIATE")  # no backdated event can slip in between reading and writing
+    try:
+        latest = latest_snapshot_day(conn, target)
+        if latest is None:
+            first = conn.execute("SELECT MIN(at) FROM observation_events").fetchone()[0]
+            latest = min(first[:10], target) if first else target
+            conn.execute("INSERT OR REPLACE INTO snapshot_days (snapshot_date) VALUES (?)", (latest,))
+            counts = {}
+        else:
+            counts = {(r['criticality'], r['module_id']): r['pending'] for r in conn.execute(
+                "SELECT criticality, module_id, pending FROM pending_snapshots WHERE snapshot_date = ?", (latest,))}
+        deltas = {}
+        for r in conn.execute(SNAPSHOT_EXTEND_QUERY, (latest, target)):
+            deltas.setdefault(r['day'], []).append((r['criticality'], r['module_id'], r['delta']))
+        day, end = date.fromisoformat(latest), date.fromisoformat(target)
+        days, rows = [], []
+        while day < end:
+            for criticality, module_id, delta in deltas.get(day.isoformat(), ()):
+                counts[(criticality, module_id)] = counts.get((criticality, module_id), 0) + delta
+            day += timedelta(days=1)
+            days.append((day.isoformat(),))
+            rows.extend((day.isoformat(), c, m, n) for (c, m), n in counts.items() if n)
+        conn.executemany("INSERT OR REPLACE INTO pending_snapshots (snapshot_date, criticality, module_id, pending) VALUES (?, ?, ?, ?)", rows)
+        conn.executemany("INSERT OR REPLACE INTO snapshot_days (snapshot_date) VALUES (?)", days)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return target
+
+def pending_as_of(conn, ts, criticality):
+    """
+    Pending observations per module_id for one criticality as of timestamp ts.
+    Read-only: when the snapshots lag behind ts's day the extra days come from
+    the event scan, and snapshot_filler is asked to catch up.
+    """
+    if latest_snapshot_day(conn, ts[:10]) != min(ts[:10], datetime.now(timezone.utc).date().isoformat()):
+        snapshot_filler.request()
+    return dict(conn.execute(PENDING_AS_OF_QUERY, {'ts': ts, 'criticality': criticality}).fetchall())
+
+SNAPSHOT_FILL_INTERVAL = 3600  # seconds between background fills when no report asks for one
+
+class SnapshotFiller:
+    """
+    Background thread that keeps pending snapshots filled up to today, so the
+    write lock and the cost of a fill never land on a report request. It runs
+    every SNAPSHOT_FILL_INTERVAL and whenever a report finds snapshots missing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {'fills': 0, 'failures': 0}
+
+    def request(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='snapshot-filler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        conn = None
+        while True:
+            self._wake.wait(SNAPSHOT_FILL_INTERVAL)
+            self._wake.clear()
+            try:
+                if conn is None:
+                    conn = get_db_connection()
+                fill_snapshots(conn, datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+                with self._lock:
+                    self._stats['fills'] += 1
+            except sqlite3.Error as e:
+                print(f"Snapshot fill failed: {e}")
+                with self._lock:
+                    self._stats['failures'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+snapshot_filler = SnapshotFiller()
+
+def rebuild_pending_snapshots(conn):
+    """Drop every pending snapshot and recompute them up to today."""
+    with conn:
+        conn.execute("DELETE FROM pending_snapshots")
+        conn.execute("DELETE FROM snapshot_days")
+    fill_snapshots(conn, datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+    return conn.execute("SELECT COUNT(*) FROM snapshot_days").fetchone()[0]
+
+# Observations whose event history disagrees with their current row: missing
+# history, a different final status, module or criticality, or a pending sum
+# other than 0/1 matching the status.
+EVENT_DRIFT_QUERY = """
+    SELECT o.id, o.status, e.to_status, s.pending
+    FROM observations o
+    LEFT JOIN (SELECT observation_id, MAX(id) AS last_id, SUM(pending_delta) AS pending
+               FROM observation_events GROUP BY observation_id) s ON s.observation_id = o.id
+    LEFT JOIN observation_events e ON e.id = s.last_id
+    WHERE e.id IS NULL OR e.to_status IS NOT o.status OR e.module_id IS NOT o.module_id
+       OR e.criticality IS NOT o.criticality OR s.pending IS NOT (o.status IN ('OPEN', 'RESURFACED'))
+"""
+
+def check_consistency(conn):
+    """
+    Verify every derived table against the raw observations: the event
+    history, pending snapshots, pending_counters and daily_observation_stats.
+    Returns a list of (table, problem) pairs, empty when everything agrees.
+    """
+    problems = []
+    for r in conn.execute(EVENT_DRIFT_QUERY):
+        problems.append(('observation_events', f"observation {r['id']} is {r['status']}, history ends {r['to_status']} with pending sum {r['pending']}"))
+    orphans = conn.execute("SELECT COUNT(*) FROM observation_events WHERE observation_id NOT IN (SELECT id FROM observations)").fetchone()[0]
+    if orphans:
+        problems.append(('observation_events', f"{orphans} events of deleted observations"))
+
+    # Replay the events in time order and compare the running counts with each stored snapshot.
+    stored = {}
+    for r in conn.execute("SELECT snapshot_date, criticality, module_id, pending FROM pending_snapshots"):
+        stored.setdefault(r['snapshot_date'], {})[(r['criticality'], r['module_id'])] = r['pending']
+    events = conn.execute("SELECT at, criticality, module_id, pending_delta FROM observation_events ORDER BY at")
+    event = events.fetchone()
+    counts = {}
+    for (day,) in conn.execute("SELECT snapshot_date FROM snapshot_days ORDER BY snapshot_date").fetchall():
+        while event is not None and event['at'] < day:
+            key = (event['criticality'], event['module_id'])
+            counts[key] = counts.get(key, 0) + event['pending_delta']
+            event = events.fetchone()
+        expected = {key: n for key, n in counts.items() if n}
+        actual = stored.pop(day, {})
+        for key in sorted(expected.keys() | actual.keys()):
+            if expected.get(key, 0) != actual.get(key, 0):
+                problems.append(('pending_snapshots', f"{day} {key[0]} module {key[1]}: stored {actual.get(key, 0)}, history says {expected.get(key, 0)}"))
+    for day in sorted(stored):
+        problems.append(('pending_snapshots', f"{day}: counts stored for a day missing from snapshot_days"))
+
+    expected = {(scope, scope_id): pending for scope, scope_id, pending in conn.execute(PENDING_COUNTERS_QUERY)}
+    actual = {(scope, scope_id): pending for scope, scope_id, pending in conn.execute("SELECT scope, scope_id, pending FROM pending_counters")}
+    for key in sorted(expected.keys() | actual.keys()):
+        if expected.get(key) != actual.get(key):
+            problems.append(('pending_counters', f"{key[0]} {key[1]}: stored {actual.get(key)}, observations say {expected.get(key)}"))
+
+    stats = conn.execute(f"""
+        SELECT 'missing', * FROM ({DAILY_STATS_QUERY} EXCEPT SELECT stat_date, module_id, criticality, transition, count FROM daily_observation_stats)
+        UNION ALL
+        SELECT 'unexpected', * FROM (SELECT stat_date, module_id, criticality, transition, count FROM daily_observation_stats EXCEPT {DAILY_STATS_QUERY})
+    """).fetchall()
+    for kind, *row in stats:
+        problems.append(('daily_observation_stats', f"{kind} row {tuple(row)}"))
+    return problems
+
+def day_bounds(from_date, to_date):
+    """
+    Turn an inclusive YYYY-MM-DD date range into a half-open timestamp range
+    [from 00:00:00, day after to 00:00:00) so predicates stay index-friendly.
+    Raises ValueError for malformed dates.
+    """
+    if not isinstance(from_date, str) or not isinstance(to_date, str):
+        raise ValueError('Dates must be YYYY-MM-DD strings')
+    start = datetime.strptime(from_date, '%Y-%m-%d')
+    end = datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)
+    return start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')
+
 def week_label(year_week):
     """
     Convert a YYYY-WW string into a human-readable week range.
     Example: '2025-50' -> '08 Dec - 14 Dec'
     """
     year, week = map(int, year_week.split('-'))
-    start = datetime.date.fromisocalendar(year, week, 1)  # Monday
-    end = start + datetime.timedelta(days=6)
+    start = date.fromisocalendar(year, week, 1)  # Monday
+    end = start + timedelta(days=6)
     return f"{start.strftime('%d %b')} - {end.strftime('%d %b')}"
 
 # ========== HOMEPAGE ==========
+# The UI is templates/index.html plus the files under static/: the app's CSS
+# and JS and vendored Bootstrap, Bootstrap Icons and Chart.js, so the page
+# loads without internet access. asset_url() names each file after a hash of
+# its content, so browsers may cache those URLs for a year; `python app.py
+# build-assets` writes .br/.gz siblings that /assets serves when accepted.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.md')   # fonts are compressed already
+ASSET_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))   # in order of preference
+
+class AssetManifest:
+    """Content-hashed names for the files under `root`, scanned on first use (on every use in debug mode)."""
+
+    def __init__(self, root):
+        self.root = root
+        self._urls = None      # path -> fingerprinted path
+        self._entries = None   # path or fingerprinted path -> (path, digest, immutable, encodings)
+
+    def _scan(self):
+        urls, entries = {}, {}
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(tuple(suffix for _, suffix in ASSET_ENCODINGS)):
+                    continue
+                full = os.path.join(dirpath, name)
+                path = os.path.relpath(full, self.root).replace(os.sep, '/')
+                with open(full, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:12]
+                # Precompressed variants count only if they were built from the current file.
+                encodings = tuple((encoding, suffix) for encoding, suffix in ASSET_ENCODINGS
+                                  if os.path.exists(full + suffix) and os.path.getmtime(full + suffix) >= os.path.getmtime(full))
+                stem, ext = os.path.splitext(path)
+                urls[path] = f"{stem}.{digest}{ext}"
+                entries[path] = (path, digest, False, encodings)
+                entries[urls[path]] = (path, digest, True, encodings)
+        self._urls, self._entries = urls, entries
+
+    def _ensure(self):
+        if self._entries is None or app.debug:
+            self._scan()
+
+    def url(self, path):
+        self._ensure()
+        return f"/assets/{self._urls[path]}"
+
+    def lookup(self, name):
+        self._ensure()
+        return self._entries.get(name)
+
+assets = AssetManifest(STATIC_DIR)
+_shell = None
+
+def render_shell():
+    """The homepage HTML and its ETag, rendered once per process (per request in debug mode)."""
+    global _shell
+    if _shell is None or app.debug:
+        body = render_template('index.html', asset_url=assets.url).encode()
+        _shell = (body, hashlib.sha1(body).hexdigest())
+    return _shell
+
 @app.route('/')
 def homepage():
-    return '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Naval Dockyard (Mumbai) - Navyojana Monitoring Platform</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/bootstrap-icons.css">
-    <style>
-        :root { --navy-blue: #0a2463; --gold: #ffd700; }
-        body { background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%); min-height: 100vh; font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }
-        .navy-header { background: linear-gradient(135deg, var(--navy-blue) 0%, #1e3a8a 100%); border-bottom: 4px solid var(--gold); box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1); }
-        .card-platform { border-radius: 15px; border: none; box-shadow: 0 5px 15px rgba(0, 0, 0, 0.08); transition: transform 0.3s; border-top: 4px solid var(--navy-blue); }
-        .card-platform:hover { transform: translateY(-5px); box-shadow: 0 10px 25px rgba(0, 0, 0, 0.12); }
-        .btn-action { padding: 2rem 1.5rem; border-radius: 10px; font-weight: 600; font-size: 1.1rem; }
-        .btn-report { background: linear-gradient(135deg, #6c757d 0%, #495057 100%); color: white; }
-        .btn-add { background: linear-gradient(135deg, #198754 0%, #146c43 100%); color: white; }
-        .modal-navy .modal-header { background: var(--navy-blue); color: white; border-bottom: 3px solid var(--gold); }
-        .footer-navy { background: var(--navy-blue); color: white; border-top: 3px solid var(--gold); margin-top: auto; }
-        @media (max-width: 768px) { .btn-action { padding: 1.5rem 1rem; font-size: 1rem; } }
-    </style>
-<style>
-.obs-vital td {
-  background-color: #e51f1f !important;
-  color: #fff;
-}
+    body, etag = render_shell()
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/assets/<path:name>')
+def static_asset(name):
+    entry = assets.lookup(name)
+    if entry is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    path, digest, immutable, encodings = entry
+    full = os.path.join(STATIC_DIR, path)
+    encoding = next(((e, suffix) for e, suffix in encodings if request.accept_encodings[e]), None)
+    response = send_file(full + encoding[1] if encoding else full, mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                         etag=f"{digest}-{encoding[0]}" if encoding else digest, conditional=True, max_age=ASSET_MAX_AGE if immutable else None)
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    if encoding:
+        response.headers['Content-Encoding'] = encoding[0]
+    if path.endswith(ASSET_COMPRESSIBLE):
+        response.vary.add('Accept-Encoding')
+    return response
+
+def build_assets():
+    """Write .gz (and .br, with the brotli module) variants of every compressible asset; returns the bytes saved."""
+    saved = 0
+    for dirpath, _, names in os.walk(STATIC_DIR):
+        for name in names:
+            if not name.endswith(ASSET_COMPRESSIBLE):
+                continue
+            full = os.path.join(dirpath, name)
+            with open(full, 'rb') as f:
+                data = f.read()
+            variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, blob in variants:
+                if len(blob) >= len(data):
+                    continue
+                with open(full + suffix, 'wb') as f:
+                    f.write(blob)
+                saved += len(data) - len(blob)
+                print(f"{os.path.relpath(full + suffix, STATIC_DIR)}: {len(data)} -> {len(blob)} bytes")
+    return saved
+
+# ========== REPORTING ==========
+# Pending counts as of from_date and the day after to_date come from the
+# pending snapshots (pending_as_of), so they cost one snapshot lookup plus the
+# events since, however long the history is; the new/resurfaced/resolved figures are a range scan of
+# the Vital lifecycle events within the period (idx_events_report covers it).
+# Group rows and the grand total are rolled up from the module rows (SQLite
+# has no GROUP BY ROLLUP).
+REPORT_MODULE_STATS_QUERY = """
+    WITH stats AS (
+        SELECT
+            module_id,
+            SUM(CASE WHEN from_status = 'CLOSED' AND pending_delta = 1 THEN 1 ELSE 0 END) AS resurfaced,
+            SUM(CASE WHEN from_status IS NULL THEN 1 ELSE 0 END) AS new,
+            SUM(CASE WHEN pending_delta = -1 THEN 1 ELSE 0 END) AS resolved
+        FROM observation_events
+        WHERE criticality = 'Vital' AND at >= :from_ts AND at < :to_ts
+        GROUP BY module_id
+    )
+    SELECT
+        g.group_id, g.group_name, m.module_id, m.module_name,
+        IFNULL(s.resurfaced, 0) AS resurfaced,
+        IFNULL(s.new, 0) AS new,
+        IFNULL(s.resolved, 0) AS resolved
+    FROM module_groups g
+    LEFT JOIN modules m ON m.group_id = g.group_id
+    LEFT JOIN stats s ON s.module_id = m.module_id
+    ORDER BY g.group_name, g.group_id, m.module_name
+"""
 
-.obs-essential td {
-  background-color: #f2a134 !important;
-}
+REPORT_VITAL_OBSERVATIONS_QUERY = """
+    SELECT m.group_id, o.observation, o.status, o.timestamp, m.module_name
+    FROM observations o JOIN modules m ON o.module_id = m.module_id
+    WHERE o.criticality = 'Vital' AND o.status IN ('OPEN', 'RESURFACED')
+    ORDER BY o.timestamp DESC
+"""
 
-.obs-desirable td {
-  background-color: #f7e379 !important;
-}
+VITAL_IDENTIFIED_QUERY = """
+    SELECT m.module_name, o.observation, o.status, o.timestamp as date FROM observations o JOIN modules m ON o.module_id = m.module_id
+    WHERE o.criticality = 'Vital' AND o.status IN ('OPEN', 'RESURFACED') AND
+    ((o.timestamp >= :from_ts AND o.timestamp < :to_ts) OR (o.status = 'RESURFACED' AND o.resurfaced_on >= :from_ts AND o.resurfaced_on < :to_ts)) ORDER BY o.timestamp DESC LIMIT 20
+"""
 
-.obs-resurfaced td {
-  background-color: #bbdb44 !important;
-}
+VITAL_RESOLVED_QUERY = """
+    SELECT m.module_name, o.observation, o.closed_on as date FROM observations o JOIN modules m ON o.module_id = m.module_id
+    WHERE o.criticality = 'Vital' AND o.status = 'CLOSED' AND o.closed_on >= :from_ts AND o.closed_on < :to_ts ORDER BY o.closed_on DESC LIMIT 20
+"""
 
-.obs-closed td {
-  background-color: #44ce1b !important;
-  color: #fff;
-}
-</style>
-<style>
-.obs-legend {
-  display: flex;
-  gap: 10px;
-  font-size: 0.75rem;
-  align-items: center;
-}
+REPORT_COUNTERS = ('pending_from', 'resurfaced', 'new', 'resolved', 'pending_to')
 
-.obs-legend span {
-  display: flex;
-  align-items: center;
-  gap: 4px;
-}
+def build_detailed_report(conn, from_date, to_date):
+    """
+    Compute the group-wise and module-wise Vital figures for an inclusive
+    YYYY-MM-DD date range.
+    Returns the overall_data / grand_total / module_data structure served by
+    /api/reports/detailed, less the per-group areas of concern (see
+    build_vital_concerns), which the PDF brief does not use.
+    """
+    from_ts, to_ts = day_bounds(from_date, to_date)
+    pending_from = pending_as_of(conn, from_ts, 'Vital')
+    pending_to = pending_as_of(conn, to_ts, 'Vital')
+    rows = conn.execute(REPORT_MODULE_STATS_QUERY, {'from_ts': from_ts, 'to_ts': to_ts}).fetchall()
+    groups = {}
+    for r in rows:
+        grp = groups.get(r['group_id'])
+        if grp is None:
+            grp = groups[r['group_id']] = {'group_name': r['group_name'], 'totals': dict.fromkeys(REPORT_COUNTERS, 0), 'modules': []}
+        if r['module_id'] is None:
+            continue
+        stats = {'module_name': r['module_name'], 'pending_from': pending_from.get(r['module_id'], 0), 'resurfaced': r['resurfaced'], 'new': r['new'], 'resolved': r['resolved'], 'pending_to': pending_to.get(r['module_id'], 0)}
+        grp['modules'].append(stats)
+        for key in REPORT_COUNTERS:
+            grp['totals'][key] += stats[key]
+    overall_data = []
+    module_data = []
+    grand = {'pending_from': 0, 'resurfaced': 0, 'new_obs': 0, 'resolved': 0, 'pending_to': 0}
+    for gid, grp in groups.items():
+        totals = grp['totals']
+        overall_data.append({'group': grp['group_name'], **totals})
+        module_data.append({'group_id': gid, 'group_name': grp['group_name'], 'modules': grp['modules']})
+        grand['pending_from'] += totals['pending_from']; grand['resurfaced'] += totals['resurfaced']; grand['new_obs'] += totals['new']; grand['resolved'] += totals['resolved']; grand['pending_to'] += totals['pending_to']
+    return {'overall_data': overall_data, 'grand_total': grand, 'module_data': module_data}
+
+def build_vital_concerns(conn):
+    """Every pending Vital observation by group_id, newest first: the areas of concern listed by /api/reports/detailed."""
+    concerns = {}
+    for o in conn.execute(REPORT_VITAL_OBSERVATIONS_QUERY):
+        concerns.setdefault(o['group_id'], []).append({'observation': o['observation'], 'status': o['status'], 'timestamp': o['timestamp'], 'module_name': o['module_name']})
+    return concerns
+
+def build_vital_details(conn, from_date, to_date):
+    """Latest Vital observations identified and resolved within the date range."""
+    from_ts, to_ts = day_bounds(from_date, to_date)
+    params = {'from_ts': from_ts, 'to_ts': to_ts}
+    # Identified: New or Resurfaced Vitals in period, OPEN/RESURFACED
+    identified = conn.execute(VITAL_IDENTIFIED_QUERY, params).fetchall()
+    # Resolved: Vitals closed in period
+    resolved = conn.execute(VITAL_RESOLVED_QUERY, params).fetchall()
+    return {'identified': [dict(i) for i in identified], 'resolved': [dict(r) for r in resolved]}
 
-.legend-box {
-  width: 12px;
-  height: 12px;
-  border-radius: 3px;
-  display: inline-block;
-}
+# ========== REPORT SERVICE ==========
+class TTLMemo:
+    """
+    Thread-safe memo of computed values that expire after `ttl` seconds.
+    clear() bumps a generation so a computation that was already running when
+    the data changed does not store its (stale) result.
+    """
 
-.legend-vital { background-color: #e51f1f; }
-.legend-essential { background-color: #f2a134; }
-.legend-desirable { background-color: #f7e379; }
-.legend-resurfaced { background-color: #bbdb44; }
-.legend-closed { background-color: #44ce1b; }
-</style>
-
-<style>
-.chart-container {
-  position: relative;
-  height: 220px;       /* desktop */
-}
+    def __init__(self, ttl, maxsize=64):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            generation = self._generation
+        value = compute()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+report_memo = TTLMemo(REPORT_MEMO_TTL)
+
+# The report service is shared by the JSON endpoints and the PDF brief.
+# Results are shared between requests: treat them as read-only.
+def get_detailed_report(from_date, to_date):
+    return report_memo.get_or_compute(('detailed', from_date, to_date, data_generation()), lambda: build_detailed_report(get_db(), from_date, to_date))
+
+def get_vital_concerns():
+    return report_memo.get_or_compute(('vital-concerns', data_generation()), lambda: build_vital_concerns(get_db()))
+
+def with_vital_concerns(report, concerns):
+    """The detailed report as served by the JSON endpoint: each group with its vital_observations."""
+    module_data = [{**grp, 'vital_observations': concerns.get(grp['group_id'], [])} for grp in report['module_data']]
+    return {**report, 'module_data': module_data}
+
+def get_vital_details(from_date, to_date):
+    return report_memo.get_or_compute(('vital-details', from_date, to_date, data_generation()), lambda: build_vital_details(get_db(), from_date, to_date))
+
+def observations_changed():
+    """
+    Call after committing any write to the observations table. Other workers
+    see the change through data_generation; this just frees memory early.
+    """
+    report_memo.clear()
+    response_cache.clear()
+    pdf_cache.memory.clear()
+    live_feed.wake()
 
-@media (max-width: 768px) {
-  .chart-container {
-    height: 180px;     /* mobile */
-  }
-}
-</style>
-
-</head>
-<body class="d-flex flex-column min-vh-100">
-    <header class="navy-header text-white py-4">
-        <div class="container">
-            <div class="row align-items-center">
-                <div class="col-md-8">
-                    <h1 class="display-5 fw-bold mb-2"><i class="bi bi-building"></i> Naval Dockyard (Mumbai)</h1>
-                    <p class="lead mb-0 opacity-90"><i class="bi bi-speedometer2"></i> Navyojana Monitoring Platform</p>
-                </div>
-                <div class="col-md-4 text-md-end">
-                    <div class="badge bg-warning text-dark p-2"><i class="bi bi-shield-check"></i> Secure Portal</div>
-                </div>
-            </div>
-        </div>
-    </header>
-    <main class="flex-grow-1 py-5">
-        <div class="container">
-            <div class="card-platform mb-5 p-4">
-                <div class="row align-items-center">
-                    <div class="col-md-8">
-                        <h3 class="mb-2"><i class="bi bi-clipboard-data text-primary"></i> ERP Monitoring Dashboard</h3>
-                        <p class="text-muted mb-0">Monitor observations across all ERP modules. Add new observations or generate reports.</p>
-                    </div>
-                    <div class="col-md-4 text-md-end">
-                        <span class="text-success fw-bold"><i class="bi bi-check-circle-fill"></i> Status: <span class="badge bg-success">Operational</span></span>
-                    </div>
-                </div>
-            </div>
-<div class="row mt-3">
-  <div class="col-md-6 col-12 mb-3">
-    <div class="card shadow-sm h-100">
-      <div class="card-body">
-        <h6 class="card-title text-center mb-3">Observations Trend (Criticality-wise)</h6>
-        <div class="chart-container">
-          <canvas id="criticalityTrendChart"></canvas>
-        </div>
-      </div>
-    </div>
-  </div>
-
-  <div class="col-md-6 col-12 mb-3">
-    <div class="card shadow-sm h-100">
-      <div class="card-body">
-        <h6 class="card-title text-center mb-3">Module Vital Trend</h6>
-        <div class="chart-container">
-          <canvas id="moduleVitalTrendChart"></canvas>
-        </div>
-      </div>
-    </div>
-  </div>
-</div>
-
-            <div class="row g-4 justify-content-center mb-5">
-                <div class="col-xl-4 col-lg-5 col-md-6">
-                    <div class="card-platform h-100">
-                        <div class="card-body text-center p-4">
-                            <div class="mb-3">
-                                <div class="bg-light rounded-circle d-inline-flex p-3 mb-3"><i class="bi bi-graph-up-arrow text-muted fs-1"></i></div>
-                                <h4 class="card-title mb-3">Generate Reports</h4>
-                                <p class="card-text text-muted mb-4">Access comprehensive analytics and reports.</p>
-                                <button class="btn btn-report btn-action w-100" data-bs-toggle="modal" data-bs-target="#reportModal"><i class="bi bi-graph-up me-2"></i> View Reports</button>
-				<button class="btn btn-info btn-action w-100 mt-2" data-bs-toggle="modal" data-bs-target="#viewObservationsModal"><i class="bi bi-list-check me-2"></i> View Observations</button>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-                <div class="col-xl-4 col-lg-5 col-md-6">
-                    <div class="card-platform h-100">
-                        <div class="card-body text-center p-4">
-                            <div class="mb-3">
-                                <div class="bg-success bg-opacity-10 rounded-circle d-inline-flex p-3 mb-3"><i class="bi bi-plus-circle text-success fs-1"></i></div>
-                                <h4 class="card-title mb-3">Add Observation</h4>
-                                <p class="card-text text-muted mb-4">Submit new observations for any ERP module.</p>
-                                <button class="btn btn-add btn-action w-100" data-bs-toggle="modal" data-bs-target="#observationModal"><i class="bi bi-plus-circle me-2"></i> Add New Observation</button>
-                                <button class="btn btn-warning btn-action w-100 mt-2" data-bs-toggle="modal" data-bs-target="#resurfaceModal"><i class="bi bi-arrow-repeat me-2"></i> Mark Resurfaced</button>
-                                <button class="btn btn-danger btn-action w-100 mt-2" data-bs-toggle="modal" data-bs-target="#closeModal"><i class="bi bi-x-circle me-2"></i> Close Observations</button>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            <div class="card-platform p-4 mb-5">
-                <div class="row text-center">
-                    <div class="col-md-4 border-end py-3">
-                        <h3 class="mb-1" id="totalObservations">0</h3>
-                        <p class="text-muted mb-0">Total Pending Observations</p>
-                    </div>
-                    <div class="col-md-4 border-end py-3">
-                        <h3 class="mb-1">4</h3>
-                        <p class="text-muted mb-0">Module Groups</p>
-                    </div>
-                    <div class="col-md-4 py-3">
-                        <h3 class="mb-1">25</h3>
-                        <p class="text-muted mb-0">ERP Modules</p>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </main>
-    <!-- Observation Modal -->
-    <div class="modal fade modal-navy" id="observationModal" tabindex="-1">
-        <div class="modal-dialog modal-lg">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="bi bi-clipboard-plus me-2"></i>Add New Observation</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body p-4">
-                    <form id="observationForm">
-                        <div class="mb-4">
-                            <label class="form-label fw-bold"><i class="bi bi-chat-left-text me-1"></i>Observation Details <span class="text-danger">*</span></label>
-                            <textarea class="form-control" name="observation" rows="4" required></textarea>
-                        </div>
-                        <div class="mb-4">
-                            <label class="form-label fw-bold"><i class="bi bi-grid-3x3-gap me-1"></i>ERP Module <span class="text-danger">*</span></label>
-                            <select class="form-select" name="module_id" required>
-                                <option value="">Select a module</option>
-                                <optgroup label="HR Modules">
-                                    <option value="1">Salary & Wages Module (SWM)</option>
-                                    <option value="2">Time Keeping System (TKS)</option>
-                                    <option value="3">Personnel Information Management System (PIMS)</option>
-                                </optgroup>
-                                <optgroup label="Refit Modules">
-                                    <option value="4">Refit Planning Process (RPP)</option>
-                                    <option value="5">Defect List (DL)</option>
-                                    <option value="6">Shop Floor Management Module (SFMM)</option>
-                                    <option value="7">Operational Defect Management (OPDEF)</option>
-                                    <option value="8">Operational Assistance (OPRA)</option>
-                                    <option value="9">Refit Monitoring Module (RMM)</option>
-                                    <option value="10">Operational Repair Monitoring (ORM)</option>
-                                    <option value="11">Quality Control Management System (QCMS)</option>
-                                    <option value="12">Manpower Booking (MPB)</option>
-                                    <option value="13">Dry Docking Module (DRY DOCK)</option>
-                                    <option value="14">Berthing Module (BERTHING)</option>
-                                </optgroup>
-                                <optgroup label="Commercial Modules">
-                                    <option value="15">Financial Management Module (FMS), Budget Management Module (BMS), Local Procurement (LP) Module</option>
-                                    <option value="16">Vendor Management System (VMS)</option>
-                                </optgroup>
-                                <optgroup label="Services Modules">
-                                    <option value="17">Yard Utility Services (YUS)</option>
-                                    <option value="18">Yard Security Module (YSM)</option>
-                                    <option value="19">Quality Assurance Module (QAM)</option>
-                                    <option value="20">Management Information Systems (MIS)</option>
-                                    <option value="21">E-Seva</option>
-                                    <option value="22">E-Samagri</option>
-                                    <option value="23">Medical & Health Management System (MHMS)</option>
-                                    <option value="24">Coster</option>
-                                    <option value="25">Yard Asset Management (YAMS)</option>
-                                </optgroup>
-                            </select>
-                        </div>
-                        <div class="mb-4">
-                            <label class="form-label fw-bold"><i class="bi bi-exclamation-triangle me-1"></i>Criticality Level <span class="text-danger">*</span></label>
-                            <select class="form-select" name="criticality" required>
-                                <option value="">Select criticality</option>
-                                <option value="Vital">Vital</option>
-                                <option value="Essential">Essential</option>
-                                <option value="Desirable">Desirable</option>
-                            </select>
-                        </div>
-                        <div class="mb-4">
-                            <label class="form-label fw-bold"><i class="bi bi-key me-1"></i>Authorization Code <span class="text-danger">*</span></label>
-                            <input type="password" class="form-control" name="secret_code" required>
-                            <small class="form-text text-muted"><i class="bi bi-info-circle"></i> Enter "CYERP" to submit</small>
-                        </div>
-                        <div class="alert alert-danger d-none" id="errorAlert"></div>
-                        <div class="alert alert-success d-none" id="successAlert"><i class="bi bi-check-circle me-2"></i>Observation saved successfully!</div>
-                    </form>
-                </div>
-                <div class="modal-footer">
-                    <button type="button" class="btn btn-secondary" data-bs-dismiss="modal"><i class="bi bi-x-circle me-1"></i>Cancel</button>
-                    <button type="button" class="btn btn-primary" onclick="saveObservation()"><i class="bi bi-cloud-upload me-1"></i>Save Observation</button>
-                </div>
-            </div>
-        </div>
-    </div>
-    <!-- Resurface Modal -->
-    <div class="modal fade modal-navy" id="resurfaceModal" tabindex="-1">
-        <div class="modal-dialog modal-lg">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="bi bi-arrow-repeat me-2"></i>Resurface Observations</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body p-4">
-                    <div class="row mb-3">
-                        <div class="col-md-6">
-                            <label class="form-label fw-bold">Module Group</label>
-                            <select class="form-select" id="resurfaceGroup"><option value="">Select Group</option></select>
-                        </div>
-                        <div class="col-md-6">
-                            <label class="form-label fw-bold">Module</label>
-                            <select class="form-select" id="resurfaceModule"><option value="">Select Module</option></select>
-                        </div>
-                    </div>
-                    <div class="card mb-3">
-                        <div class="card-header bg-warning bg-opacity-10"><i class="bi bi-exclamation-triangle text-warning me-2"></i>Select CLOSED observations to mark as RESURFACED</div>
-                        <div class="card-body" id="resurfaceList" style="max-height: 300px; overflow-y: auto;"></div>
-                    </div>
-                    <button class="btn btn-warning mt-3" onclick="submitResurface()"><i class="bi bi-arrow-repeat me-2"></i> Mark as Resurfaced</button>
-                </div>
-            </div>
-        </div>
-    </div>
-    <!-- Close Modal -->
-    <div class="modal fade modal-navy" id="closeModal" tabindex="-1">
-        <div class="modal-dialog modal-lg">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="bi bi-x-circle me-2"></i>Close Observations</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body p-4">
-                    <div class="row mb-3">
-                        <div class="col-md-6">
-                            <label class="form-label fw-bold">Module Group</label>
-                            <select class="form-select" id="closeGroup"><option value="">Select Group</option></select>
-                        </div>
-                        <div class="col-md-6">
-                            <label class="form-label fw-bold">Module</label>
-                            <select class="form-select" id="closeModule"><option value="">Select Module</option></select>
-                        </div>
-                    </div>
-                    <div class="card mb-3">
-                        <div class="card-header bg-danger bg-opacity-10"><i class="bi bi-exclamation-triangle text-danger me-2"></i>Select OPEN/RESURFACED observations to CLOSE</div>
-                        <div class="card-body" id="closeList" style="max-height: 300px; overflow-y: auto;"></div>
-                    </div>
-                    <button class="btn btn-danger mt-3" onclick="submitClose()"><i class="bi bi-check-circle me-2"></i> Mark Closed</button>
-                </div>
-            </div>
-        </div>
-    </div>
-    <!-- Report Modal -->
-    <div class="modal fade modal-navy" id="reportModal" tabindex="-1">
-        <div class="modal-dialog modal-xl">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="bi bi-graph-up"></i> Generate Report</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body">
-                    <div class="row mb-3">
-                        <div class="col-md-6">
-                            <label class="form-label fw-bold">From Date</label>
-                            <input type="date" class="form-control" id="reportFromDate">
-                        </div>
-                        <div class="col-md-6">
-                            <label class="form-label fw-bold">To Date</label>
-                            <input type="date" class="form-control" id="reportToDate">
-                        </div>
-                    </div>
-                    <div class="text-end">
-                        <button class="btn btn-primary" onclick="generateReport()">Generate</button>
-                    </div>
-                    <hr>
-                    <div id="reportResult" class="d-none">
-                        <h5 class="fw-bold mt-3">OVERALL PENDING VITAL OBSERVATIONS</h5>
-                        <table class="table table-bordered mt-3">
-                            <thead class="table-light">
-                                <tr>
-                                    <th>GROUP</th>
-                                    <th id="pendingFromHeader">Pending (From)</th>
-                                    <th>Resurfaced</th>
-                                    <th>New</th>
-                                    <th>Resolved</th>
-                                    <th id="pendingToHeader">Pending (To)</th>
-                                </tr>
-                            </thead>
-                            <tbody id="reportTableBody"></tbody>
-                            <tfoot class="fw-bold" id="reportGrandTotal"></tfoot>
-                        </table>
-                        <div id="moduleGroupTables"></div>
-                        <div id="additionalSections"></div>
-                        <div class="text-end mt-4">
-                            <button class="btn btn-secondary" onclick="generatePDF()">Generate PDF</button>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-	<!-- View Observations Modal -->
-	<div class="modal fade" id="viewObservationsModal" tabindex="-1">
-	  <div class="modal-dialog modal-xl modal-dialog-scrollable">
-	    <div class="modal-content">
-	      <div class="modal-header d-flex justify-content-between align-items-center">
-  <div>
-    <h5 class="modal-title mb-1">View Observations</h5>
-    <div class="obs-legend">
-      <span><i class="legend-box legend-vital"></i> Vital</span>
-      <span><i class="legend-box legend-essential"></i> Essential</span>
-      <span><i class="legend-box legend-desirable"></i> Desirable</span>
-      <span><i class="legend-box legend-resurfaced"></i> Resurfaced</span>
-      <span><i class="legend-box legend-closed"></i> Closed</span>
-    </div>
-  </div>
-  <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-</div>
-	      <div class="modal-body">
-	        <!-- Date Range -->
-	        <div class="row mb-3">
-        	  <div class="col-md-4">
-	            <label class="form-label">From Date</label>
-	            <input type="date" class="form-control" id="obsFromDate">
-	          </div>
-        	  <div class="col-md-4">
-	            <label class="form-label">To Date</label>
-        	    <input type="date" class="form-control" id="obsToDate">
-	          </div>
-        	  <div class="col-md-4 d-flex align-items-end">
-	            <button class="btn btn-primary w-100" onclick="loadObservations()">
-	              Fetch Observations
-	            </button>
-	          </div>
-	        </div>
-	        <!-- Results Table -->
-	        <div class="table-responsive d-none" id="observationsTableContainer">
-	          <table class="table table-bordered table-hover align-middle">
-	            <thead class="table-dark">
-	              <tr>
-	                <th>Ser</th>
-        	        <th>UID</th>
-	                <th>Observation</th>
-	                <th class="sortable" data-key="module">Module</th>
-	                <th class="sortable" data-key="group">Group</th>
-	                <th class="sortable" data-key="criticality">Criticality</th>
-	              </tr>
-	            </thead>
-	            <tbody id="observationsTableBody">
-	              <!-- Rows will be injected -->
-	            </tbody>
-	          </table>
-	        </div>
-	      </div>
-	    </div>
-	  </div>
-	</div>
-    <footer class="footer-navy py-4 mt-auto">
-        <div class="container">
-            <div class="row align-items-center">
-		    <div class="col-md-8">
-		        <h5 class="mb-2"><i class="bi bi-cpu"></i> ERP Monitoring Platform</h5>
-		        <p class="mb-1 opacity-75">
-		            Developed by Lt Cdr Mehta, JMMIS, ND (Mbi)<br>
-		            <small>Naval Dockyard, Mumbai</small>
-		        </p>
-		    </div>
-		    <div class="col-md-4 text-md-end">
-			    <div class="text-white-50 small">
-			        <div>
-			            <a href="/static/docs/releaseNotes.pdf" target="_blank" class="text-warning text-decoration-none fw-semibold d-block">
-			                <i class="bi bi-file-earmark-pdf"></i> Latest Release Notes&nbsp;&nbsp;&nbsp;&nbsp;
-			            </a>
-			        </div>
-			        <div>
-			            <i class="bi bi-clock"></i> <span id="currentTime"></span>
-			        </div>
-			    </div>
-			</div>
-		</div>
-        </div>
-    </footer>
-	<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    <script>
-        function updateTime() { document.getElementById('currentTime').textContent = new Date().toLocaleString('en-IN'); }
-        updateTime(); setInterval(updateTime, 60000);
-        async function saveObservation() {
-            const form = document.getElementById('observationForm');
-            const errorAlert = document.getElementById('errorAlert');
-            const successAlert = document.getElementById('successAlert');
-            errorAlert.classList.add('d-none'); successAlert.classList.add('d-none');
-            if (!form.checkValidity()) { form.reportValidity(); return; }
-            const data = { observation: form.observation.value, module_id: form.module_id.value, criticality: form.criticality.value, secret_code: form.secret_code.value };
-            if (data.secret_code !== 'CYERP') { errorAlert.textContent = 'Invalid code. Enter CYERP.'; errorAlert.classList.remove('d-none'); return; }
-            try {
-                const response = await fetch('/save', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) });
-                const result = await response.json();
-                if (result.success) {
-                    successAlert.classList.remove('d-none'); form.reset(); updateTotalCount(); setTimeout(() => bootstrap.Modal.getInstance(document.getElementById('observationModal')).hide(), 2000);
-                } else { errorAlert.textContent = 'Error: ' + result.error; errorAlert.classList.remove('d-none'); }
-            } catch (error) { errorAlert.textContent = 'Server error.'; errorAlert.classList.remove('d-none'); }
-        }
-        async function updateTotalCount() {
-            try {
-                const response = await fetch('/api/observations/pending/count');
-                const data = await response.json();
-                if (data.success) document.getElementById('totalObservations').textContent = data.count;
-            } catch (error) { console.log('Count error:', error); }
-        }
-        async function loadInitialCount() { await updateTotalCount(); }
-        loadInitialCount();
-        document.getElementById('observationModal').addEventListener('show.bs.modal', () => { document.getElementById('errorAlert').classList.add('d-none'); document.getElementById('successAlert').classList.add('d-none'); });
-    </script>
-    <script>
-        async function generateReport() {
-            const fromDate = document.getElementById('reportFromDate').value;
-            const toDate = document.getElementById('reportToDate').value;
-            if (!fromDate || !toDate) { alert("Select both dates"); return; }
-            document.getElementById('pendingFromHeader').textContent = `Pending (${fromDate})`;
-            document.getElementById('pendingToHeader').textContent = `Pending (${toDate})`;
-            try {
-                const detailedResponse = await fetch('/api/reports/detailed', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ from_date: fromDate, to_date: toDate }) });
-                const detailedResult = await detailedResponse.json();
-                if (!detailedResult.success) { alert("Report error: " + (detailedResult.error || 'Unknown')); return; }
-                const vitalResponse = await fetch('/api/reports/vital-details', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ from_date: fromDate, to_date: toDate }) });
-                const vitalResult = await vitalResponse.json();
-                if (!vitalResult.success) { alert("Vital details error: " + (vitalResult.error || 'Unknown')); return; }
-                // Overall table
-                const tbody = document.getElementById('reportTableBody');
-                const tfoot = document.getElementById('reportGrandTotal');
-                const moduleTablesDiv = document.getElementById('moduleGroupTables');
-                const additionalSections = document.getElementById('additionalSections');
-                tbody.innerHTML = ''; tfoot.innerHTML = ''; moduleTablesDiv.innerHTML = ''; additionalSections.innerHTML = '';
-                detailedResult.overall_data.forEach(row => {
-                    tbody.innerHTML += `<tr><td>${row.group}</td><td>${row.pending_from}</td><td>${row.resurfaced}</td><td>${row.new}</td><td>${row.resolved}</td><td>${row.pending_to}</td></tr>`;
-                });
-                const gt = detailedResult.grand_total;
-                tfoot.innerHTML = `<tr><td>GRAND TOTAL</td><td>${gt.pending_from}</td><td>${gt.resurfaced}</td><td>${gt.new_obs}</td><td>${gt.resolved}</td><td>${gt.pending_to}</td></tr>`;
-                // Module group tables
-                detailedResult.module_data.forEach(groupData => {
-                    let groupHtml = `<div class="mt-5"><h5 class="fw-bold">${groupData.group_name} - Pending Vital Observations</h5><table class="table table-bordered mt-3"><thead class="table-light"><tr><th>MODULE</th><th>Pending (${fromDate})</th><th>Resurfaced</th><th>New</th><th>Resolved</th><th>Pending (${toDate})</th></tr></thead><tbody>`;
-                    groupData.modules.forEach(module => {
-                        groupHtml += `<tr><td>${module.module_name}</td><td>${module.pending_from}</td><td>${module.resurfaced}</td><td>${module.new}</td><td>${module.resolved}</td><td>${module.pending_to}</td></tr>`;
-                    });
-                    groupHtml += `</tbody></table><h6 class="fw-bold mt-3">AREAS OF CONCERN:</h6><ul class="list-group list-group-flush">`;
-                    groupData.vital_observations.forEach(obs => {
-                        const date = new Date(obs.timestamp).toLocaleDateString('en-IN');
-                        groupHtml += `<li class="list-group-item"><strong>${obs.module_name}:</strong> ${obs.observation}<br><small class="text-muted">Date: ${date} | Status: ${obs.status}</small></li>`;
-                    });
-                    if (groupData.vital_observations.length === 0) groupHtml += '<li class="list-group-item text-muted">No Vital observations found.</li>';
-                    groupHtml += '</ul></div>';
-                    moduleTablesDiv.innerHTML += groupHtml;
-                });
-                // New sections
-                additionalSections.innerHTML = `
-                    <div class="mt-5">
-                        <h5 class="fw-bold">MODULES UNDER DEVELOPMENT</h5>
-                        <ul class="list-group list-group-flush">
-                            <li class="list-group-item">Coster</li>
-                            <li class="list-group-item">E-Samagri</li>
-                            <li class="list-group-item">MHMS</li>
-                            <li class="list-group-item">YAMS</li>
-                        </ul>
-                    </div>
-                    <div class="mt-5">
-                        <h5 class="fw-bold">DETAILS OF VITAL OBSERVATIONS IDENTIFIED IN THIS PERIOD</h5>
-                        <table class="table table-bordered mt-3">
-                            <thead class="table-light">
-                                <tr><th>IDENTIFIED</th><th>RESOLVED</th></tr>
-                            </thead>
-                            <tbody>
-                                <tr>
-                                    <td><ul class="list-group list-group-flush mb-0">`;
-                vitalResult.identified.forEach(obs => {
-                    const date = new Date(obs.date).toLocaleDateString('en-IN');
-                    additionalSections.innerHTML += `<li class="list-group-item"><strong>${obs.module_name}:</strong> ${obs.observation} <small class="text-muted">(Date: ${date}, Status: ${obs.status})</small></li>`;
-                });
-                if (vitalResult.identified.length === 0) additionalSections.innerHTML += '<li class="list-group-item">None identified</li>';
-                additionalSections.innerHTML += `</ul></td><td><ul class="list-group list-group-flush mb-0">`;
-                vitalResult.resolved.forEach(obs => {
-                    const date = new Date(obs.date).toLocaleDateString('en-IN');
-                    additionalSections.innerHTML += `<li class="list-group-item"><strong>${obs.module_name}:</strong> ${obs.observation} <small class="text-muted">(Date: ${date})</small></li>`;
-                });
-                if (vitalResult.resolved.length === 0) additionalSections.innerHTML += '<li class="list-group-item">None resolved</li>';
-                additionalSections.innerHTML += '</ul></td></tr></tbody></table></div>';
-                document.getElementById('reportResult').classList.remove('d-none');
-            } catch (error) { alert('Generation failed: ' + error); }
+def parse_report_range(data):
+    """
+    Validate the from_date/to_date of a report request.
+    Returns (from_date, to_date, None) or (None, None, error response).
+    """
+    from_date = (data or {}).get('from_date')
+    to_date = (data or {}).get('to_date')
+    if not from_date or not to_date:
+        return None, None, (jsonify({'success': False, 'error': 'Dates required'}), 400)
+    try:
+        day_bounds(from_date, to_date)
+    except ValueError:
+        return None, None, (jsonify({'success': False, 'error': 'Invalid date range'}), 400)
+    return from_date, to_date, None
+
+# ========== RESPONSE CACHE ==========
+# Read-heavy JSON endpoints cache their response body under
+# (endpoint, normalised parameters, data generation). The generation comes
+# from app_meta, so a write in any worker makes every older entry unreachable.
+DATA_GENERATION_QUERY = "SELECT key, value FROM app_meta WHERE key IN ('data_generation', 'catalogue_version') ORDER BY key"
+
+def data_generation():
+    """(catalogue_version, data_generation) as of now, read once per request."""
+    if 'data_generation' not in g:
+        g.data_generation = tuple(int(r['value']) for r in get_db().execute(DATA_GENERATION_QUERY))
+    return g.data_generation
+
+class MemoryCache:
+    """Per-process LRU of response bodies with a TTL."""
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, body):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+class DiskCache:
+    """
+    Response bodies in a small SQLite file shared by all workers on the host.
+    Entries of older generations are never read again and age out by TTL or
+    by the size cap.
+    """
+
+    def __init__(self, path, ttl, maxsize):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._conn().execute("CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, expires REAL NOT NULL, body BLOB NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT body FROM response_cache WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, body):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO response_cache (key, expires, body) VALUES (?, ?, ?)", (key, time.time() + self.ttl, body))
+        conn.execute("DELETE FROM response_cache WHERE expires <= ? OR key IN (SELECT key FROM response_cache ORDER BY expires DESC LIMIT -1 OFFSET ?)", (time.time(), self.maxsize))
+
+    def clear(self):
+        pass  # keyed by generation: other workers' entries stay valid until the data moves
+
+    def size(self):
+        return self._conn().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+class ResponseCache:
+    """Wraps a backend with hit/miss counters per endpoint."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, endpoint, outcome):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0})
+            stats[outcome] += 1
+
+    def get(self, endpoint, key):
+        body = self.backend.get(key) if self.backend else None
+        self._count(endpoint, 'hits' if body is not None else 'misses')
+        return body
+
+    def set(self, key, body):
+        if self.backend:
+            self.backend.set(key, body)
+
+    def clear(self):
+        if self.backend:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: dict(stats) for name, stats in self._stats.items()}
+        hits = sum(s['hits'] for s in endpoints.values())
+        misses = sum(s['misses'] for s in endpoints.values())
+        return {
+            'backend': RESPONSE_CACHE_BACKEND if self.backend else 'off',
+            'entries': self.backend.size() if self.backend else 0,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+            'endpoints': endpoints,
         }
-    </script>
-	<script>
-async function loadObservations() {
-  const fromDate = document.getElementById('obsFromDate').value;
-  const toDate = document.getElementById('obsToDate').value;
-
-  if (!fromDate || !toDate) {
-    alert('Please select both From and To dates');
-    return;
-  }
-
-  const response = await fetch('/api/observations/range', {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({
-      from_date: fromDate,
-      to_date: toDate
-    })
-  });
-
-  const result = await response.json();
-
-  if (!result.success) {
-    alert('Failed to fetch observations');
-    return;
-  }
-
-  const tbody = document.getElementById('observationsTableBody');
-  const container = document.getElementById('observationsTableContainer');
-
-  tbody.innerHTML = '';
-
-  const groupColorMap = {};
-let colorIndex = 0;
-
-result.data.forEach((row, index) => {
-  let rowClass = '';
-
-  if (row.status === 'CLOSED') {
-    rowClass = 'obs-closed';
-  } else if (row.status === 'RESURFACED') {
-    rowClass = 'obs-resurfaced';
-  } else if (row.criticality === 'Vital') {
-    rowClass = 'obs-vital';
-  } else if (row.criticality === 'Essential') {
-    rowClass = 'obs-essential';
-  } else if (row.criticality === 'Desirable') {
-    rowClass = 'obs-desirable';
-  }
-
-  tbody.innerHTML += `
-    <tr class="${rowClass}">
-      <td>${index + 1}</td>
-      <td>${row.id}</td>
-      <td>${row.observation}</td>
-      <td>${row.module_name}</td>
-      <td>${row.group_name}</td>
-      <td>${row.criticality}</td>
-    </tr>
-  `;
-});
-
-  container.classList.remove('d-none');
-}
-</script>
-<script>
-let currentSortKey = null;
-let currentSortAsc = true;
-
-document.addEventListener('click', function (e) {
-  if (!e.target.classList.contains('sortable')) return;
-
-  const key = e.target.dataset.key;
-  const tbody = document.getElementById('observationsTableBody');
-  const rows = Array.from(tbody.querySelectorAll('tr'));
-
-  // Toggle sort direction
-  if (currentSortKey === key) {
-    currentSortAsc = !currentSortAsc;
-  } else {
-    currentSortKey = key;
-    currentSortAsc = true;
-  }
-
-  rows.sort((a, b) => {
-    let valA, valB;
-
-    if (key === 'module') {
-      valA = a.cells[3].innerText;
-      valB = b.cells[3].innerText;
-    } else if (key === 'group') {
-      valA = a.cells[4].innerText;
-      valB = b.cells[4].innerText;
-    } else if (key === 'criticality') {
-      valA = a.cells[5].innerText;
-      valB = b.cells[5].innerText;
-    }
 
-    if (valA < valB) return currentSortAsc ? -1 : 1;
-    if (valA > valB) return currentSortAsc ? 1 : -1;
-    return 0;
-  });
-
-  // Re-render rows and re-number Ser
-  tbody.innerHTML = '';
-  rows.forEach((row, index) => {
-    row.cells[0].innerText = index + 1;
-    tbody.appendChild(row);
-  });
-});
-</script>
-
-<script>
-async function loadCharts() {
-
-  // Chart 1 - Criticality Trend
-  const critRes = await fetch('/api/charts/criticality-trend');
-  const critData = await critRes.json();
-
-  new Chart(document.getElementById('criticalityTrendChart'), {
-    type: 'line',
-    data: {
-      labels: critData.labels,
-      datasets: [
-        { label: 'Vital', data: critData.vital, borderColor: '#e51f1f' },
-        { label: 'Essential', data: critData.essential, borderColor: '#f2a134' },
-        { label: 'Desirable', data: critData.desirable, borderColor: '#f7e379' }
-      ]
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false
-    }
-  });
-
-  // Chart 2 - Vital by Module
-  const modRes = await fetch('/api/charts/vital-module-trend');
-  const modData = await modRes.json();
-
-  new Chart(document.getElementById('moduleVitalTrendChart'), {
-    type: 'line',
-    data: {
-      labels: modData.labels,
-      datasets: modData.datasets
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false
-    }
-  });
-}
+def make_cache_backend(name):
+    if name == 'memory':
+        return MemoryCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAXSIZE)
+    if name == 'disk':
+        return DiskCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAXSIZE)
+    return None
 
-document.addEventListener('DOMContentLoaded', loadCharts);
-</script>
-
-    <script>
-        function generatePDF() {
-            const fromDate = document.getElementById('reportFromDate').value;
-            const toDate = document.getElementById('reportToDate').value;
-            if (!fromDate || !toDate) { alert("Select both dates"); return; }
-            fetch('/api/reports/pdf', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ from_date: fromDate, to_date: toDate }) })
-                .then(response => response.blob())
-                .then(blob => {
-                    const url = window.URL.createObjectURL(blob);
-                    const win = window.open(url);
-                    win.onload = () => win.print();
-                })
-                .catch(error => alert('PDF failed: ' + error));
-        }
-        // Lifecycle JS (modals)
-        async function loadModuleGroups() {
-            try {
-                const response = await fetch('/api/module-groups');
-                const data = await response.json();
-                if (data.success) {
-                    window.moduleGroups = data.data;
-                    populateGroupDropdowns();
-                    setupGroupChangeListeners();
-                }
-            } catch (error) { console.error('Groups load error:', error); }
-        }
-        function populateGroupDropdowns() {
-            const groups = window.moduleGroups || [];
-            const resurfaceGroup = document.getElementById('resurfaceGroup');
-            resurfaceGroup.innerHTML = '<option value="">Select Group</option>';
-            const closeGroup = document.getElementById('closeGroup');
-            closeGroup.innerHTML = '<option value="">Select Group</option>';
-            groups.forEach(group => {
-                const option = document.createElement('option');
-                option.value = group.group_id;
-                option.textContent = group.group_name;
-                resurfaceGroup.appendChild(option.cloneNode(true));
-                closeGroup.appendChild(option.cloneNode(true));
-            });
-        }
-        function setupGroupChangeListeners() {
-            document.getElementById('resurfaceGroup').addEventListener('change', function() {
-                const groupId = this.value;
-                const moduleSelect = document.getElementById('resurfaceModule');
-                moduleSelect.innerHTML = '<option value="">Select Module</option>';
-                if (!groupId) return;
-                const group = window.moduleGroups.find(g => g.group_id == groupId);
-                if (group && group.modules) group.modules.forEach(module => {
-                    const option = document.createElement('option');
-                    option.value = module.module_id;
-                    option.textContent = module.module_name;
-                    moduleSelect.appendChild(option);
-                });
-            });
-            document.getElementById('closeGroup').addEventListener('change', function() {
-                const groupId = this.value;
-                const moduleSelect = document.getElementById('closeModule');
-                moduleSelect.innerHTML = '<option value="">Select Module</option>';
-                if (!groupId) return;
-                const group = window.moduleGroups.find(g => g.group_id == groupId);
-                if (group && group.modules) group.modules.forEach(module => {
-                    const option = document.createElement('option');
-                    option.value = module.module_id;
-                    option.textContent = module.module_name;
-                    moduleSelect.appendChild(option);
-                });
-            });
-            document.getElementById('resurfaceModule').addEventListener('change', async function() {
-                const moduleId = this.value;
-                const listDiv = document.getElementById('resurfaceList');
-                if (!moduleId) { listDiv.innerHTML = ''; return; }
-                try {
-                    const response = await fetch('/api/observations/closed', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ module_id: moduleId }) });
-                    const result = await response.json();
-                    if (result.success) {
-                        const observations = result.data;
-                        if (observations.length === 0) listDiv.innerHTML = '<p class="text-muted text-center">No CLOSED observations.</p>';
-                        else {
-                            let html = '<div class="list-group">';
-                            observations.forEach(obs => {
-                                const date = new Date(obs.timestamp).toLocaleDateString('en-IN');
-                                html += `<div class="list-group-item"><input class="form-check-input me-2" type="checkbox" value="${obs.id}" id="resurface_${obs.id}"><label class="form-check-label w-100" for="resurface_${obs.id}"><div class="d-flex justify-content-between"><span>${obs.observation}</span><span class="badge bg-secondary">${date}</span></div><small class="text-muted d-block">Criticality: ${obs.criticality}</small></label></div>`;
-                            });
-                            html += '</div>';
-                            listDiv.innerHTML = html;
-                        }
-                    } else listDiv.innerHTML = '<p class="text-danger">Load failed.</p>';
-                } catch (error) { console.error('Load error:', error); listDiv.innerHTML = '<p class="text-danger">Error loading.</p>'; }
-            });
-            document.getElementById('closeModule').addEventListener('change', async function() {
-                const moduleId = this.value;
-                const listDiv = document.getElementById('closeList');
-                if (!moduleId) { listDiv.innerHTML = ''; return; }
-                try {
-                    const response = await fetch('/api/observations/open-resurfaced', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ module_id: moduleId }) });
-                    const result = await response.json();
-                    if (result.success) {
-                        const observations = result.data;
-                        if (observations.length === 0) listDiv.innerHTML = '<p class="text-muted text-center">No OPEN or RESURFACED observations.</p>';
-                        else {
-                            let html = '<div class="list-group">';
-                            observations.forEach(obs => {
-                                const date = new Date(obs.timestamp).toLocaleDateString('en-IN');
-                                const statusClass = obs.status === 'OPEN' ? 'bg-primary' : 'bg-warning';
-                                html += `<div class="list-group-item"><input class="form-check-input me-2" type="checkbox" value="${obs.id}" id="close_${obs.id}"><label class="form-check-label w-100" for="close_${obs.id}"><div class="d-flex justify-content-between"><span>${obs.observation}</span><div><span class="badge ${statusClass} me-2">${obs.status}</span><span class="badge bg-secondary">${date}</span></div></div><small class="text-muted d-block">Criticality: ${obs.criticality}</small></label></div>`;
-                            });
-                            html += '</div>';
-                            listDiv.innerHTML = html;
-                        }
-                    } else listDiv.innerHTML = '<p class="text-danger">Load failed.</p>';
-                } catch (error) { console.error('Load error:', error); listDiv.innerHTML = '<p class="text-danger">Error loading.</p>'; }
-            });
-        }
-        async function submitResurface() {
-            const checkboxes = document.querySelectorAll('#resurfaceList input[type="checkbox"]:checked');
-            const ids = Array.from(checkboxes).map(cb => cb.value);
-            if (ids.length === 0) { alert('Select at least one.'); return; }
-            try {
-                const response = await fetch('/api/observations/resurface', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ ids }) });
-                const result = await response.json();
-                if (result.success) { alert('Resurfaced!'); document.getElementById('resurfaceModule').dispatchEvent(new Event('change')); updateTotalCount(); } else alert('Failed: ' + (result.error || 'Unknown'));
-            } catch (error) { console.error('Error:', error); alert('Error.'); }
-        }
-        async function submitClose() {
-            const checkboxes = document.querySelectorAll('#closeList input[type="checkbox"]:checked');
-            const ids = Array.from(checkboxes).map(cb => cb.value);
-            if (ids.length === 0) { alert('Select at least one.'); return; }
-            try {
-                const response = await fetch('/api/observations/close', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ ids }) });
-                const result = await response.json();
-                if (result.success) { alert('Closed!'); document.getElementById('closeModule').dispatchEvent(new Event('change')); updateTotalCount(); } else alert('Failed: ' + (result.error || 'Unknown'));
-            } catch (error) { console.error('Error:', error); alert('Error.'); }
-        }
-        document.addEventListener('DOMContentLoaded', function() {
-            loadModuleGroups();
-            document.getElementById('resurfaceModal').addEventListener('show.bs.modal', () => {
-                document.getElementById('resurfaceGroup').value = ''; document.getElementById('resurfaceModule').innerHTML = '<option value="">Select Module</option>'; document.getElementById('resurfaceList').innerHTML = '';
-            });
-            document.getElementById('closeModal').addEventListener('show.bs.modal', () => {
-                document.getElementById('closeGroup').value = ''; document.getElementById('closeModule').innerHTML = '<option value="">Select Module</option>'; document.getElementById('closeList').innerHTML = '';
-            });
-        });
-    </script>
-<script>
-async function loadCharts() {
-
-  // Chart 1 - Criticality Trend
-  const critRes = await fetch('/api/charts/criticality-trend');
-  const critData = await critRes.json();
-
-  new Chart(document.getElementById('criticalityTrendChart'), {
-    type: 'line',
-    data: {
-      labels: critData.labels,
-      datasets: [
-        { label: 'Vital', data: critData.vital, borderColor: '#e51f1f' },
-        { label: 'Essential', data: critData.essential, borderColor: '#f2a134' },
-        { label: 'Desirable', data: critData.desirable, borderColor: '#f7e379' }
-      ]
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false
-    }
-  });
-
-  // Chart 2 - Vital by Module
-  const modRes = await fetch('/api/charts/vital-module-trend');
-  const modData = await modRes.json();
-
-  new Chart(document.getElementById('moduleVitalTrendChart'), {
-    type: 'line',
-    data: {
-      labels: modData.labels,
-      datasets: modData.datasets
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false
-    }
-  });
+response_cache = ResponseCache(make_cache_backend(RESPONSE_CACHE_BACKEND))
+
+def cached_response(daily=False):
+    """
+    Cache successful JSON responses of the decorated view. Parameters are the
+    query string plus the JSON body, normalised by sorting keys. daily=True
+    adds today's date for views whose window ends today.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            params = {'args': sorted(request.args.items(multi=True)), 'json': request.get_json(silent=True)}
+            if daily:
+                params['day'] = datetime.now(timezone.utc).date().isoformat()
+            key = json.dumps([request.endpoint, params, data_generation()], sort_keys=True)
+            body = response_cache.get(request.endpoint, key)
+            if body is not None:
+                response = Response(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.mimetype == 'application/json':
+                response_cache.set(key, response.get_data())
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+@app.route('/api/system/cache')
+def response_cache_stats():
+    return jsonify({'success': True, 'cache': response_cache.stats(), 'pdf': pdf_cache.stats(), 'report_jobs': report_jobs.stats(), 'live_feed': live_feed.stats()})
+
+# ========== COMPRESSION ==========
+# JSON, NDJSON, CSV, HTML and PDF responses of at least COMPRESS_MIN_SIZE
+# bytes are compressed with the best encoding the client accepts. Streamed
+# responses (exports) are compressed chunk by chunk with a sync flush, so rows
+# still reach the client as they are produced. Server-Sent Events and files
+# with their own precompressed variants are left alone. PDFs shrink less
+# (ReportLab already deflates page content) but at almost no cost; see
+# `python bench.py compression`.
+COMPRESS_ENCODINGS = os.environ.get('ERP_COMPRESSION', 'br,zstd,gzip')   # server preference order, or "off"
+COMPRESS_MIN_SIZE = int(os.environ.get('ERP_COMPRESS_MIN_SIZE', 1024))  # bytes; smaller bodies are sent as is
+COMPRESS_LEVELS = {
+    'gzip': int(os.environ.get('ERP_GZIP_LEVEL', 6)),
+    'br': int(os.environ.get('ERP_BROTLI_QUALITY', 4)),
+    'zstd': int(os.environ.get('ERP_ZSTD_LEVEL', 3)),
 }
+COMPRESS_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain', 'application/pdf'}
+
+class GzipStream:
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush()
+
+class BrotliStream:
+    def __init__(self, level):
+        self._c = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._c.process(data)
+
+    def flush(self):
+        return self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+class ZstdStream:
+    def __init__(self, level):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._c.compress(data)
+
+    def flush(self):
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._c.flush()
 
-document.addEventListener('DOMContentLoaded', loadCharts);
-</script>
+COMPRESSORS = {'gzip': GzipStream}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliStream
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdStream
 
-</body>
-</html>
-    '''
+def compress_bytes(data, encoding, level=None):
+    stream = COMPRESSORS[encoding](COMPRESS_LEVELS[encoding] if level is None else level)
+    return stream.compress(data) + stream.finish()
+
+def choose_encoding(accept_encodings):
+    """The accepted encoding with the highest q-value, ties going to the server's order; None for identity."""
+    best, best_q = None, 0
+    for encoding in COMPRESS_ENCODINGS.split(','):
+        q = accept_encodings[encoding] if encoding in COMPRESSORS else 0
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress_stream(chunks, encoding):
+    stream = COMPRESSORS[encoding](COMPRESS_LEVELS[encoding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            out = stream.compress(chunk) + stream.flush()
+            if out:
+                yield out
+        yield stream.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+@app.after_request
+def compress_response(response):
+    if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.mimetype not in COMPRESS_MIMETYPES or 'Content-Encoding' in response.headers or response.direct_passthrough):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)  # the bytes differ per encoding; If-None-Match still matches weakly
+    return response
+
+# ========== COLUMNAR RESPONSES ==========
+# Bulk endpoints accept format=columnar (query string or JSON body). Each
+# list of row objects becomes {"count": n, "columns": {field: [values]}} and
+# the fields in COLUMNAR_CODED hold small integer codes into the response's
+# shared "dictionaries": {field: [value, ...]}.
+RESPONSE_FORMATS = ('json', 'columnar')
+COLUMNAR_CODED = ('group_name', 'module_name', 'criticality', 'status')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson when it is installed; same output as the default provider otherwise."""
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=options)
+        except TypeError:  # e.g. integers beyond 64 bits
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+app.json = FastJSONProvider(app)
+
+class ColumnarEncoder:
+    """Turns row lists into column tables sharing one set of dictionaries per response."""
+
+    def __init__(self):
+        self.dictionaries = {}
+        self._codes = {}
+
+    def table(self, rows, fields=None):
+        fields = fields or (list(rows[0]) if rows else [])
+        columns = {}
+        for f in fields:
+            values = [r[f] for r in rows]
+            if f in COLUMNAR_CODED:
+                codes = self._codes.setdefault(f, {})
+                dictionary = self.dictionaries.setdefault(f, [])
+                for i, v in enumerate(values):
+                    code = codes.get(v)
+                    if code is None:
+                        code = codes[v] = len(dictionary)
+                        dictionary.append(v)
+                    values[i] = code
+            columns[f] = values
+        return {'count': len(rows), 'columns': columns}
+
+def parse_response_format(params):
+    fmt = (params or {}).get('format') or request.args.get('format') or 'json'
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+    return fmt
+
+def columnar_detailed_report(report):
+    encoder = ColumnarEncoder()
+    module_data = [{**grp, 'modules': encoder.table(grp['modules']), 'vital_observations': encoder.table(grp['vital_observations'])}
+                   for grp in report['module_data']]
+    return {'format': 'columnar', 'overall_data': encoder.table(report['overall_data']), 'grand_total': report['grand_total'],
+            'module_data': module_data, 'dictionaries': encoder.dictionaries}
+
+def columnar_vital_details(details):
+    encoder = ColumnarEncoder()
+    return {'format': 'columnar', 'identified': encoder.table(details['identified']), 'resolved': encoder.table(details['resolved']),
+            'dictionaries': encoder.dictionaries}
 
 # ========== API ENDPOINTS ==========
 @app.route('/save', methods=['POST'])
@@ -997,20 +1443,32 @@ def save_observation():
         for f in required:
             if not data.get(f):
                 return jsonify({'success': False, 'error': f'Missing {f}'}), 400
-        conn = get_db_connection()
-        conn.execute("INSERT INTO observations (observation, module_id, criticality, status) VALUES (?, ?, ?, 'OPEN')", (data['observation'], data['module_id'], data['criticality']))
+        on_duplicate = data.get('on_duplicate', 'insert')
+        if on_duplicate not in ('insert', 'check'):
+            return jsonify({'success': False, 'error': 'on_duplicate must be insert or check'}), 400
+        if not str(data['module_id']).isdigit():
+            return jsonify({'success': False, 'error': 'Invalid module_id'}), 400
+        module_id = int(data['module_id'])
+        conn = get_db()
+        signature = minhash_signature(data['observation'])
+        duplicates = find_similar(conn, module_id, signature)
+        if duplicates and on_duplicate == 'check':
+            return jsonify({'success': False, 'error': 'Possible duplicate', 'duplicates': duplicates}), 409
+        cursor = conn.execute("INSERT INTO observations (observation, module_id, criticality, status) VALUES (?, ?, ?, 'OPEN')", (data['observation'], module_id, data['criticality']))
+        index_signatures(conn, [(cursor.lastrowid, module_id, signature)])
         conn.commit()
-        conn.close()
-        return jsonify({'success': True})
+        observations_changed()
+        return jsonify({'success': True, 'id': cursor.lastrowid, 'duplicates': duplicates})
     except Exception as e:
         return jsonify({'success': False, 'error': 'Server error'}), 500
 
+PENDING_COUNT_QUERY = "SELECT pending FROM pending_counters WHERE scope = 'total' AND scope_id = 0"
+
 @app.route('/api/observations/pending/count')
 def pending_count():
     try:
-        conn = get_db_connection()
-        count = conn.execute("SELECT COUNT(*) FROM observations WHERE status IN ('OPEN', 'RESURFACED')").fetchone()[0]
-        conn.close()
+        conn = get_db()
+        count = conn.execute(PENDING_COUNT_QUERY).fetchone()[0]
         return jsonify({'success': True, 'count': count})
     except:
         return jsonify({'success': False, 'count': 0})
@@ -1019,114 +1477,339 @@ def pending_count():
 def close_observations():
     ids = request.json.get('ids', [])
     if not ids: return jsonify({'success': False}), 400
-    conn = get_db_connection()
-    conn.execute(f"UPDATE observations SET status='CLOSED', closed_on=CURRENT_TIMESTAMP WHERE id IN ({','.join('?'*len(ids))})", ids)
+    conn = get_db()
+    conn.execute(f"UPDATE observations SET status='CLOSED', closed_on=CURRENT_TIMESTAMP WHERE status != 'CLOSED' AND id IN ({','.join('?'*len(ids))})", ids)
     conn.commit()
-    conn.close()
+    observations_changed()
     return jsonify({'success': True})
 
 @app.route('/api/observations/resurface', methods=['POST'])
 def resurface_observations():
     ids = request.json.get('ids', [])
     if not ids: return jsonify({'success': False}), 400
-    conn = get_db_connection()
-    conn.execute(f"UPDATE observations SET status='RESURFACED', resurfaced_on=CURRENT_TIMESTAMP WHERE id IN ({','.join('?'*len(ids))})", ids)
+    conn = get_db()
+    conn.execute(f"UPDATE observations SET status='RESURFACED', resurfaced_on=CURRENT_TIMESTAMP WHERE status = 'CLOSED' AND id IN ({','.join('?'*len(ids))})", ids)
     conn.commit()
-    conn.close()
+    observations_changed()
     return jsonify({'success': True})
 
 @app.route('/api/reports/detailed', methods=['POST'])
+@cached_response()
 def detailed_report():
-    data = request.json
-    from_date = data.get('from_date')
-    to_date = data.get('to_date')
-    if not from_date or not to_date: return jsonify({'success': False, 'error': 'Dates required'}), 400
-    from_ts = f"{from_date} 00:00:00"
-    to_ts = f"{to_date} 23:59:59"
-    conn = get_db_connection()
-    cur = conn.cursor()
-    overall_data = []
-    grand = {'pending_from': 0, 'resurfaced': 0, 'new_obs': 0, 'resolved': 0, 'pending_to': 0}
-    groups = cur.execute("SELECT group_id, group_name FROM module_groups ORDER BY group_name").fetchall()
-    for g in groups:
-        row = cur.execute("""
-            SELECT 
-                SUM(CASE WHEN o.timestamp <= ? AND (o.status = 'OPEN' OR (o.status = 'RESURFACED' AND o.resurfaced_on <= ?)) AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS pending_from,
-                SUM(CASE WHEN o.status = 'RESURFACED' AND o.resurfaced_on BETWEEN ? AND ? AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS resurfaced,
-                SUM(CASE WHEN o.timestamp BETWEEN ? AND ? AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS new,
-                SUM(CASE WHEN o.status = 'CLOSED' AND o.closed_on BETWEEN ? AND ? AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS resolved
-            FROM observations o JOIN modules m ON o.module_id = m.module_id WHERE m.group_id = ? AND o.criticality = 'Vital'
-        """, (from_ts, from_ts, from_ts, to_ts, from_ts, to_ts, from_ts, to_ts, g['group_id'])).fetchone()
-        p_from = row['pending_from'] or 0
-        res = row['resurfaced'] or 0
-        new = row['new'] or 0
-        reslv = row['resolved'] or 0
-        p_to = p_from + res + new - reslv
-        overall_data.append({'group': g['group_name'], 'pending_from': p_from, 'resurfaced': res, 'new': new, 'resolved': reslv, 'pending_to': p_to})
-        grand['pending_from'] += p_from; grand['resurfaced'] += res; grand['new_obs'] += new; grand['resolved'] += reslv; grand['pending_to'] += p_to
-    module_data = []
-    for g in groups:
-        mods = cur.execute("SELECT module_id, module_name FROM modules WHERE group_id = ? ORDER BY module_name", (g['group_id'],)).fetchall()
-        mod_stats = []
-        for m in mods:
-            row = cur.execute("""
-                SELECT 
-                    SUM(CASE WHEN o.timestamp <= ? AND (o.status = 'OPEN' OR (o.status = 'RESURFACED' AND o.resurfaced_on <= ?)) AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS pending_from,
-                    SUM(CASE WHEN o.status = 'RESURFACED' AND o.resurfaced_on BETWEEN ? AND ? AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS resurfaced,
-                    SUM(CASE WHEN o.timestamp BETWEEN ? AND ? AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS new,
-                    SUM(CASE WHEN o.status = 'CLOSED' AND o.closed_on BETWEEN ? AND ? AND o.criticality = 'Vital' THEN 1 ELSE 0 END) AS resolved
-                FROM observations o WHERE o.module_id = ? AND o.criticality = 'Vital'
-            """, (from_ts, from_ts, from_ts, to_ts, from_ts, to_ts, from_ts, to_ts, m['module_id'])).fetchone()
-            p_from = row['pending_from'] or 0
-            res = row['resurfaced'] or 0
-            new = row['new'] or 0
-            reslv = row['resolved'] or 0
-            p_to = p_from + res + new - reslv
-            mod_stats.append({'module_name': m['module_name'], 'pending_from': p_from, 'resurfaced': res, 'new': new, 'resolved': reslv, 'pending_to': p_to})
-        vital_obs = cur.execute("""
-            SELECT o.observation, o.status, o.timestamp, m.module_name FROM observations o JOIN modules m ON o.module_id = m.module_id 
-            WHERE m.group_id = ? AND o.criticality = 'Vital' AND o.status IN ('OPEN', 'RESURFACED') ORDER BY o.timestamp DESC
-        """, (g['group_id'],)).fetchall()
-        module_data.append({'group_name': g['group_name'], 'modules': mod_stats, 'vital_observations': [dict(o) for o in vital_obs]})
-    conn.close()
-    return jsonify({'success': True, 'overall_data': overall_data, 'grand_total': grand, 'module_data': module_data})
+    from_date, to_date, error = parse_report_range(request.json)
+    if error: return error
+    try:
+        fmt = parse_response_format(request.json)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    report = with_vital_concerns(get_detailed_report(from_date, to_date), get_vital_concerns())
+    return jsonify({'success': True, **(columnar_detailed_report(report) if fmt == 'columnar' else report)})
 
 @app.route('/api/reports/vital-details', methods=['POST'])
+@cached_response()
 def vital_details():
-    data = request.json
-    from_date = data.get('from_date')
-    to_date = data.get('to_date')
-    if not from_date or not to_date: return jsonify({'success': False, 'error': 'Dates required'}), 400
-    from_ts = f"{from_date} 00:00:00"
-    to_ts = f"{to_date} 23:59:59"
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # Identified: New or Resurfaced Vitals in period, OPEN/RESURFACED
-    identified = cur.execute("""
-        SELECT m.module_name, o.observation, o.status, o.timestamp as date FROM observations o JOIN modules m ON o.module_id = m.module_id 
-        WHERE o.criticality = 'Vital' AND o.status IN ('OPEN', 'RESURFACED') AND 
-        (o.timestamp BETWEEN ? AND ? OR (o.status = 'RESURFACED' AND o.resurfaced_on BETWEEN ? AND ?)) ORDER BY o.timestamp DESC LIMIT 20
-    """, (from_ts, to_ts, from_ts, to_ts)).fetchall()
-    # Resolved: Vitals closed in period
-    resolved = cur.execute("""
-        SELECT m.module_name, o.observation, o.closed_on as date FROM observations o JOIN modules m ON o.module_id = m.module_id 
-        WHERE o.criticality = 'Vital' AND o.status = 'CLOSED' AND o.closed_on BETWEEN ? AND ? ORDER BY o.closed_on DESC LIMIT 20
-    """, (from_ts, to_ts)).fetchall()
-    conn.close()
-    return jsonify({'success': True, 'identified': [dict(i) for i in identified], 'resolved': [dict(r) for r in resolved]})
+    from_date, to_date, error = parse_report_range(request.json)
+    if error: return error
+    try:
+        fmt = parse_response_format(request.json)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    details = get_vital_details(from_date, to_date)
+    return jsonify({'success': True, **(columnar_vital_details(details) if fmt == 'columnar' else details)})
+
+# ========== PDF BRIEF ==========
+# Bump PDF_TEMPLATE_VERSION whenever render_report_pdf() output changes, so
+# briefs cached on disk by the previous release are not served.
+PDF_TEMPLATE_VERSION = 2
+PDF_CACHE_DIR = os.environ.get('ERP_PDF_CACHE_DIR', 'pdf_cache')   # empty string disables the disk cache
+PDF_CACHE_MAX_FILES = 64
+PDF_MEMORY_CACHE_SIZE = 16
+PDF_MEMORY_CACHE_TTL = 3600
+PDF_CONCERNS_PER_GROUP = 10   # default "Areas of Concern" listed per group; the rest are counted
+PDF_CONCERNS_MAX = 500
+PDF_APPENDIX_BATCH = 200      # appendix rows fetched (and turned into flowables) at a time
+
+# Top `limit` pending Vital observations per group, with each group's total
+# (at least one row per group so the total is known even for limit 0).
+PDF_CONCERNS_QUERY = """
+    SELECT group_id, module_name, observation, status, timestamp, rn, total FROM (
+        SELECT m.group_id, m.module_name, o.observation, o.status, o.timestamp,
+               ROW_NUMBER() OVER (PARTITION BY m.group_id ORDER BY o.timestamp DESC, o.id DESC) AS rn,
+               COUNT(*) OVER (PARTITION BY m.group_id) AS total
+        FROM observations o JOIN modules m ON o.module_id = m.module_id
+        WHERE o.criticality = 'Vital' AND o.status IN ('OPEN', 'RESURFACED')
+    )
+    WHERE rn <= MAX(:limit, 1)
+    ORDER BY group_id, rn
+"""
+
+# The same ordering for one group, past the first `limit` rows.
+PDF_APPENDIX_QUERY = """
+    SELECT m.module_name, o.observation, o.status, o.timestamp
+    FROM observations o JOIN modules m ON o.module_id = m.module_id
+    WHERE m.group_id = :group_id AND o.criticality = 'Vital' AND o.status IN ('OPEN', 'RESURFACED')
+    ORDER BY o.timestamp DESC, o.id DESC
+    LIMIT -1 OFFSET :limit
+"""
+
+class LazyFlowables(list):
+    """
+    Flowable list for doc.build() that pulls from `tail` only when fewer than
+    `ahead` flowables are buffered, so a long appendix is generated (and
+    freed) page by page instead of being held in memory all at once.
+    """
+
+    def __init__(self, head, tail, ahead=64):
+        super().__init__(head)
+        self._tail = iter(tail)
+        self._ahead = ahead
+
+    def _fill(self):
+        while self._tail is not None and list.__len__(self) < self._ahead:
+            try:
+                self.append(next(self._tail))
+            except StopIteration:
+                self._tail = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+def parse_pdf_options(data):
+    """
+    Read concern_limit (Areas of Concern per group) and appendix (list the
+    rest at the end) from a brief request. Returns (options, error response).
+    """
+    data = data or {}
+    try:
+        limit = int(data.get('concern_limit', PDF_CONCERNS_PER_GROUP))
+    except (TypeError, ValueError):
+        limit = -1
+    if not 0 <= limit <= PDF_CONCERNS_MAX:
+        return None, (jsonify({'success': False, 'error': f'concern_limit must be between 0 and {PDF_CONCERNS_MAX}'}), 400)
+    appendix = str(data.get('appendix', '')).lower() in ('1', 'true', 'yes')
+    return {'concern_limit': limit, 'appendix': appendix}, None
+
+def concern_paragraph(obs):
+    return Paragraph(f"<b>{obs['module_name']}:</b> {obs['observation']} (Date: {obs['timestamp'][:10]}, Status: {obs['status']})", PDF_STYLES['normal'])
+
+def iter_appendix(conn, groups, limit):
+    """Flowables for the appendix: every group's concerns past the first `limit`."""
+    for grp in groups:
+        yield Paragraph(f"{grp['group_name']} - Remaining Vital Observations", PDF_STYLES['subtitle'])
+        cursor = conn.execute(PDF_APPENDIX_QUERY, {'group_id': grp['group_id'], 'limit': limit})
+        while True:
+            rows = cursor.fetchmany(PDF_APPENDIX_BATCH)
+            if not rows:
+                break
+            for obs in rows:
+                yield concern_paragraph(obs)
+                yield Spacer(1, 4)
+        yield Spacer(1, 18)
+
+# Paragraph and table styles are built once at import and shared by every
+# render; ReportLab only reads them, so treat them as constants.
+_SAMPLE_STYLES = getSampleStyleSheet()
+_NORMAL_STYLE = ParagraphStyle('CustomNormal', parent=_SAMPLE_STYLES['Normal'], fontSize=9, alignment=TA_LEFT, leading=10)
+PDF_STYLES = MappingProxyType({
+    'title': ParagraphStyle('CustomTitle', parent=_SAMPLE_STYLES['Title'], fontSize=16, spaceAfter=20, alignment=TA_CENTER),
+    'subtitle': ParagraphStyle('CustomSubtitle', parent=_SAMPLE_STYLES['Heading2'], fontSize=12, spaceAfter=12, alignment=TA_CENTER),
+    'bold': ParagraphStyle('CustomBold', parent=_SAMPLE_STYLES['Normal'], fontName='Helvetica-Bold', fontSize=11, spaceAfter=8),
+    'normal': _NORMAL_STYLE,
+    'module_name': ParagraphStyle('ModName', parent=_NORMAL_STYLE, fontSize=8, alignment=TA_LEFT),
+})
+
+OVERALL_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,-1), 10),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0,1), (-1,-2), [colors.white, colors.lightgrey])
+])
+MODULE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,-1), 8),
+    ('ALIGN', (1,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.lightgrey])
+])
+DEV_LIST_TABLE_STYLE = TableStyle([('FONTSIZE', (0,0), (-1,-1), 10), ('ALIGN', (0,0), (-1,-1), 'LEFT')])
+VITAL_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,-1), 9),
+    ('ALIGN', (0,0), (0,0), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'TOP')
+])
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs fn(),
+    the others wait for its result (or exception) instead of repeating it.
+    """
 
-@app.route('/api/reports/pdf', methods=['POST'])
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def run(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event()}
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result'], False
+        try:
+            call['result'] = fn()
+            return call['result'], True
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+class PdfCache:
+    """
+    Rendered briefs by key, in memory and as files under PDF_CACHE_DIR (shared
+    by every worker on the host). Builds of the same key are coalesced.
+    """
+
+    def __init__(self, directory, max_files):
+        self.directory = directory
+        self.max_files = max_files
+        self.memory = MemoryCache(PDF_MEMORY_CACHE_TTL, PDF_MEMORY_CACHE_SIZE)
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'builds': 0, 'coalesced': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key, pdf):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(pdf)
+            os.replace(tmp, self._path(key))
+            files = sorted((e for e in os.scandir(self.directory) if e.name.endswith('.pdf')), key=lambda e: e.stat().st_mtime)
+            for entry in files[:-self.max_files]:
+                os.remove(entry.path)
+        except OSError:
+            pass  # a read-only or full disk only costs us the cache
+
+    def get(self, key):
+        """Cached bytes for key from memory or disk, or None; never builds."""
+        pdf = self.memory.get(key)
+        if pdf is not None:
+            self._count('memory_hits')
+            return pdf
+        pdf = self._read(key)
+        if pdf is not None:
+            self._count('disk_hits')
+            self.memory.set(key, pdf)
+        return pdf
+
+    def get_or_build(self, key, build):
+        pdf = self.memory.get(key)
+        if pdf is not None:
+            self._count('memory_hits')
+            return pdf
+        def load():
+            pdf = self._read(key)
+            if pdf is not None:
+                self._count('disk_hits')
+            else:
+                self._count('builds')
+                pdf = build()
+                self._write(key, pdf)
+            self.memory.set(key, pdf)
+            return pdf
+        pdf, leader = self._flights.run(key, load)
+        if not leader:
+            self._count('coalesced')
+        return pdf
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['memory_entries'] = self.memory.size()
+        stats['directory'] = self.directory or None
+        return stats
+
+pdf_cache = PdfCache(PDF_CACHE_DIR, PDF_CACHE_MAX_FILES)
+
+def pdf_cache_key(from_date, to_date, options):
+    """Hex digest of (from, to, options, template version, data generation); also the ETag."""
+    raw = json.dumps([from_date, to_date, options, PDF_TEMPLATE_VERSION, data_generation()], sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+@app.route('/api/reports/pdf', methods=['GET', 'POST'])
 def generate_report_pdf():
-    data = request.get_json()
-    from_date = data['from_date']
-    to_date = data['to_date']
-    from_ts = f"{from_date} 00:00:00"
-    to_ts = f"{to_date} 23:59:59"
-    # Get detailed data
-    with app.test_request_context(json=data):
-        detailed_resp = detailed_report().get_json()
-    with app.test_request_context(json=data):
-        vital_resp = vital_details().get_json()
+    data = request.get_json() if request.method == 'POST' else request.args
+    from_date, to_date, error = parse_report_range(data)
+    if error: return error
+    options, error = parse_pdf_options(data)
+    if error: return error
+    key = pdf_cache_key(from_date, to_date, options)
+    if request.method == 'GET' and request.if_none_match.contains_weak(key):
+        return pdf_response(None, key)  # the key is the ETag: no need for the bytes, which may have been evicted
+    pdf = pdf_cache.get_or_build(key, lambda: render_report_pdf(from_date, to_date, **options))
+    return pdf_response(pdf, key)
+
+def pdf_response(pdf, key):
+    """The brief with its ETag and caching headers; pdf=None gives the 304 for a matching If-None-Match."""
+    response = Response(pdf, mimetype='application/pdf', status=200 if pdf is not None else 304)
+    response.headers['Content-Disposition'] = 'inline; filename=Navyojana_Project_Brief.pdf'
+    response.set_etag(key)
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response.make_conditional(request) if pdf is not None else response
+
+def render_report_pdf(from_date, to_date, concern_limit=PDF_CONCERNS_PER_GROUP, appendix=False):
+    """
+    Build the leadership brief for the range and return the PDF bytes. Each
+    group lists at most concern_limit Areas of Concern; with appendix=True
+    the remainder follow the summary pages in an appendix.
+    """
+    conn = get_db()
+    concerns = {}
+    for obs in conn.execute(PDF_CONCERNS_QUERY, {'limit': concern_limit}):
+        group_concerns = concerns.setdefault(obs['group_id'], {'rows': [], 'total': obs['total']})
+        if obs['rn'] <= concern_limit:
+            group_concerns['rows'].append(obs)
+    detailed_resp = get_detailed_report(from_date, to_date)
+    vital_resp = get_vital_details(from_date, to_date)
     overall_data = detailed_resp['overall_data']
     grand_total = detailed_resp['grand_total']
     module_data = detailed_resp['module_data']
@@ -1134,11 +1817,11 @@ def generate_report_pdf():
     resolved = vital_resp['resolved']
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=36, rightMargin=36, topMargin=50, bottomMargin=36)
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Title'], fontSize=16, spaceAfter=20, alignment=TA_CENTER)
-    subtitle_style = ParagraphStyle('CustomSubtitle', parent=styles['Heading2'], fontSize=12, spaceAfter=12, alignment=TA_CENTER)
-    bold_style = ParagraphStyle('CustomBold', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=11, spaceAfter=8)
-    normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'], fontSize=9, alignment=TA_LEFT, leading=10)
+    title_style = PDF_STYLES['title']
+    subtitle_style = PDF_STYLES['subtitle']
+    bold_style = PDF_STYLES['bold']
+    normal_style = PDF_STYLES['normal']
+    module_name_style = PDF_STYLES['module_name']
     elements = []
     elements.append(Paragraph("NAVYOJANA PROJECT BRIEF", title_style))
     elements.append(Paragraph(f"(From {from_date} to {to_date})", subtitle_style))
@@ -1151,15 +1834,7 @@ def generate_report_pdf():
         table_data.append([Paragraph(r['group'], normal_style), str(r['pending_from']), str(r['resurfaced']), str(r['new']), str(r['resolved']), str(r['pending_to'])])
     table_data.append([Paragraph("GRAND TOTAL", bold_style), str(grand_total['pending_from']), str(grand_total['resurfaced']), str(grand_total['new_obs']), str(grand_total['resolved']), str(grand_total['pending_to'])])
     table = Table(table_data, colWidths=[120, 70, 60, 50, 50, 70], repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 10),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('ROWBACKGROUNDS', (0,1), (-1,-2), [colors.white, colors.lightgrey])
-    ]))
+    table.setStyle(OVERALL_TABLE_STYLE)
     elements.append(table)
     elements.append(Spacer(1, 18))
     # Module tables
@@ -1168,27 +1843,23 @@ def generate_report_pdf():
         elements.append(Spacer(1, 6))
         mod_table_data = [["MODULE", f"Pending as on {from_date}", "Resurfaced", "New", "Resolved", f"Pending as on {to_date}"]]
         for m in grp['modules']:
-            p = Paragraph(m['module_name'], ParagraphStyle('ModName', parent=normal_style, fontSize=8, alignment=TA_LEFT))
+            p = Paragraph(m['module_name'], module_name_style)
             mod_table_data.append([p, str(m['pending_from']), str(m['resurfaced']), str(m['new']), str(m['resolved']), str(m['pending_to'])])
         mod_table = Table(mod_table_data, colWidths=[200, 60, 50, 50, 50, 60], repeatRows=1)
-        mod_table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-            ('GRID', (0,0), (-1,-1), 1, colors.black),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), 8),
-            ('ALIGN', (1,0), (-1,-1), 'CENTER'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.lightgrey])
-        ]))
+        mod_table.setStyle(MODULE_TABLE_STYLE)
         elements.append(mod_table)
         elements.append(Spacer(1, 12))
         elements.append(Paragraph("AREAS OF CONCERN:", bold_style))
         elements.append(Spacer(1, 6))
-        if grp['vital_observations']:
-            for obs in grp['vital_observations']:
-                obs_para = Paragraph(f"<b>{obs['module_name']}:</b> {obs['observation']} (Date: {obs['timestamp'][:10]}, Status: {obs['status']})", normal_style)
-                elements.append(obs_para)
+        group_concerns = concerns.get(grp['group_id'])
+        if group_concerns:
+            for obs in group_concerns['rows']:
+                elements.append(concern_paragraph(obs))
                 elements.append(Spacer(1, 4))
+            more = group_concerns['total'] - len(group_concerns['rows'])
+            if more:
+                where = " (listed in the Appendix)" if appendix else ""
+                elements.append(Paragraph(f"<i>... and {more} more Vital observation{'s' if more != 1 else ''}{where}.</i>", normal_style))
         else:
             elements.append(Paragraph("No Vital observations found.", normal_style))
         elements.append(Spacer(1, 18))
@@ -1196,7 +1867,7 @@ def generate_report_pdf():
     elements.append(Paragraph("MODULES UNDER DEVELOPMENT", subtitle_style))
     elements.append(Spacer(1, 6))
     dev_list = Table([["- Coster", ""], ["- E-Samagri", ""], ["- MHMS", ""], ["- YAMS", ""]], colWidths=[250, 273])
-    dev_list.setStyle(TableStyle([('FONTSIZE', (0,0), (-1,-1), 10), ('ALIGN', (0,0), (-1,-1), 'LEFT')]))
+    dev_list.setStyle(DEV_LIST_TABLE_STYLE)
     elements.append(dev_list)
     elements.append(Spacer(1, 18))
     # Vital details table
@@ -1211,46 +1882,429 @@ def generate_report_pdf():
     vital_table_data = [["IDENTIFIED", "RESOLVED"]]
     vital_table_data.append([identified_list if identified_list else Paragraph("None identified", normal_style), resolved_list if resolved_list else Paragraph("None resolved", normal_style)])
     vital_table = Table(vital_table_data, colWidths=[250, 273])
-    vital_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('ALIGN', (0,0), (0,0), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'TOP')
-    ]))
+    vital_table.setStyle(VITAL_TABLE_STYLE)
     elements.append(vital_table)
-    doc.build(elements)
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=False, mimetype='application/pdf', download_name='Navyojana_Project_Brief.pdf')
+    overflow = [grp for grp in module_data if grp['group_id'] in concerns and concerns[grp['group_id']]['total'] > concern_limit]
+    if appendix and overflow:
+        elements.append(PageBreak())
+        elements.append(Paragraph("APPENDIX - PENDING VITAL OBSERVATIONS NOT LISTED ABOVE", title_style))
+        doc.build(LazyFlowables(elements, iter_appendix(conn, overflow, concern_limit)))
+    else:
+        doc.build(elements)
+    return buffer.getvalue()
+
+# ========== REPORT JOBS ==========
+# Briefs for long ranges are built off the request thread: POST enqueues a
+# job, a small thread pool renders it into pdf_cache, and the client polls
+# the status URL before downloading. Job rows live in report_jobs so any
+# worker can answer the status and download calls.
+REPORT_JOB_WORKERS = int(os.environ.get('ERP_REPORT_WORKERS', 2))
+REPORT_JOB_MAX_PENDING = 16   # queued + running jobs per process before POST answers 503
+REPORT_JOB_TIMEOUT = 120      # seconds from start until a running job is reported failed
+REPORT_JOB_QUEUE_TIMEOUT = 900  # seconds a job may wait queued, e.g. after the worker that took it exited
+REPORT_JOB_RETENTION = '-1 day'
+
+# The timeout is advisory: a render thread cannot be stopped, so a job past
+# its deadline is only marked failed and clients stop waiting for it. If the
+# render does finish, the brief still lands in pdf_cache for the next request.
+REPORT_JOB_EXPIRED = f"""(
+    (status = 'running' AND started_at < datetime('now', '-{REPORT_JOB_TIMEOUT} seconds'))
+    OR (status = 'queued' AND created_at < datetime('now', '-{REPORT_JOB_QUEUE_TIMEOUT} seconds'))
+)"""
+
+REPORT_JOB_EXPIRE_SQL = f"""
+    UPDATE report_jobs SET status = 'failed', error = 'Timed out', finished_at = CURRENT_TIMESTAMP
+    WHERE {REPORT_JOB_EXPIRED}
+"""
+
+# Status polls are read-only: a job past its deadline reads as failed until
+# the next enqueue or job start writes it.
+REPORT_JOB_STATUS_QUERY = f"""
+    SELECT id, from_date, to_date, cache_key, created_at, finished_at,
+           CASE WHEN {REPORT_JOB_EXPIRED} THEN 'failed' ELSE status END AS status,
+           CASE WHEN {REPORT_JOB_EXPIRED} THEN 'Timed out' ELSE error END AS error
+    FROM report_jobs WHERE id = ?
+"""
+
+class ReportJobQueue:
+    """Bounded thread pool that renders queued briefs into pdf_cache."""
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, make_key, render):
+        """
+        Queue render() into pdf_cache under make_key(); returns False when
+        max_pending jobs are already outstanding.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-job')
+        self._executor.submit(self._run, job_id, make_key, render)
+        return True
+
+    def _run(self, job_id, make_key, render):
+        try:
+            with app.app_context():
+                conn = get_db()
+                conn.execute(REPORT_JOB_EXPIRE_SQL)
+                started = conn.execute("UPDATE report_jobs SET status = 'running', started_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'queued'", (job_id,)).rowcount
+                conn.commit()
+                if not started:
+                    return
+                try:
+                    # Key and brief come from one read snapshot: data written after the
+                    # job was queued is in both, so the key's generation matches the bytes.
+                    conn.execute("BEGIN")
+                    try:
+                        key = make_key()
+                        pdf_cache.get_or_build(key, render)
+                    finally:
+                        conn.rollback()
+                    conn.execute("UPDATE report_jobs SET status = 'done', cache_key = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'running'", (key, job_id))
+                except Exception as e:
+                    conn.execute("UPDATE report_jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'running'", (str(e)[:200], job_id))
+                conn.commit()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'pending': self._pending, 'max_pending': self.max_pending}
+
+report_jobs = ReportJobQueue(REPORT_JOB_WORKERS, REPORT_JOB_MAX_PENDING)
+
+def report_job_json(job):
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'from_date': job['from_date'],
+        'to_date': job['to_date'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'finished_at': job['finished_at'],
+        'status_url': f"/api/reports/jobs/{job['id']}",
+        'download_url': f"/api/reports/jobs/{job['id']}/pdf",
+    }
+
+@app.route('/api/reports/jobs', methods=['POST'])
+def enqueue_report_job():
+    data = request.get_json(silent=True)
+    from_date, to_date, error = parse_report_range(data)
+    if error: return error
+    options, error = parse_pdf_options(data)
+    if error: return error
+    conn = get_db()
+    conn.execute(REPORT_JOB_EXPIRE_SQL)
+    conn.execute("DELETE FROM report_jobs WHERE created_at < datetime('now', ?)", (REPORT_JOB_RETENTION,))
+    conn.commit()
+    key = pdf_cache_key(from_date, to_date, options)
+    # An identical brief that is already rendered or on its way is reused.
+    job = conn.execute("SELECT * FROM report_jobs WHERE cache_key = ? AND status IN ('queued', 'running', 'done') ORDER BY created_at DESC LIMIT 1", (key,)).fetchone()
+    if job is not None and (job['status'] != 'done' or pdf_cache.get(key) is not None):
+        return jsonify({'success': True, **report_job_json(job)}), 202
+    job_id = os.urandom(12).hex()
+    status = 'done' if pdf_cache.get(key) is not None else 'queued'
+    conn.execute("INSERT INTO report_jobs (id, from_date, to_date, cache_key, status, finished_at) VALUES (?, ?, ?, ?, ?, CASE WHEN ? = 'done' THEN CURRENT_TIMESTAMP END)", (job_id, from_date, to_date, key, status, status))
+    conn.commit()
+    if status == 'queued' and not report_jobs.submit(job_id, lambda: pdf_cache_key(from_date, to_date, options), lambda: render_report_pdf(from_date, to_date, **options)):
+        conn.execute("DELETE FROM report_jobs WHERE id = ?", (job_id,))
+        conn.commit()
+        return jsonify({'success': False, 'error': 'Report queue is full, try again shortly'}), 503
+    job = conn.execute("SELECT * FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+    return jsonify({'success': True, **report_job_json(job)}), 202
+
+@app.route('/api/reports/jobs/<job_id>')
+def report_job_status(job_id):
+    job = get_db().execute(REPORT_JOB_STATUS_QUERY, (job_id,)).fetchone()
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': True, **report_job_json(job)})
+
+@app.route('/api/reports/jobs/<job_id>/pdf')
+def report_job_download(job_id):
+    job = get_db().execute("SELECT * FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    if job['status'] != 'done':
+        return jsonify({'success': False, 'error': f"Job is {job['status']}"}), 409
+    pdf = pdf_cache.get(job['cache_key'])
+    if pdf is None:
+        return jsonify({'success': False, 'error': 'Report expired, please generate it again'}), 410
+    return pdf_response(pdf, job['cache_key'])
+
+# ========== LIVE FEED ==========
+# /api/stream pushes dashboard updates over Server-Sent Events. One poller
+# thread per process watches data_generation (bumped by triggers on every
+# observation write, in any worker); when it moves, the poller reads the new
+# lifecycle events and pending_counters once, encodes a single delta and puts
+# the same bytes on every subscriber's queue. Writes made by this process wake
+# the poller at once; other workers' writes show up within LIVE_POLL_INTERVAL.
+LIVE_POLL_INTERVAL = 1.0      # seconds between data_generation checks
+LIVE_HEARTBEAT = 15           # seconds of silence before a keep-alive comment
+LIVE_QUEUE_SIZE = 32          # undelivered messages before a slow subscriber is disconnected
+LIVE_MAX_IDS = 200            # observation ids listed per delta; beyond that it is marked truncated
+LIVE_RETRY_MS = 3000          # reconnect delay suggested to EventSource clients
+
+def live_stream_capacity(threads):
+    """
+    Streams one process may hold open. Every open stream occupies a request
+    thread for its lifetime, so half the threads (up to DB_POOL_SIZE, beyond
+    which API requests would only queue for a connection) stay free for the
+    API; /api/stream answers 503 past the rest.
+    """
+    return max(0, threads - min(DB_POOL_SIZE, (threads + 1) // 2))
+
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get('ERP_LIVE_MAX_STREAMS', live_stream_capacity(SERVER_THREADS)))
+
+LIVE_STATE_QUERY = """
+    SELECT (SELECT value FROM app_meta WHERE key = 'data_generation'),
+           (SELECT IFNULL(MAX(id), 0) FROM observation_events)
+"""
+LIVE_EVENTS_QUERY = """
+    SELECT observation_id, from_status, to_status FROM observation_events
+    WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+"""
+LIVE_COUNTERS_QUERY = "SELECT scope, scope_id, pending FROM pending_counters WHERE scope IN ('module', 'total')"
+
+def sse_message(event, data, event_id):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+class LiveFeed:
+    """
+    Fan-out of dashboard deltas to the open /api/stream responses.
+    A delta carries the pending total, the pending count of every module that
+    changed and the ids of observations created, closed or resurfaced since
+    the previous one. New subscribers start from a full snapshot, so a client
+    that reconnects (or is dropped for falling behind) simply resyncs.
+    """
+
+    def __init__(self, max_subscribers):
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._conn = None
+        self._state = None     # (generation, cursor, module counters, pending total)
+        self._snapshot = None
+        self._stats = {'deltas': 0, 'dropped': 0}
+
+    def subscribe(self):
+        """A queue of encoded messages (None means: stream over), or None when full."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            q = queue.Queue(LIVE_QUEUE_SIZE)
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def wake(self):
+        self._wake.set()
+
+    def snapshot(self):
+        """The current full state as an encoded 'snapshot' message."""
+        with self._poll_lock:
+            if self._snapshot is None:
+                self._poll()
+            return self._snapshot
+
+    def _run(self):
+        while True:
+            self._wake.wait(LIVE_POLL_INTERVAL)
+            self._wake.clear()
+            try:
+                with self._poll_lock:
+                    with self._lock:
+                        idle = not self._subscribers
+                    if idle:
+                        self._state = self._snapshot = None  # the next subscriber starts from fresh state
+                        continue
+                    message = self._poll()
+            except sqlite3.Error as e:
+                print(f"Live feed poll failed: {e}")
+                continue
+            if message is not None:
+                self._publish(message)
+
+    def _poll(self):
+        """Refresh the state; returns the encoded delta, or None if nothing changed."""
+        if self._conn is None:
+            self._conn = get_db_connection()
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN")  # one read snapshot for the cursor, the events and the counters
+            generation, cursor = conn.execute(LIVE_STATE_QUERY).fetchone()
+            if self._state is not None and self._state[0] == generation:
+                return None
+            counters, total = {}, 0
+            for scope, scope_id, pending in conn.execute(LIVE_COUNTERS_QUERY):
+                if scope == 'total':
+                    total = pending
+                else:
+                    counters[scope_id] = pending
+            message = None
+            if self._state is not None:
+                _, last_cursor, last_counters, _ = self._state
+                delta = {'cursor': cursor, 'pending': total, 'new': [], 'closed': [], 'resurfaced': [],
+                         'modules': {m: n for m, n in counters.items() if last_counters.get(m) != n}}
+                delta['modules'].update((m, 0) for m in last_counters.keys() - counters.keys())
+                events = conn.execute(LIVE_EVENTS_QUERY, (last_cursor, cursor, LIVE_MAX_IDS + 1)).fetchall()
+                for observation_id, from_status, to_status in events[:LIVE_MAX_IDS]:
+                    kind = 'new' if from_status is None else to_status.lower()
+                    if kind in delta:
+                        delta[kind].append(observation_id)
+                if len(events) > LIVE_MAX_IDS:
+                    delta['truncated'] = True
+                message = sse_message('delta', delta, cursor)
+        self._state = (generation, cursor, counters, total)
+        self._snapshot = sse_message('snapshot', {'cursor': cursor, 'pending': total, 'modules': counters}, cursor)
+        return message
+
+    def _publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._stats['deltas'] += 1
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+                self.unsubscribe(q)
+                with self._lock:
+                    self._stats['dropped'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'max_subscribers': self.max_subscribers, **self._stats}
+
+live_feed = LiveFeed(LIVE_MAX_SUBSCRIBERS)
+
+@app.route('/api/stream')
+def live_stream():
+    q = live_feed.subscribe()
+    if q is None:
+        return jsonify({'success': False, 'error': 'Too many open dashboards, try again later'}), 503
+    try:
+        first = live_feed.snapshot()
+    except sqlite3.Error:
+        live_feed.unsubscribe(q)
+        raise
+
+    def stream():
+        try:
+            yield f"retry: {LIVE_RETRY_MS}\n\n".encode() + first
+            while True:
+                try:
+                    message = q.get(timeout=LIVE_HEARTBEAT)
+                except queue.Empty:
+                    yield b": ping\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            live_feed.unsubscribe(q)
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ========== MODULE CATALOGUE ==========
+# The catalogue only changes when modules are seeded, so it is held in memory
+# and reloaded (one JOIN) only when app_meta.catalogue_version moves.
+CATALOGUE_VERSION_QUERY = "SELECT key, value FROM app_meta WHERE key IN ('catalogue_version', 'catalogue_modified')"
+CATALOGUE_QUERY = """
+    SELECT g.group_id, g.group_name, m.module_id, m.module_name
+    FROM module_groups g
+    LEFT JOIN modules m ON m.group_id = g.group_id
+    ORDER BY g.group_name, g.group_id, m.module_name
+"""
+
+_catalogue = {'version': None}
+_catalogue_lock = threading.Lock()
+
+def get_catalogue(conn):
+    """
+    Return the cached catalogue as a dict with version, groups (the
+    /api/module-groups data), module_ids, etag and last_modified.
+    """
+    global _catalogue
+    meta = dict(conn.execute(CATALOGUE_VERSION_QUERY).fetchall())
+    if _catalogue['version'] == meta['catalogue_version']:
+        return _catalogue
+    with _catalogue_lock:
+        if _catalogue['version'] == meta['catalogue_version']:
+            return _catalogue
+        groups = {}
+        for r in conn.execute(CATALOGUE_QUERY):
+            grp = groups.setdefault(r['group_id'], {'group_id': r['group_id'], 'group_name': r['group_name'], 'modules': []})
+            if r['module_id'] is not None:
+                grp['modules'].append({'module_id': r['module_id'], 'module_name': r['module_name']})
+        groups = list(groups.values())
+        body = json.dumps(groups, sort_keys=True).encode()
+        _catalogue = {
+            'version': meta['catalogue_version'],
+            'groups': groups,
+            'module_ids': frozenset(m['module_id'] for grp in groups for m in grp['modules']),
+            'etag': hashlib.sha1(body).hexdigest(),
+            'last_modified': datetime.strptime(meta['catalogue_modified'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc),
+        }
+        return _catalogue
 
 @app.route('/api/module-groups', methods=['GET'])
 def get_module_groups():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM module_groups ORDER BY group_name")
-        groups = cur.fetchall()
-        result = []
-        for group in groups:
-            cur.execute("SELECT module_id, module_name FROM modules WHERE group_id = ? ORDER BY module_name", (group['group_id'],))
-            modules = cur.fetchall()
-            result.append({'group_id': group['group_id'], 'group_name': group['group_name'], 'modules': [{'module_id': m['module_id'], 'module_name': m['module_name']} for m in modules]})
-        conn.close()
-        return jsonify({'success': True, 'data': result})
+        catalogue = get_catalogue(get_db())
+        response = jsonify({'success': True, 'data': catalogue['groups']})
+        response.set_etag(catalogue['etag'])
+        response.last_modified = catalogue['last_modified']
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+CLOSED_BY_MODULE_QUERY = "SELECT o.id, o.observation, o.criticality, o.timestamp FROM observations o WHERE o.module_id = ? AND o.status = 'CLOSED' ORDER BY o.timestamp DESC"
+OPEN_RESURFACED_BY_MODULE_QUERY = "SELECT o.id, o.observation, o.criticality, o.status, o.timestamp FROM observations o WHERE o.module_id = ? AND o.status IN ('OPEN', 'RESURFACED') ORDER BY o.timestamp DESC"
+
+OBSERVATION_HISTORY_QUERY = "SELECT from_status, to_status, at FROM observation_events WHERE observation_id = ? ORDER BY id"
+
+@app.route('/api/observations/<int:observation_id>/history')
+def observation_history(observation_id):
+    events = [dict(r) for r in get_db().execute(OBSERVATION_HISTORY_QUERY, (observation_id,))]
+    if not events:
+        return jsonify({'success': False, 'error': 'Unknown observation'}), 404
+    return jsonify({'success': True, 'observation_id': observation_id, 'events': events})
+
+@app.route('/api/system/db-pool')
+def db_pool_stats():
+    return jsonify({'success': True, 'pool': db_pool.stats()})
+
 @app.route('/api/observations/closed', methods=['POST'])
 def get_closed_observations():
     try:
         module_id = request.json.get('module_id')
         if not module_id: return jsonify({'success': False, 'error': 'Module ID required'}), 400
-        conn = get_db_connection()
+        conn = get_db()
         cur = conn.cursor()
-        cur.execute("SELECT o.id, o.observation, o.criticality, o.timestamp FROM observations o WHERE o.module_id = ? AND o.status = 'CLOSED' ORDER BY o.timestamp DESC", (module_id,))
+        cur.execute(CLOSED_BY_MODULE_QUERY, (module_id,))
         observations = cur.fetchall()
-        conn.close()
         return jsonify({'success': True, 'data': [dict(obs) for obs in observations]})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1260,102 +2314,688 @@ def get_open_resurfaced_observations():
     try:
         module_id = request.json.get('module_id')
         if not module_id: return jsonify({'success': False, 'error': 'Module ID required'}), 400
-        conn = get_db_connection()
+        conn = get_db()
         cur = conn.cursor()
-        cur.execute("SELECT o.id, o.observation, o.criticality, o.status, o.timestamp FROM observations o WHERE o.module_id = ? AND o.status IN ('OPEN', 'RESURFACED') ORDER BY o.timestamp DESC", (module_id,))
+        cur.execute(OPEN_RESURFACED_BY_MODULE_QUERY, (module_id,))
         observations = cur.fetchall()
-        conn.close()
         return jsonify({'success': True, 'data': [dict(obs) for obs in observations]})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Observations in a date range are ordered by group pending count, module
+# pending count, then newest first. The module ordering is fixed on the first
+# page and carried in the cursor, so it stays stable across pages even if
+# observations are closed or added meanwhile.
+RANGE_PAGE_DEFAULT = 500
+RANGE_PAGE_MAX = 5000
+RANGE_FIELDS = ('id', 'observation', 'group_name', 'module_name', 'criticality', 'status', 'timestamp', 'module_pending', 'group_pending')
+RANGE_DEFAULT_FIELDS = ('id', 'observation', 'group_name', 'module_name', 'criticality', 'status', 'timestamp', 'module_pending')
+RANGE_OBSERVATION_COLUMNS = ('observation', 'criticality', 'status')
+
+MODULE_PENDING_ORDER_QUERY = """
+    SELECT
+        m.module_id,
+        m.module_name,
+        g.group_name,
+        IFNULL(mc.pending, 0) AS module_pending,
+        IFNULL(gc.pending, 0) AS group_pending
+    FROM modules m
+    JOIN module_groups g ON m.group_id = g.group_id
+    LEFT JOIN pending_counters mc ON mc.scope = 'module' AND mc.scope_id = m.module_id
+    LEFT JOIN pending_counters gc ON gc.scope = 'group' AND gc.scope_id = m.group_id
+    ORDER BY group_pending DESC, m.group_id, module_pending DESC, m.module_id
+"""
+
+# Same module set as MODULE_PENDING_ORDER_QUERY, so the total matches what the
+# pages return (observations of an unknown module_id are never paged).
+RANGE_COUNT_QUERY = """
+    SELECT COUNT(*) FROM observations
+    WHERE timestamp >= ? AND timestamp < ?
+      AND module_id IN (SELECT m.module_id FROM modules m JOIN module_groups g ON m.group_id = g.group_id)
+"""
+
+RANGE_PAGE_QUERY = """
+    SELECT id, timestamp{columns}
+    FROM observations
+    WHERE module_id = ? AND timestamp >= ? AND timestamp < ?
+      AND (timestamp < ? OR (timestamp = ? AND id < ?))
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+"""
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """The state encoded by encode_cursor(); ValueError unless it has the shape fetch_observation_page() wrote."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    is_int = lambda v: isinstance(v, int) and not isinstance(v, bool)
+    valid = (
+        isinstance(state, dict) and state.keys() == {'range', 'modules', 'total', 'rank', 'after'}
+        and isinstance(state['modules'], list) and is_int(state['total'])
+        and all(isinstance(m, list) and len(m) == 5 and is_int(m[0]) for m in state['modules'])
+        and is_int(state['rank']) and 0 <= state['rank'] <= len(state['modules'])
+        and (state['after'] is None or (isinstance(state['after'], list) and len(state['after']) == 2
+                                        and isinstance(state['after'][0], str) and is_int(state['after'][1])))
+    )
+    if not valid:
+        raise ValueError('Invalid cursor')
+    return state
+
+def fetch_observation_page(conn, from_ts, to_ts, limit, fields, cursor=None):
+    """
+    One page of observations in [from_ts, to_ts). Returns (rows, total,
+    next_cursor); next_cursor is None on the last page.
+    """
+    if cursor is None:
+        modules = [[r['module_id'], r['module_name'], r['group_name'], r['module_pending'], r['group_pending']] for r in conn.execute(MODULE_PENDING_ORDER_QUERY)]
+        total = conn.execute(RANGE_COUNT_QUERY, (from_ts, to_ts)).fetchone()[0]
+        state = {'range': [from_ts, to_ts], 'modules': modules, 'total': total, 'rank': 0, 'after': None}
+    else:
+        state = decode_cursor(cursor)
+        if state['range'] != [from_ts, to_ts]:
+            raise ValueError('Cursor does not match the requested date range')
+    columns = ''.join(f', {c}' for c in RANGE_OBSERVATION_COLUMNS if c in fields)
+    query = RANGE_PAGE_QUERY.format(columns=columns)
+    rows = []
+    rank, after = state['rank'], state['after']
+    while rank < len(state['modules']) and len(rows) < limit:
+        module_id, module_name, group_name, module_pending, group_pending = state['modules'][rank]
+        before_ts, before_id = after or (to_ts, -1)
+        page = conn.execute(query, (module_id, from_ts, to_ts, before_ts, before_ts, before_id, limit - len(rows))).fetchall()
+        for r in page:
+            row = {'id': r['id'], 'timestamp': r['timestamp'], 'module_name': module_name, 'group_name': group_name,
+                   'module_pending': module_pending, 'group_pending': group_pending}
+            for c in RANGE_OBSERVATION_COLUMNS:
+                if c in fields:
+                    row[c] = r[c]
+            rows.append({f: row[f] for f in fields})
+        if len(rows) >= limit and page:
+            after = [page[-1]['timestamp'], page[-1]['id']]
+        else:
+            rank, after = rank + 1, None
+    next_cursor = None
+    if rank < len(state['modules']):
+        state['rank'], state['after'] = rank, after
+        next_cursor = encode_cursor(state)
+    return rows, state['total'], next_cursor
+
+def parse_range_fields(value):
+    if not value:
+        return RANGE_DEFAULT_FIELDS
+    fields = value.split(',') if isinstance(value, str) else value
+    if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+        raise ValueError('fields must be a comma-separated string or a list of names')
+    fields = tuple(f.strip() for f in fields if f.strip())
+    unknown = [f for f in fields if f not in RANGE_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}" if unknown else 'No fields requested')
+    return fields
+
 @app.route('/api/observations/range', methods=['POST'])
 def observations_by_date_range():
-    data = request.get_json(force=True)
+    data = request.get_json(force=True, silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Request body must be a JSON object'}), 400
+    params = {**request.args.to_dict(), **data}
 
-    from_date = data.get('from_date')
-    to_date = data.get('to_date')
+    from_date = params.get('from_date')
+    to_date = params.get('to_date')
 
     if not from_date or not to_date:
         return jsonify({'success': False, 'error': 'Invalid date range'}), 400
 
+    try:
+        from_ts, to_ts = day_bounds(from_date, to_date)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid date range'}), 400
+
+    try:
+        limit = params.get('limit', RANGE_PAGE_DEFAULT)
+        limit = int(limit) if isinstance(limit, (int, str)) else 0
+        if not 1 <= limit <= RANGE_PAGE_MAX:
+            raise ValueError(f'limit must be between 1 and {RANGE_PAGE_MAX}')
+        fields = parse_range_fields(params.get('fields'))
+        fmt = parse_response_format(params)
+        conn = get_db()
+        rows, total, next_cursor = fetch_observation_page(conn, from_ts, to_ts, limit, fields, params.get('cursor'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if fmt == 'columnar':
+        encoder = ColumnarEncoder()
+        data = encoder.table(rows, fields)
+        response = jsonify({'success': True, 'format': 'columnar', 'data': data, 'dictionaries': encoder.dictionaries, 'next_cursor': next_cursor})
+    else:
+        response = jsonify({
+            'success': True,
+            'data': rows,
+            'next_cursor': next_cursor
+        })
+    response.headers['X-Total-Count'] = str(total)
+    return response
+
+# ========== BULK IMPORT ==========
+BULK_INSERT_SQL = "INSERT INTO observations (observation, module_id, criticality, status, timestamp) VALUES (?, ?, ?, 'OPEN', COALESCE(?, CURRENT_TIMESTAMP))"
+BULK_TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+def bulk_format():
+    return request.args.get('format') or {
+        'application/x-ndjson': 'ndjson', 'application/jsonl': 'ndjson', 'text/csv': 'csv',
+    }.get(request.mimetype, 'json')
+
+def parse_bulk_payload():
+    """
+    Read bulk observations from the request body as a JSON array (or an
+    object with an "observations" array), NDJSON or CSV with a header row.
+    Raises ValueError for unreadable payloads.
+    """
+    fmt = bulk_format()
+    if fmt == 'json':
+        payload = request.get_json(force=True, silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get('observations')
+        if not isinstance(payload, list):
+            raise ValueError('Expected a JSON array of observations')
+        return payload
+    text = request.get_data(as_text=True)
+    if fmt == 'ndjson':
+        records = []
+        for n, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    raise ValueError(f'Line {n} is not valid JSON')
+        return records
+    if fmt == 'csv':
+        return list(csv.DictReader(StringIO(text)))
+    raise ValueError('format must be json, ndjson or csv')
+
+def validate_bulk_row(record, module_ids):
+    """Return (insert params, None) for a valid record or (None, error)."""
+    if not isinstance(record, dict):
+        return None, 'Row is not an object'
+    observation = str(record.get('observation') or '').strip()
+    if not observation:
+        return None, 'Missing observation'
+    try:
+        module_id = int(record.get('module_id'))
+    except (TypeError, ValueError):
+        return None, 'Missing or invalid module_id'
+    if module_id not in module_ids:
+        return None, f'Unknown module_id {module_id}'
+    criticality = str(record.get('criticality') or '').strip().capitalize()
+    if criticality not in CRITICALITIES:
+        return None, f"criticality must be one of {', '.join(CRITICALITIES)}"
+    timestamp = record.get('timestamp') or None
+    if timestamp is not None:
+        for fmt in BULK_TIMESTAMP_FORMATS:
+            try:
+                timestamp = datetime.strptime(str(timestamp).strip(), fmt).strftime('%Y-%m-%d %H:%M:%S')
+                break
+            except ValueError:
+                continue
+        else:
+            return None, 'timestamp must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS'
+    return (observation, module_id, criticality, timestamp), None
+
+def bulk_secret_code():
+    """
+    The write secret from the X-Secret-Code header or the "secret_code" of a
+    JSON object body, like /save. Never the query string: URLs end up in logs.
+    """
+    if request.headers.get('X-Secret-Code'):
+        return request.headers['X-Secret-Code']
+    payload = request.get_json(force=True, silent=True) if bulk_format() == 'json' else None
+    return payload.get('secret_code') if isinstance(payload, dict) else None
+
+@app.route('/api/observations/bulk', methods=['POST'])
+def bulk_insert_observations():
+    """
+    Insert many observations in one transaction. Invalid rows are reported
+    and skipped, or abort the whole import with ?atomic=1.
+    """
+    if bulk_secret_code() != SECRET_CODE:
+        return jsonify({'success': False, 'error': 'Invalid code'}), 403
+    try:
+        chunk_size = int(request.args.get('chunk_size', BULK_CHUNK_SIZE))
+        if not 1 <= chunk_size <= BULK_MAX_ROWS:
+            raise ValueError(f'chunk_size must be between 1 and {BULK_MAX_ROWS}')
+        records = parse_bulk_payload()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if not records:
+        return jsonify({'success': False, 'error': 'No observations supplied'}), 400
+    if len(records) > BULK_MAX_ROWS:
+        return jsonify({'success': False, 'error': f'At most {BULK_MAX_ROWS} observations per request'}), 413
+    conn = get_db()
+    module_ids = get_catalogue(conn)['module_ids']
+    results, valid = [], []
+    for n, record in enumerate(records, 1):
+        params, error = validate_bulk_row(record, module_ids)
+        if error:
+            results.append({'row': n, 'status': 'rejected', 'error': error})
+        else:
+            results.append({'row': n, 'status': 'inserted'})
+            signature = minhash_signature(params[0])  # hashed here, not under the write lock
+            valid.append((results[-1], params, signature, lsh_buckets(signature)))
+    rejected = len(records) - len(valid)
+    if rejected and request.args.get('atomic') in ('1', 'true'):
+        for result, *_ in valid:
+            result['status'] = 'skipped'
+        return jsonify({'success': False, 'error': f'{rejected} invalid rows; nothing inserted', 'inserted': 0, 'rejected': rejected, 'results': results}), 400
+    with conn:
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            conn.executemany(BULK_INSERT_SQL, [params for _, params, *_ in chunk])
+            # AUTOINCREMENT ids are consecutive within this write transaction
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            for offset, (result, *_) in enumerate(chunk):
+                result['id'] = last_id - len(chunk) + 1 + offset
+            index_signatures(conn, [(result['id'], params[1], signature) for result, params, signature, _ in chunk],
+                             [buckets for *_, buckets in chunk])
+    if valid:
+        observations_changed()
+    return jsonify({'success': True, 'inserted': len(valid), 'rejected': rejected, 'results': results})
+
+# ========== EXPORT ==========
+EXPORT_COLUMNS = ('id', 'observation', 'module_id', 'module_name', 'group_name', 'criticality', 'status', 'timestamp', 'closed_on', 'resurfaced_on')
+
+EXPORT_QUERY = """
+    SELECT o.id, o.observation, o.module_id, m.module_name, g.group_name, o.criticality, o.status, o.timestamp, o.closed_on, o.resurfaced_on
+    FROM observations o
+    LEFT JOIN modules m ON o.module_id = m.module_id
+    LEFT JOIN module_groups g ON m.group_id = g.group_id
+    WHERE {where}
+    ORDER BY o.timestamp, o.id
+"""
+
+def build_observation_filter(args):
+    """
+    Translate export/search query-string filters into a WHERE clause and parameters.
+    status and criticality accept comma-separated lists. Raises ValueError.
+    """
+    clauses, params = [], []
+    from_date, to_date = args.get('from_date'), args.get('to_date')
+    if from_date or to_date:
+        if not from_date or not to_date:
+            raise ValueError('Both from_date and to_date are required for a date range')
+        try:
+            from_ts, to_ts = day_bounds(from_date, to_date)
+        except ValueError:
+            raise ValueError('Invalid date range')
+        clauses.append("o.timestamp >= ? AND o.timestamp < ?")
+        params += [from_ts, to_ts]
+    if args.get('module_id'):
+        if not args['module_id'].isdigit():
+            raise ValueError('module_id must be a number')
+        clauses.append("o.module_id = ?")
+        params.append(int(args['module_id']))
+    for column, allowed in (('status', STATUSES), ('criticality', CRITICALITIES)):
+        if args.get(column):
+            values = [v.strip() for v in args[column].split(',') if v.strip()]
+            if not values or any(v not in allowed for v in values):
+                raise ValueError(f"{column} must be one of {', '.join(allowed)}")
+            clauses.append(f"o.{column} IN ({','.join('?' * len(values))})")
+            params += values
+    return ' AND '.join(clauses) or '1 = 1', params
+
+def iter_export_rows(where, params):
+    """
+    Yield export rows in fetchmany batches from a dedicated connection, so a
+    long export neither holds a pooled connection nor buffers the result.
+    """
     conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
+    try:
+        cur = conn.execute(EXPORT_QUERY.format(where=where), params)
+        while True:
+            batch = cur.fetchmany(EXPORT_BATCH_SIZE)
+            if not batch:
+                break
+            yield batch
+    finally:
+        conn.close()
 
-    query = """
-    WITH pending_counts AS (
-        SELECT
-            g.group_id,
-            g.group_name,
-            m.module_id,
-            m.module_name,
-            COUNT(o.id) AS pending_count
-        FROM observations o
-        JOIN modules m ON o.module_id = m.module_id
-        JOIN module_groups g ON m.group_id = g.group_id
-        WHERE o.status IN ('OPEN', 'RESURFACED')
-        GROUP BY g.group_id, m.module_id
-    )
-    SELECT
-        o.id               AS id,
-        o.observation      AS observation,
-        g.group_name       AS group_name,
-        m.module_name      AS module_name,
-        o.criticality      AS criticality,
-        o.status           AS status,
-        o.timestamp        AS timestamp,
-        IFNULL(pc.pending_count, 0) AS module_pending
+def stream_csv(batches):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_ndjson(batches):
+    for batch in batches:
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n' for row in batch)
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+@app.route('/api/observations/export')
+def export_observations():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'format must be csv or ndjson'}), 400
+    try:
+        where, params = build_observation_filter(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    writer, mimetype = EXPORT_FORMATS[fmt]
+    suffix = f"_{request.args['from_date']}_{request.args['to_date']}" if request.args.get('from_date') else ''
+    response = Response(writer(iter_export_rows(where, params)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="navyojana_observations{suffix}.{fmt}"'
+    return response
+
+# ========== SEARCH ==========
+SEARCH_LIMIT_DEFAULT = 50
+SEARCH_LIMIT_MAX = 200
+SEARCH_MAX_TERMS = 12
+SNIPPET_OPEN, SNIPPET_CLOSE = '\x02', '\x03'   # replaced by <mark> after HTML-escaping
+
+SEARCH_COLUMNS = "o.id, o.observation, o.module_id, m.module_name, g.group_name, o.criticality, o.status, o.timestamp"
+
+SEARCH_FTS_QUERY = f"""
+    SELECT {SEARCH_COLUMNS},
+           snippet(observations_fts, 0, char(2), char(3), '…', 24) AS snippet
+    FROM observations_fts
+    JOIN observations o ON o.id = observations_fts.rowid
+    JOIN modules m ON o.module_id = m.module_id
+    JOIN module_groups g ON m.group_id = g.group_id
+    WHERE observations_fts MATCH ? AND {{where}}
+    ORDER BY bm25(observations_fts), o.id DESC
+    LIMIT ?
+"""
+
+# Used when SQLite has no FTS5: same filters, newest first, no ranking.
+SEARCH_LIKE_QUERY = f"""
+    SELECT {SEARCH_COLUMNS}, o.observation AS snippet
     FROM observations o
     JOIN modules m ON o.module_id = m.module_id
     JOIN module_groups g ON m.group_id = g.group_id
-    LEFT JOIN pending_counts pc
-           ON pc.module_id = m.module_id
-    WHERE date(o.timestamp) BETWEEN ? AND ?
-    ORDER BY
-        (
-          SELECT SUM(pending_count)
-          FROM pending_counts
-          WHERE group_id = g.group_id
-        ) DESC,
-        module_pending DESC,
-        o.timestamp DESC;
-    """
-
-    rows = conn.execute(query, (from_date, to_date)).fetchall()
-    conn.close()
+    WHERE {{terms}} AND {{where}}
+    ORDER BY o.timestamp DESC, o.id DESC
+    LIMIT ?
+"""
 
-    return jsonify({
-        'success': True,
-        'data': [dict(row) for row in rows]
-    })
+_search_has_fts = None
 
-@app.route('/api/charts/criticality-trend')
-def criticality_trend():
-    conn = get_db_connection()
+def search_has_fts(conn):
+    global _search_has_fts
+    if _search_has_fts is None:
+        _search_has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'observations_fts'").fetchone() is not None
+    return _search_has_fts
 
-    query = """
-    SELECT
-  date(timestamp) AS obs_date,
-  criticality,
-  COUNT(*) AS count
-FROM observations
-WHERE date(timestamp) >= date('now', '-6 days')
-GROUP BY obs_date, criticality
-ORDER BY obs_date;
+def search_terms(q):
+    """
+    Words of a search box query. Each becomes a quoted FTS5 phrase (so user
+    input can never be parsed as FTS5 syntax) and the last one also matches
+    as a prefix, for search-as-you-type.
     """
+    return re.findall(r'\w+', q)[:SEARCH_MAX_TERMS]
 
-    rows = conn.execute(query).fetchall()
-    conn.close()
+def fts_match_expression(terms):
+    phrases = [f'"{t}"' for t in terms]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+def highlight_snippet(snippet):
+    return html.escape(snippet).replace(SNIPPET_OPEN, '<mark>').replace(SNIPPET_CLOSE, '</mark>')
+
+@app.route('/api/observations/search')
+def search_observations():
+    terms = search_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({'success': False, 'error': 'q must contain at least one word'}), 400
+    try:
+        limit = int(request.args.get('limit', SEARCH_LIMIT_DEFAULT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= SEARCH_LIMIT_MAX:
+        return jsonify({'success': False, 'error': f'limit must be between 1 and {SEARCH_LIMIT_MAX}'}), 400
+    try:
+        where, params = build_observation_filter(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    conn = get_db()
+    if search_has_fts(conn):
+        engine = 'fts5'
+        rows = conn.execute(SEARCH_FTS_QUERY.format(where=where), (fts_match_expression(terms), *params, limit)).fetchall()
+    else:
+        engine = 'like'
+        like = ' AND '.join(["o.observation LIKE ? ESCAPE '\\'"] * len(terms))
+        patterns = ['%' + re.sub(r'([%_\\])', r'\\\1', t) + '%' for t in terms]
+        rows = conn.execute(SEARCH_LIKE_QUERY.format(terms=like, where=where), (*patterns, *params, limit)).fetchall()
+    data = [{**{k: r[k] for k in r.keys() if k != 'snippet'}, 'snippet': highlight_snippet(r['snippet'])} for r in rows]
+    return jsonify({'success': True, 'engine': engine, 'count': len(data), 'data': data})
+
+# ========== DUPLICATE DETECTION ==========
+# Each observation gets a MinHash signature over character shingles of its
+# normalised text; MINHASH_PERMUTATIONS 32-bit lanes of one SHAKE-128 digest
+# act as the independent hash functions. Signatures are split into LSH_BANDS
+# bands and each band hashed to a bucket per module, so likely duplicates are
+# found with a few index seeks instead of comparing against every row.
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16                # 16 bands x 4 rows: pairs above ~0.5 similarity usually share a bucket
+LSH_MAX_BUCKET = 200          # batch clustering skips buckets larger than this (boilerplate text)
+DUPLICATE_THRESHOLD = 0.6     # estimated Jaccard similarity reported as a likely duplicate
+DUPLICATE_LIMIT = 5
+_SIGNATURE = struct.Struct(f'<{MINHASH_PERMUTATIONS}I')
+_BAND_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+SIMILAR_CANDIDATES_QUERY = """
+    SELECT o.id, o.observation, o.criticality, o.status, o.timestamp, s.signature
+    FROM observation_signatures s JOIN observations o ON o.id = s.observation_id
+    WHERE s.observation_id IN (SELECT observation_id FROM observation_lsh WHERE module_id = ? AND bucket IN ({buckets}))
+"""
+
+def minhash_signature(text):
+    normalised = ' '.join(re.findall(r'\w+', text.lower()))
+    if len(normalised) <= SHINGLE_SIZE:
+        shingles = {normalised}
+    else:
+        shingles = {normalised[i:i + SHINGLE_SIZE] for i in range(len(normalised) - SHINGLE_SIZE + 1)}
+    lanes = [_SIGNATURE.unpack(hashlib.shake_128(s.encode()).digest(_SIGNATURE.size)) for s in shingles]
+    return _SIGNATURE.pack(*map(min, zip(*lanes)))
+
+def lsh_buckets(signature):
+    """One bucket id per band; the band number is hashed in so bands never collide."""
+    step = _BAND_ROWS * 4
+    return [int.from_bytes(hashlib.blake2b(bytes([band]) + signature[band * step:(band + 1) * step], digest_size=7).digest(), 'big')
+            for band in range(LSH_BANDS)]
+
+def signature_similarity(a, b):
+    return sum(x == y for x, y in zip(_SIGNATURE.unpack(a), _SIGNATURE.unpack(b))) / MINHASH_PERMUTATIONS
+
+def index_signatures(conn, rows, buckets=None):
+    """
+    Store signatures and buckets for (observation_id, module_id, signature) rows;
+    caller commits. `buckets` is each row's lsh_buckets(), if already computed.
+    """
+    rows = list(rows)
+    if buckets is None:
+        buckets = [lsh_buckets(signature) for _, _, signature in rows]
+    conn.executemany("INSERT OR REPLACE INTO observation_signatures (observation_id, module_id, signature) VALUES (?, ?, ?)", rows)
+    conn.executemany("INSERT OR IGNORE INTO observation_lsh (module_id, bucket, observation_id) VALUES (?, ?, ?)",
+                     [(module_id, bucket, oid) for (oid, module_id, _), row_buckets in zip(rows, buckets) for bucket in row_buckets])
+
+def index_missing_signatures(conn, batch=1000):
+    """Index observations that have no signature yet. Returns how many were indexed."""
+    cursor = conn.execute("SELECT id, module_id, observation FROM observations o WHERE NOT EXISTS (SELECT 1 FROM observation_signatures s WHERE s.observation_id = o.id)")
+    total = 0
+    while True:
+        rows = cursor.fetchmany(batch)
+        if not rows:
+            break
+        index_signatures(conn, [(r['id'], r['module_id'], minhash_signature(r['observation'])) for r in rows])
+        total += len(rows)
+    conn.commit()
+    return total
+
+def find_similar(conn, module_id, signature, threshold=DUPLICATE_THRESHOLD, limit=DUPLICATE_LIMIT):
+    """Indexed observations in the module that look like `signature`, most similar first."""
+    buckets = lsh_buckets(signature)
+    query = SIMILAR_CANDIDATES_QUERY.format(buckets=','.join('?' * len(buckets)))
+    matches = []
+    for r in conn.execute(query, (module_id, *buckets)):
+        similarity = signature_similarity(signature, r['signature'])
+        if similarity >= threshold:
+            matches.append({'id': r['id'], 'observation': r['observation'], 'criticality': r['criticality'],
+                            'status': r['status'], 'timestamp': r['timestamp'], 'similarity': round(similarity, 2)})
+    matches.sort(key=lambda m: (-m['similarity'], -m['id']))
+    return matches[:limit]
+
+def cluster_duplicates(conn, module_id=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    Group indexed observations into clusters of likely duplicates (union-find
+    over bucket-mates whose signatures agree). Returns lists of ids, largest first.
+    """
+    where, params = ("WHERE module_id = ?", (module_id,)) if module_id is not None else ("", ())
+    signatures = {r[0]: r[1] for r in conn.execute(f"SELECT observation_id, signature FROM observation_signatures {where}", params)}
+    parent = {}
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    buckets = conn.execute(f"SELECT group_concat(observation_id) FROM observation_lsh {where} GROUP BY module_id, bucket HAVING COUNT(*) BETWEEN 2 AND ?", (*params, LSH_MAX_BUCKET))
+    for (members,) in buckets:
+        ids = [int(i) for i in members.split(',')]
+        for oid in ids:
+            parent.setdefault(oid, oid)
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                ra, rb = find(a), find(b)
+                if ra != rb and signature_similarity(signatures[a], signatures[b]) >= threshold:
+                    parent[max(ra, rb)] = min(ra, rb)
+    clusters = {}
+    for oid in parent:
+        clusters.setdefault(find(oid), []).append(oid)
+    return sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids[0]))
+
+@app.route('/api/observations/duplicates')
+def duplicate_clusters():
+    """Clusters of likely duplicate observations, optionally for one module_id."""
+    module_id = request.args.get('module_id')
+    if module_id is not None and not module_id.isdigit():
+        return jsonify({'success': False, 'error': 'module_id must be a number'}), 400
+    conn = get_db()
+    clusters = cluster_duplicates(conn, int(module_id) if module_id else None)
+    ids = [oid for ids in clusters for oid in ids]
+    rows = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        for r in conn.execute(f"SELECT o.id, o.observation, o.module_id, m.module_name, o.criticality, o.status, o.timestamp FROM observations o JOIN modules m ON o.module_id = m.module_id WHERE o.id IN ({','.join('?' * len(chunk))})", chunk):
+            rows[r['id']] = dict(r)
+    unindexed = conn.execute("SELECT (SELECT COUNT(*) FROM observations) - (SELECT COUNT(*) FROM observation_signatures)").fetchone()[0]
+    return jsonify({'success': True, 'unindexed': unindexed, 'clusters': [[rows[oid] for oid in ids if oid in rows] for ids in clusters]})
+
+# ========== CHARTS ==========
+# Chart windows are "<n>d", "<n>w" or "<n>m" ending today (UTC, like
+# CURRENT_TIMESTAMP); buckets are grouped in SQL by the first day of the
+# day/ISO week/month they fall in.
+CHART_WINDOW_LIMITS = {'d': 366, 'w': 104, 'm': 36}
+CHART_DEFAULT_BUCKET = {'d': 'day', 'w': 'week', 'm': 'month'}
+CHART_BUCKETS = {
+    'day': "stat_date",
+    'week': "date(stat_date, '-' || ((CAST(strftime('%w', stat_date) AS INTEGER) + 6) % 7) || ' days')",
+    'month': "strftime('%Y-%m-01', stat_date)",
+}
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+def bucket_label(day, bucket):
+    if bucket == 'week':
+        iso_year, iso_week, _ = day.isocalendar()
+        return week_label(f"{iso_year}-{iso_week}")
+    if bucket == 'month':
+        return day.strftime('%b %Y')
+    return day.isoformat()
+
+def parse_chart_window(args):
+    """
+    Resolve ?window= and ?bucket= into (start_date, bucket, bucket_keys, labels).
+    Raises ValueError for unknown or out-of-range values.
+    """
+    match = re.fullmatch(r'(\d+)([dwm])', args.get('window', '7d'))
+    if not match:
+        raise ValueError('window must look like 7d, 12w or 6m')
+    count, unit = int(match.group(1)), match.group(2)
+    if not 1 <= count <= CHART_WINDOW_LIMITS[unit]:
+        raise ValueError(f"window must be between 1{unit} and {CHART_WINDOW_LIMITS[unit]}{unit}")
+    bucket = args.get('bucket', CHART_DEFAULT_BUCKET[unit])
+    if bucket not in CHART_BUCKETS:
+        raise ValueError('bucket must be day, week or month')
+    today = datetime.now(timezone.utc).date()
+    if unit == 'd':
+        start = today - timedelta(days=count - 1)
+    elif unit == 'w':
+        start = bucket_start(today, 'week') - timedelta(weeks=count - 1)
+    else:
+        start = bucket_start(today, 'month')
+        for _ in range(count - 1):
+            start = (start - timedelta(days=1)).replace(day=1)
+    start = bucket_start(start, bucket)  # count the first bucket in full, as its label says
+    keys, labels = [], []
+    day = start
+    while day <= today:
+        keys.append(day.isoformat())
+        labels.append(bucket_label(day, bucket))
+        day = next_bucket(day, bucket)
+    return start.isoformat(), bucket, keys, labels
+
+CRITICALITY_TREND_QUERY = """
+SELECT
+  {bucket} AS bucket,
+  criticality,
+  SUM(count) AS count
+FROM daily_observation_stats
+WHERE stat_date >= ?
+  AND transition = 'NEW'
+GROUP BY bucket, criticality;
+"""
+
+@app.route('/api/charts/criticality-trend')
+@cached_response(daily=True)
+def criticality_trend():
+    try:
+        start, bucket, keys, labels = parse_chart_window(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    conn = get_db()
 
-    data = {}
+    rows = conn.execute(CRITICALITY_TREND_QUERY.format(bucket=CHART_BUCKETS[bucket]), (start,)).fetchall()
+
+    data = {k: {'Vital': 0, 'Essential': 0, 'Desirable': 0} for k in keys}
     for r in rows:
-        date = r['obs_date']
-        crit = r['criticality']
-        data.setdefault(date, {'Vital': 0, 'Essential': 0, 'Desirable': 0})
-        data[date][crit] = r['count']
+        if r['bucket'] in data:
+            data[r['bucket']][r['criticality']] = r['count']
 
     return jsonify({
-        'labels': list(data.keys()),
+        'labels': labels,
         'vital': [v['Vital'] for v in data.values()],
         'essential': [v['Essential'] for v in data.values()],
         'desirable': [v['Desirable'] for v in data.values()]
@@ -1363,32 +3003,37 @@ ORDER BY obs_date;
 
 
 
-@app.route('/api/charts/vital-module-trend')
-def vital_module_trend():
-    conn = get_db_connection()
-
-    query = """
+VITAL_MODULE_TREND_QUERY = """
 SELECT
-  date(o.timestamp) AS obs_date,
+  {bucket} AS bucket,
   m.module_name,
-  COUNT(*) AS count
-FROM observations o
-JOIN modules m ON o.module_id = m.module_id
-WHERE o.criticality = 'Vital'
-  AND date(o.timestamp) >= date('now', '-6 days')
-GROUP BY obs_date, m.module_name
-ORDER BY obs_date;
-    """
+  SUM(daily_observation_stats.count) AS count
+FROM daily_observation_stats
+JOIN modules m ON daily_observation_stats.module_id = m.module_id
+WHERE daily_observation_stats.stat_date >= ?
+  AND daily_observation_stats.transition = 'NEW'
+  AND daily_observation_stats.criticality = 'Vital'
+GROUP BY bucket, m.module_name
+ORDER BY bucket, m.module_name;
+"""
 
-    rows = conn.execute(query).fetchall()
-    conn.close()
+@app.route('/api/charts/vital-module-trend')
+@cached_response(daily=True)
+def vital_module_trend():
+    try:
+        start, bucket, keys, labels = parse_chart_window(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    conn = get_db()
+
+    rows = conn.execute(VITAL_MODULE_TREND_QUERY.format(bucket=CHART_BUCKETS[bucket]), (start,)).fetchall()
 
-    labels = sorted({r['obs_date'] for r in rows})
     modules = {}
 
     for r in rows:
-        modules.setdefault(r['module_name'], {d: 0 for d in labels})
-        modules[r['module_name']][r['obs_date']] = r['count']
+        modules.setdefault(r['module_name'], dict.fromkeys(keys, 0))
+        if r['bucket'] in modules[r['module_name']]:
+            modules[r['module_name']][r['bucket']] = r['count']
 
     datasets = [
         {
@@ -1404,9 +3049,144 @@ ORDER BY obs_date;
     })
 
 
+# ========== QUERY PLAN CHECKS ==========
+# Every observation query served by an endpoint, with representative
+# parameters. `python app.py check-plans` fails if any of them falls back to
+# a full scan of the observations table or the daily rollup.
+_SAMPLE_RANGE = {'from_ts': '2025-01-01 00:00:00', 'to_ts': '2025-02-01 00:00:00'}
+QUERY_PLAN_CHECKS = [
+    ('/api/reports/detailed (module stats)', REPORT_MODULE_STATS_QUERY, _SAMPLE_RANGE),
+    ('/api/reports/detailed (pending as of)', PENDING_AS_OF_QUERY, {'ts': '2025-01-01 00:00:00', 'criticality': 'Vital'}),
+    ('/api/reports/detailed (snapshot fill)', SNAPSHOT_EXTEND_QUERY, ('2025-01-01', '2025-02-01')),
+    ('/api/observations/<id>/history', OBSERVATION_HISTORY_QUERY, (1,)),
+    ('/api/reports/detailed (areas of concern)', REPORT_VITAL_OBSERVATIONS_QUERY, ()),
+    ('/api/reports/vital-details (identified)', VITAL_IDENTIFIED_QUERY, _SAMPLE_RANGE),
+    ('/api/reports/vital-details (resolved)', VITAL_RESOLVED_QUERY, _SAMPLE_RANGE),
+    ('/api/reports/pdf (areas of concern)', PDF_CONCERNS_QUERY, {'limit': 10}),
+    ('/api/reports/pdf (appendix)', PDF_APPENDIX_QUERY, {'group_id': 1, 'limit': 10}),
+    ('/api/observations/pending/count', PENDING_COUNT_QUERY, ()),
+    ('/api/observations/closed', CLOSED_BY_MODULE_QUERY, (1,)),
+    ('/api/observations/open-resurfaced', OPEN_RESURFACED_BY_MODULE_QUERY, (1,)),
+    ('/api/observations/range (module order)', MODULE_PENDING_ORDER_QUERY, ()),
+    ('/api/observations/range (total)', RANGE_COUNT_QUERY, tuple(_SAMPLE_RANGE.values())),
+    ('/api/observations/range (page)', RANGE_PAGE_QUERY.format(columns=', observation, criticality, status'), (1, *_SAMPLE_RANGE.values(), '2025-02-01 00:00:00', '2025-02-01 00:00:00', 0, 500)),
+    ('/api/observations/search', SEARCH_FTS_QUERY.format(where="o.status IN (?)"), ('"pump"*', 'OPEN', 50)),
+    ('/save (duplicate candidates)', SIMILAR_CANDIDATES_QUERY.format(buckets='?,?'), (1, 1, 2)),
+    ('/api/observations/export', EXPORT_QUERY.format(where="o.timestamp >= ? AND o.timestamp < ? AND o.status IN (?)"), (*_SAMPLE_RANGE.values(), 'OPEN')),
+    ('/api/charts/criticality-trend', CRITICALITY_TREND_QUERY.format(bucket=CHART_BUCKETS['week']), ('2025-01-01',)),
+    ('/api/charts/vital-module-trend', VITAL_MODULE_TREND_QUERY.format(bucket=CHART_BUCKETS['week']), ('2025-01-01',)),
+]
+
+_OBSERVATIONS_SCAN = re.compile(r'^SCAN (TABLE )?(observations|o|daily_observation_stats|observation_events)\b')
+
+def find_observation_scans(conn):
+    """Return (endpoint, plan detail) for every plan step that scans observations."""
+    scans = []
+    for name, query, params in QUERY_PLAN_CHECKS:
+        for step in conn.execute(f"EXPLAIN QUERY PLAN {query}", params):
+            if _OBSERVATIONS_SCAN.match(step['detail']):
+                scans.append((name, step['detail']))
+    return scans
+
+def check_query_plans():
+    conn = get_db_connection()
+    scans = find_observation_scans(conn)
+    conn.close()
+    for name, detail in scans:
+        print(f"FULL SCAN  {name}: {detail}")
+    print(f"{len(QUERY_PLAN_CHECKS)} queries checked, {len(scans)} full scans of observations")
+    return 1 if scans else 0
 
-if __name__ == '__main__':
+# ========== WSGI ==========
+# wsgi.py serves create_app() under gunicorn (gunicorn.conf.py) or waitress.
+# With preload the master imports the app and initialises the database once,
+# then forks; each worker calls reset_process_state() before its first request.
+
+def create_app():
+    """
+    The application, with the database initialised exactly once: the first
+    process to get here creates the schema and applies migrations under a
+    file lock, later ones find user_version current and skip it.
+    """
+    with open(f"{DB_PATH}.init.lock", 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        conn = get_db_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        if version < SCHEMA_MIGRATIONS[-1][0]:
+            init_database()
+    return app
+
+def reset_process_state(threads=None):
+    """
+    Give a freshly forked worker its own connections, threads and caches.
+    SQLite connections must not be used across fork(), and threads (the live
+    feed poller, the snapshot filler, the report job pool) do not survive it.
+    threads is the worker's real request thread count, when the server knows
+    it better than ERP_THREADS; the live stream limit follows it.
+    """
+    global db_pool, response_cache, pdf_cache, report_jobs, live_feed, snapshot_filler
+    db_pool = ConnectionPool(DB_POOL_SIZE)
+    response_cache = ResponseCache(make_cache_backend(RESPONSE_CACHE_BACKEND))
+    pdf_cache = PdfCache(PDF_CACHE_DIR, PDF_CACHE_MAX_FILES)
+    report_jobs = ReportJobQueue(REPORT_JOB_WORKERS, REPORT_JOB_MAX_PENDING)
+    max_streams = LIVE_MAX_SUBSCRIBERS if threads is None or 'ERP_LIVE_MAX_STREAMS' in os.environ else live_stream_capacity(threads)
+    live_feed = LiveFeed(max_streams)
+    snapshot_filler = SnapshotFiller()
+    report_memo.clear()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ERP Monitoring Platform')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('serve', help='initialise the database and start the development server (default); see wsgi.py for production')
+    sub.add_parser('check-plans', help='fail if an endpoint query does a full scan of observations')
+    sub.add_parser('rebuild-stats', help='regenerate daily_observation_stats, pending_counters and pending snapshots from observation history')
+    sub.add_parser('check-consistency', help='fail if any derived table disagrees with the observations')
+    sub.add_parser('build-assets', help='write precompressed .gz/.br variants of the static assets')
+    duplicates = sub.add_parser('find-duplicates', help='index observation signatures and list clusters of likely duplicates')
+    duplicates.add_argument('--module-id', type=int)
+    duplicates.add_argument('--threshold', type=float, default=DUPLICATE_THRESHOLD)
+    args = parser.parse_args(argv)
+    if args.command == 'build-assets':
+        saved = build_assets()
+        print(f"{saved} bytes saved{'' if brotli else ' (gzip only: install brotli for .br variants)'}")
+        return 0
     init_database()
-    print(f"Starting ERP Monitoring Platform on port {PORT}")
+    if args.command == 'check-plans':
+        return check_query_plans()
+    if args.command == 'rebuild-stats':
+        conn = get_db_connection()
+        rows = rebuild_daily_stats(conn)
+        pending = rebuild_pending_counters(conn)
+        days = rebuild_pending_snapshots(conn)
+        conn.close()
+        print(f"daily_observation_stats rebuilt: {rows} rows")
+        print(f"pending_counters rebuilt: {pending} pending observations")
+        print(f"pending_snapshots rebuilt: {days} days")
+        return 0
+    if args.command == 'check-consistency':
+        conn = get_db_connection()
+        problems = check_consistency(conn)
+        conn.close()
+        for table, problem in problems:
+            print(f"MISMATCH  {table}: {problem}")
+        print(f"{len(problems)} mismatches between derived tables and observations")
+        return 1 if problems else 0
+    if args.command == 'find-duplicates':
+        conn = get_db_connection()
+        print(f"Indexed {index_missing_signatures(conn)} new observations")
+        clusters = cluster_duplicates(conn, args.module_id, args.threshold)
+        for ids in clusters:
+            first = conn.execute("SELECT module_id, observation FROM observations WHERE id = ?", (ids[0],)).fetchone()
+            print(f"module {first['module_id']}: {len(ids)} observations {ids} e.g. {first['observation'][:60]!r}")
+        print(f"{len(clusters)} clusters of likely duplicates")
+        conn.close()
+        return 0
+    print(f"Starting ERP Monitoring Platform on port {PORT} (development server: use gunicorn -c gunicorn.conf.py wsgi:app in production)")
     print(f"Access at: http://140.245.12.117:{PORT}")
-    app.run(host='0.0.0.0', port=PORT, debug=DEBUG)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=PORT, debug=DEBUG)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+Performance benchmarks for the ERP Monitoring Platform.
+Each benchmark builds a throw-away database with synthetic observations,
+so it never touches erp_observations.db.
+
+Usage: python bench.py report [--sizes 1000 10000 100000]
+       python bench.py pdf [--sizes 1000 10000]
+       python bench.py compression [--size 100000]
+       python bench.py columnar [--size 100000]
+       python bench.py concurrency [--servers flask waitress gunicorn] [--clients 1 8 32]
+"""
+
+# -*- coding: utf-8 -*-
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import TableStyle
+
+import app as navyojana
+
+CRITICALITIES = ['Vital', 'Essential', 'Desirable']
+STATUSES = ['OPEN', 'CLOSED', 'RESURFACED']
+HISTORY_START = datetime(2023, 1, 1)
+HISTORY_DAYS = 3 * 365
+
+# ========== SYNTHETIC DATA ==========
+def make_bench_db(n, seed=42):
+    """
+    Create a temporary database seeded with n observations spread over three
+    years of history. Returns the database path; the caller removes it.
+    """
+    fd, path = tempfile.mkstemp(prefix='navyojana_bench_', suffix='.db')
+    os.close(fd)
+    navyojana.DB_PATH = path
+    navyojana.db_pool = navyojana.ConnectionPool(navyojana.DB_POOL_SIZE)  # drop connections to the previous database
+    navyojana.init_database()
+    rnd = random.Random(seed)
+    fmt = lambda d: d.strftime('%Y-%m-%d %H:%M:%S') if d else None
+    rows = []
+    for i in range(n):
+        ts = HISTORY_START + timedelta(seconds=rnd.randint(0, HISTORY_DAYS * 86400))
+        status = rnd.choice(STATUSES)
+        closed_on = ts + timedelta(days=rnd.randint(0, 60)) if status != 'OPEN' else None
+        resurfaced_on = closed_on + timedelta(days=rnd.randint(0, 30)) if status == 'RESURFACED' else None
+        rows.append((f"Synthetic observation {i}: defect reported in workflow step {rnd.randint(1, 40)}",
+                     rnd.randint(1, 25), rnd.choice(CRITICALITIES), status, fmt(ts), fmt(closed_on), fmt(resurfaced_on)))
+    conn = navyojana.get_db_connection()
+    conn.executemany("INSERT INTO observations (observation, module_id, criticality, status, timestamp, closed_on, resurfaced_on) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return path
+
+def timed(fn, repeat):
+    """Best-of-`repeat` wall time of fn() in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+# ========== BENCHMARKS ==========
+def bench_report(sizes, repeat):
+    """Latency of the detailed report against the number of observations."""
+    print(f"{'observations':>12} | {'1 month':>10} | {'1 year':>10} | {'full history':>12}")
+    ranges = [('2025-06-01', '2025-06-30'), ('2025-01-01', '2025-12-31'), ('2023-01-01', '2025-12-31')]
+    for n in sizes:
+        path = make_bench_db(n)
+        try:
+            conn = navyojana.get_db_connection()
+            results = [timed(lambda: navyojana.build_detailed_report(conn, f, t), repeat) for f, t in ranges]
+            conn.close()
+        finally:
+            os.remove(path)
+        print(f"{n:>12} | {results[0]:>8.1f}ms | {results[1]:>8.1f}ms | {results[2]:>10.1f}ms")
+
+def legacy_style_setup(module_count, group_count):
+    """The styles the PDF brief allocated per call before the style registry."""
+    styles = getSampleStyleSheet()
+    ParagraphStyle('CustomTitle', parent=styles['Title'], fontSize=16, spaceAfter=20, alignment=TA_CENTER)
+    ParagraphStyle('CustomSubtitle', parent=styles['Heading2'], fontSize=12, spaceAfter=12, alignment=TA_CENTER)
+    ParagraphStyle('CustomBold', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=11, spaceAfter=8)
+    normal = ParagraphStyle('CustomNormal', parent=styles['Normal'], fontSize=9, alignment=TA_LEFT, leading=10)
+    for _ in range(module_count):
+        ParagraphStyle('ModName', parent=normal, fontSize=8, alignment=TA_LEFT)
+    for _ in range(group_count + 3):
+        TableStyle([('BACKGROUND', (0,0), (-1,0), colors.lightgrey), ('GRID', (0,0), (-1,-1), 1, colors.black),
+                    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'), ('FONTSIZE', (0,0), (-1,-1), 8),
+                    ('ALIGN', (1,0), (-1,-1), 'CENTER'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+                    ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.lightgrey])])
+
+def allocated(fn):
+    """Bytes allocated (peak) while running fn()."""
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def bench_pdf(sizes, repeat):
+    """PDF brief build time and allocations, and what the style registry saves per build."""
+    legacy = lambda: legacy_style_setup(25, 4)
+    print(f"style setup per build: {timed(legacy, repeat * 20):.2f}ms, {allocated(legacy) / 1024:.0f} KiB before the registry; 0 with PDF_STYLES")
+    print(f"{'observations':>12} | {'mode':>8} | {'build':>10} | {'peak alloc':>10} | {'size':>8}")
+    modes = [('summary', {}), ('appendix', {'appendix': True})]
+    for n in sizes:
+        path = make_bench_db(n)
+        try:
+            with navyojana.app.app_context():
+                for mode, options in modes:
+                    render = lambda: navyojana.render_report_pdf('2023-01-01', '2025-12-31', **options)
+                    render()  # warm the report memo so only the PDF build is timed
+                    build_ms = timed(render, repeat)
+                    peak = allocated(render)
+                    size = len(render())
+                    print(f"{n:>12} | {mode:>8} | {build_ms:>8.1f}ms | {peak / 1048576:>7.1f}MiB | {size / 1024:>6.0f}KiB")
+        finally:
+            os.remove(path)
+
+COMPRESSION_LEVELS = {'gzip': [1, 6, 9], 'br': [1, 4, 6, 9], 'zstd': [1, 3, 9, 15]}
+
+def report_payloads(client):
+    """Identity-encoded bodies of the endpoints that cross the WAN most."""
+    year = {'from_date': '2025-01-01', 'to_date': '2025-12-31'}
+    plain = {'Accept-Encoding': 'identity'}
+    return [
+        ('reports/detailed (3y)', client.post('/api/reports/detailed', json={'from_date': '2023-01-01', 'to_date': '2025-12-31'}, headers=plain).get_data()),
+        ('observations/range', client.post('/api/observations/range', json={**year, 'limit': 5000}, headers=plain).get_data()),
+        ('export ndjson (1y)', client.get('/api/observations/export?format=ndjson&from_date=2025-01-01&to_date=2025-12-31', headers=plain).get_data()),
+        ('export csv (1y)', client.get('/api/observations/export?format=csv&from_date=2025-01-01&to_date=2025-12-31', headers=plain).get_data()),
+        ('reports/pdf (1y)', client.get('/api/reports/pdf?from_date=2025-01-01&to_date=2025-12-31', headers=plain).get_data()),
+    ]
+
+def bench_compression(size, repeat):
+    """CPU time against bytes saved for each available encoding and level on realistic payloads."""
+    path = make_bench_db(size)
+    try:
+        payloads = report_payloads(navyojana.app.test_client())
+    finally:
+        os.remove(path)
+    print(f"{'payload':>22} | {'encoding':>8} | {'bytes':>9} | {'ratio':>6} | {'time':>9} | {'MB/s':>7}")
+    for name, data in payloads:
+        print(f"{name:>22} | {'identity':>8} | {len(data):>9} | {1:>6.2f} | {'':>9} | {'':>7}")
+        for encoding, levels in COMPRESSION_LEVELS.items():
+            if encoding not in navyojana.COMPRESSORS:
+                continue
+            for level in levels:
+                out = navyojana.compress_bytes(data, encoding, level)
+                ms = timed(lambda: navyojana.compress_bytes(data, encoding, level), repeat)
+                label = f"{encoding}-{level}{'*' if level == navyojana.COMPRESS_LEVELS[encoding] else ''}"
+                print(f"{name:>22} | {label:>8} | {len(out):>9} | {len(data) / len(out):>6.2f} | {ms:>7.2f}ms | {len(data) / ms / 1000:>7.0f}")
+    print("* default level; set ERP_GZIP_LEVEL, ERP_BROTLI_QUALITY, ERP_ZSTD_LEVEL to change")
+
+COLUMNAR_REQUESTS = [
+    ('observations/range', '/api/observations/range', {'from_date': '2023-01-01', 'to_date': '2025-12-31', 'limit': 5000}),
+    ('reports/detailed (3y)', '/api/reports/detailed', {'from_date': '2023-01-01', 'to_date': '2025-12-31'}),
+    ('reports/vital-details', '/api/reports/vital-details', {'from_date': '2023-01-01', 'to_date': '2025-12-31'}),
+]
+
+def bench_columnar(size, repeat):
+    """Body size and response time of format=json against format=columnar, before and after gzip."""
+    path = make_bench_db(size)
+    try:
+        client = navyojana.app.test_client()
+        plain = {'Accept-Encoding': 'identity'}
+        print(f"JSON serializer: {'orjson' if navyojana.orjson else 'json'}")
+        print(f"{'payload':>22} | {'format':>8} | {'bytes':>9} | {'gzip-6':>8} | {'time':>9}")
+        for name, url, body in COLUMNAR_REQUESTS:
+            sizes = {}
+            for fmt in navyojana.RESPONSE_FORMATS:
+                def post():
+                    navyojana.response_cache.clear()  # time the encoding, not a cache hit
+                    return client.post(url, json={**body, 'format': fmt}, headers=plain).get_data()
+                data = post()
+                ms = timed(post, repeat)
+                sizes[fmt] = len(data)
+                print(f"{name:>22} | {fmt:>8} | {len(data):>9} | {len(navyojana.compress_bytes(data, 'gzip')):>8} | {ms:>7.1f}ms")
+            print(f"{'':>22} | {'ratio':>8} | {sizes['json'] / sizes['columnar']:>8.1f}x |")
+    finally:
+        os.remove(path)
+
+# A dashboard session: counters and charts (response-cached), the monthly
+# report (memoised) and a page of the range table (always queried).
+CONCURRENCY_MIX = [
+    ('GET', '/api/observations/pending/count', None),
+    ('GET', '/api/charts/criticality-trend', None),
+    ('POST', '/api/reports/detailed', {'from_date': '2025-06-01', 'to_date': '2025-06-30'}),
+    ('POST', '/api/observations/range', {'from_date': '2025-06-01', 'to_date': '2025-06-30', 'limit': 100}),
+]
+CONCURRENCY_SERVERS = {
+    'flask': [sys.executable, 'app.py'],
+    'waitress': [sys.executable, 'wsgi.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+}
+CONCURRENCY_PORT = 5099
+
+def start_server(name, db_path):
+    """Launch one of CONCURRENCY_SERVERS on CONCURRENCY_PORT against db_path; returns the process once it answers."""
+    env = {**os.environ, 'ERP_DB_PATH': db_path, 'ERP_PORT': str(CONCURRENCY_PORT), 'ERP_HOST': '127.0.0.1'}
+    proc = subprocess.Popen(CONCURRENCY_SERVERS[name], cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{name} exited with status {proc.returncode} (is it installed?)")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', CONCURRENCY_PORT, timeout=1)
+            conn.request('GET', '/api/observations/pending/count')
+            conn.getresponse().read()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{name} did not start within 30s")
+
+def load(host, port, clients, duration):
+    """Run `clients` keep-alive clients through CONCURRENCY_MIX for `duration` seconds; returns (latencies in ms, errors)."""
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    def client(offset):
+        conn, reused = http.client.HTTPConnection(host, port, timeout=30), False
+        i = offset
+        while time.monotonic() < deadline:
+            method, path, body = CONCURRENCY_MIX[i % len(CONCURRENCY_MIX)]
+            i += 1
+            start = time.perf_counter()
+            for attempt in range(2):
+                try:
+                    conn.request(method, path, body=json.dumps(body) if body else None, headers={'Content-Type': 'application/json'})
+                    response = conn.getresponse()
+                    response.read()
+                    reused = True
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    # like a browser, retry once when a kept-alive connection was closed (e.g. by worker recycling)
+                    retry = reused and attempt == 0
+                    conn, reused = http.client.HTTPConnection(host, port, timeout=30), False
+                    if not retry:
+                        errors.append(type(e).__name__)
+                        response = None
+                        break
+            if response is None:
+                continue
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+        conn.close()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors
+
+def bench_concurrency(size, servers, clients, duration, url):
+    """Throughput and latency percentiles of each server setup against the number of concurrent clients."""
+    print(f"{'server':>9} | {'clients':>7} | {'req/s':>7} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'errors':>6}")
+    def report(name, n, latencies, errors):
+        latencies.sort()
+        pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float('nan')
+        print(f"{name:>9} | {n:>7} | {len(latencies) / duration:>7.0f} | {pct(0.5):>6.1f}ms | {pct(0.95):>6.1f}ms | {pct(0.99):>6.1f}ms | {len(errors):>6}")
+    if url:
+        host, _, port = url.split('//')[-1].rstrip('/').partition(':')
+        for n in clients:
+            report('external', n, *load(host, int(port or 80), n, duration))
+        return
+    path = make_bench_db(size)
+    try:
+        for name in servers:
+            proc = start_server(name, path)
+            try:
+                load('127.0.0.1', CONCURRENCY_PORT, 1, 1)  # warm caches and connections
+                for n in clients:
+                    report(name, n, *load('127.0.0.1', CONCURRENCY_PORT, n, duration))
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        os.remove(path)
+    print(f"load generator runs on this host ({os.cpu_count()} CPUs); use --url against a server elsewhere for clean numbers")
+
+def main():
+    parser = argparse.ArgumentParser(description='Navyojana performance benchmarks')
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+    report = sub.add_parser('report', help='detailed report latency vs observation count')
+    report.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    report.add_argument('--repeat', type=int, default=5)
+    pdf = sub.add_parser('pdf', help='PDF brief build time and allocations vs observation count')
+    pdf.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    pdf.add_argument('--repeat', type=int, default=3)
+    compression = sub.add_parser('compression', help='response compression CPU cost vs bytes saved')
+    compression.add_argument('--size', type=int, default=100000)
+    compression.add_argument('--repeat', type=int, default=5)
+    columnar = sub.add_parser('columnar', help='columnar vs row JSON payload size')
+    columnar.add_argument('--size', type=int, default=100000)
+    columnar.add_argument('--repeat', type=int, default=5)
+    concurrency = sub.add_parser('concurrency', help='throughput and latency of the dev server, waitress and gunicorn under concurrent clients')
+    concurrency.add_argument('--size', type=int, default=100000)
+    concurrency.add_argument('--servers', nargs='+', choices=sorted(CONCURRENCY_SERVERS), default=['flask', 'waitress', 'gunicorn'])
+    concurrency.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    concurrency.add_argument('--duration', type=float, default=10)
+    concurrency.add_argument('--url', help='load an already running server (e.g. http://host:5000) instead of starting one')
+    args = parser.parse_args()
+    if args.benchmark == 'report':
+        bench_report(args.sizes, args.repeat)
+    if args.benchmark == 'pdf':
+        bench_pdf(args.sizes, args.repeat)
+    if args.benchmark == 'compression':
+        bench_compression(args.size, args.repeat)
+    if args.benchmark == 'columnar':
+        bench_columnar(args.size, args.repeat)
+    if args.benchmark == 'concurrency':
+        bench_concurrency(args.size, args.servers, args.clients, args.duration, args.url)
+
+if __name__ == '__main__':
+    main()
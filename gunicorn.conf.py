@@ -0,0 +1,35 @@
+"""
+gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app
+Override with the ERP_* variables below or with GUNICORN_CMD_ARGS.
+"""
+
+import os
+
+bind = f"{os.environ.get('ERP_HOST', '0.0.0.0')}:{os.environ.get('ERP_PORT', 5000)}"
+workers = int(os.environ.get('ERP_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+worker_class = 'gthread'
+# Each open /api/stream holds one of these threads for its lifetime. The app
+# keeps ERP_DB_POOL_SIZE of them for API requests and answers 503 to streams
+# beyond the rest: 120 live dashboards per worker by default. An idle stream
+# thread costs memory (about 40 KB resident), not CPU.
+threads = int(os.environ.get('ERP_THREADS', 128))
+
+# Import the app and initialise the database once in the master, then fork:
+# workers start fast and share the imported code pages.
+preload_app = True
+
+# Recycle each worker after a bounded number of requests; the jitter keeps
+# workers from restarting together.
+max_requests = int(os.environ.get('ERP_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+# In-flight requests get graceful_timeout seconds to finish on reload (HUP)
+# or recycling. Open /api/stream responses are cut at that point and the
+# browsers reconnect to another worker.
+graceful_timeout = 30
+timeout = 60
+keepalive = 5
+
+def post_fork(server, worker):
+    import app
+    app.reset_process_state(threads=worker.cfg.threads)  # also right when --threads overrides ERP_THREADS
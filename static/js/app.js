@@ -0,0 +1,543 @@
+function updateTime() { document.getElementById('currentTime').textContent = new Date().toLocaleString('en-IN'); }
+updateTime(); setInterval(updateTime, 60000);
+async function saveObservation() {
+    const form = document.getElementById('observationForm');
+    const errorAlert = document.getElementById('errorAlert');
+    const successAlert = document.getElementById('successAlert');
+    errorAlert.classList.add('d-none'); successAlert.classList.add('d-none');
+    if (!form.checkValidity()) { form.reportValidity(); return; }
+    const data = { observation: form.observation.value, module_id: form.module_id.value, criticality: form.criticality.value, secret_code: form.secret_code.value, on_duplicate: 'check' };
+    if (data.secret_code !== 'CYERP') { errorAlert.textContent = 'Invalid code. Enter CYERP.'; errorAlert.classList.remove('d-none'); return; }
+    try {
+        let response = await fetch('/save', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) });
+        let result = await response.json();
+        if (response.status === 409 && result.duplicates) {
+            const best = result.duplicates[0];
+            const summary = `#${best.id} (${best.status}, ${Math.round(best.similarity * 100)}% similar): ${best.observation}`;
+            if (best.status === 'CLOSED' && confirm(`This looks like closed observation ${summary}\n\nMark #${best.id} as resurfaced instead of adding a new observation?`)) {
+                response = await fetch('/api/observations/resurface', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ ids: [best.id] }) });
+                result = await response.json();
+            } else if (confirm(best.status === 'CLOSED' ? `Add a new observation instead of resurfacing #${best.id}?` : `This looks like pending observation ${summary}\n\nAdd it anyway?`)) {
+                response = await fetch('/save', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ ...data, on_duplicate: 'insert' }) });
+                result = await response.json();
+            } else {
+                return;
+            }
+        }
+        if (result.success) {
+            successAlert.classList.remove('d-none'); form.reset(); updateTotalCount(); setTimeout(() => bootstrap.Modal.getInstance(document.getElementById('observationModal')).hide(), 2000);
+        } else { errorAlert.textContent = 'Error: ' + result.error; errorAlert.classList.remove('d-none'); }
+    } catch (error) { errorAlert.textContent = 'Server error.'; errorAlert.classList.remove('d-none'); }
+}
+async function updateTotalCount() {
+    if (liveFeed && liveFeed.readyState === EventSource.OPEN) return;  // the live feed keeps it current
+    try {
+        const response = await fetch('/api/observations/pending/count');
+        const data = await response.json();
+        if (data.success) document.getElementById('totalObservations').textContent = data.count;
+    } catch (error) { console.log('Count error:', error); }
+}
+async function loadInitialCount() { await updateTotalCount(); }
+let liveFeed = null;
+let chartRefresh = null;
+function connectLiveFeed() {
+    if (!window.EventSource) return;
+    liveFeed = new EventSource('/api/stream');
+    const apply = event => {
+        const update = JSON.parse(event.data);
+        document.getElementById('totalObservations').textContent = update.pending;
+        return update;
+    };
+    liveFeed.addEventListener('snapshot', apply);
+    // A 503 (no free stream on this worker) closes the EventSource for good: poll once and try again later.
+    liveFeed.onerror = () => {
+        if (liveFeed.readyState !== EventSource.CLOSED) return;
+        updateTotalCount();
+        setTimeout(connectLiveFeed, 30000);
+    };
+    liveFeed.addEventListener('delta', event => {
+        const update = apply(event);
+        // Reload an open close/resurface list for a module that changed, unless the user is mid-selection.
+        [['closeModule', 'closeList'], ['resurfaceModule', 'resurfaceList']].forEach(([selectId, listId]) => {
+            const select = document.getElementById(selectId);
+            if (select.value && select.value in update.modules && !document.querySelector(`#${listId} input:checked`)) select.dispatchEvent(new Event('change'));
+        });
+        if (update.new.length || update.closed.length || update.resurfaced.length || update.truncated) {
+            clearTimeout(chartRefresh);
+            chartRefresh = setTimeout(loadCharts, 5000);
+        }
+    });
+}
+loadInitialCount();
+connectLiveFeed();
+document.getElementById('observationModal').addEventListener('show.bs.modal', () => { document.getElementById('errorAlert').classList.add('d-none'); document.getElementById('successAlert').classList.add('d-none'); });
+
+async function generateReport() {
+    const fromDate = document.getElementById('reportFromDate').value;
+    const toDate = document.getElementById('reportToDate').value;
+    if (!fromDate || !toDate) { alert("Select both dates"); return; }
+    document.getElementById('pendingFromHeader').textContent = `Pending (${fromDate})`;
+    document.getElementById('pendingToHeader').textContent = `Pending (${toDate})`;
+    try {
+        const detailedResponse = await fetch('/api/reports/detailed', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ from_date: fromDate, to_date: toDate }) });
+        const detailedResult = await detailedResponse.json();
+        if (!detailedResult.success) { alert("Report error: " + (detailedResult.error || 'Unknown')); return; }
+        const vitalResponse = await fetch('/api/reports/vital-details', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ from_date: fromDate, to_date: toDate }) });
+        const vitalResult = await vitalResponse.json();
+        if (!vitalResult.success) { alert("Vital details error: " + (vitalResult.error || 'Unknown')); return; }
+        // Overall table
+        const tbody = document.getElementById('reportTableBody');
+        const tfoot = document.getElementById('reportGrandTotal');
+        const moduleTablesDiv = document.getElementById('moduleGroupTables');
+        const additionalSections = document.getElementById('additionalSections');
+        tbody.innerHTML = ''; tfoot.innerHTML = ''; moduleTablesDiv.innerHTML = ''; additionalSections.innerHTML = '';
+        detailedResult.overall_data.forEach(row => {
+            tbody.innerHTML += `<tr><td>${row.group}</td><td>${row.pending_from}</td><td>${row.resurfaced}</td><td>${row.new}</td><td>${row.resolved}</td><td>${row.pending_to}</td></tr>`;
+        });
+        const gt = detailedResult.grand_total;
+        tfoot.innerHTML = `<tr><td>GRAND TOTAL</td><td>${gt.pending_from}</td><td>${gt.resurfaced}</td><td>${gt.new_obs}</td><td>${gt.resolved}</td><td>${gt.pending_to}</td></tr>`;
+        // Module group tables
+        detailedResult.module_data.forEach(groupData => {
+            let groupHtml = `<div class="mt-5"><h5 class="fw-bold">${groupData.group_name} - Pending Vital Observations</h5><table class="table table-bordered mt-3"><thead class="table-light"><tr><th>MODULE</th><th>Pending (${fromDate})</th><th>Resurfaced</th><th>New</th><th>Resolved</th><th>Pending (${toDate})</th></tr></thead><tbody>`;
+            groupData.modules.forEach(module => {
+                groupHtml += `<tr><td>${module.module_name}</td><td>${module.pending_from}</td><td>${module.resurfaced}</td><td>${module.new}</td><td>${module.resolved}</td><td>${module.pending_to}</td></tr>`;
+            });
+            groupHtml += `</tbody></table><h6 class="fw-bold mt-3">AREAS OF CONCERN:</h6><ul class="list-group list-group-flush">`;
+            groupData.vital_observations.forEach(obs => {
+                const date = new Date(obs.timestamp).toLocaleDateString('en-IN');
+                groupHtml += `<li class="list-group-item"><strong>${obs.module_name}:</strong> ${obs.observation}<br><small class="text-muted">Date: ${date} | Status: ${obs.status}</small></li>`;
+            });
+            if (groupData.vital_observations.length === 0) groupHtml += '<li class="list-group-item text-muted">No Vital observations found.</li>';
+            groupHtml += '</ul></div>';
+            moduleTablesDiv.innerHTML += groupHtml;
+        });
+        // New sections
+        additionalSections.innerHTML = `
+            <div class="mt-5">
+                <h5 class="fw-bold">MODULES UNDER DEVELOPMENT</h5>
+                <ul class="list-group list-group-flush">
+                    <li class="list-group-item">Coster</li>
+                    <li class="list-group-item">E-Samagri</li>
+                    <li class="list-group-item">MHMS</li>
+                    <li class="list-group-item">YAMS</li>
+                </ul>
+            </div>
+            <div class="mt-5">
+                <h5 class="fw-bold">DETAILS OF VITAL OBSERVATIONS IDENTIFIED IN THIS PERIOD</h5>
+                <table class="table table-bordered mt-3">
+                    <thead class="table-light">
+                        <tr><th>IDENTIFIED</th><th>RESOLVED</th></tr>
+                    </thead>
+                    <tbody>
+                        <tr>
+                            <td><ul class="list-group list-group-flush mb-0">`;
+        vitalResult.identified.forEach(obs => {
+            const date = new Date(obs.date).toLocaleDateString('en-IN');
+            additionalSections.innerHTML += `<li class="list-group-item"><strong>${obs.module_name}:</strong> ${obs.observation} <small class="text-muted">(Date: ${date}, Status: ${obs.status})</small></li>`;
+        });
+        if (vitalResult.identified.length === 0) additionalSections.innerHTML += '<li class="list-group-item">None identified</li>';
+        additionalSections.innerHTML += `</ul></td><td><ul class="list-group list-group-flush mb-0">`;
+        vitalResult.resolved.forEach(obs => {
+            const date = new Date(obs.date).toLocaleDateString('en-IN');
+            additionalSections.innerHTML += `<li class="list-group-item"><strong>${obs.module_name}:</strong> ${obs.observation} <small class="text-muted">(Date: ${date})</small></li>`;
+        });
+        if (vitalResult.resolved.length === 0) additionalSections.innerHTML += '<li class="list-group-item">None resolved</li>';
+        additionalSections.innerHTML += '</ul></td></tr></tbody></table></div>';
+        document.getElementById('reportResult').classList.remove('d-none');
+    } catch (error) { alert('Generation failed: ' + error); }
+}
+
+let observationsQuery = null;
+
+function exportObservations() {
+  const fromDate = document.getElementById('obsFromDate').value;
+  const toDate = document.getElementById('obsToDate').value;
+
+  if (!fromDate || !toDate) {
+    alert('Please select both From and To dates');
+    return;
+  }
+
+  window.location = `/api/observations/export?format=csv&from_date=${fromDate}&to_date=${toDate}`;
+}
+
+async function loadObservations() {
+  const fromDate = document.getElementById('obsFromDate').value;
+  const toDate = document.getElementById('obsToDate').value;
+
+  if (!fromDate || !toDate) {
+    alert('Please select both From and To dates');
+    return;
+  }
+
+  observationsQuery = { from_date: fromDate, to_date: toDate, cursor: null, loaded: 0 };
+  document.getElementById('observationsTableBody').innerHTML = '';
+  await loadMoreObservations();
+}
+
+async function searchObservations() {
+  const q = document.getElementById('obsSearch').value.trim();
+  if (!q) return;
+  const params = new URLSearchParams({ q: q });
+  const fromDate = document.getElementById('obsFromDate').value;
+  const toDate = document.getElementById('obsToDate').value;
+  if (fromDate && toDate) {
+    params.set('from_date', fromDate);
+    params.set('to_date', toDate);
+  }
+
+  observationsQuery = null;  // stop "Load more" from appending range pages
+  const result = await (await fetch('/api/observations/search?' + params)).json();
+  if (!result.success) {
+    alert(result.error || 'Search failed');
+    return;
+  }
+
+  document.getElementById('observationsTableBody').innerHTML = result.data.map((row, index) => `
+    <tr class="${row.status === 'CLOSED' ? 'obs-closed' : row.status === 'RESURFACED' ? 'obs-resurfaced' : 'obs-' + row.criticality.toLowerCase()}">
+      <td>${index + 1}</td>
+      <td>${row.id}</td>
+      <td>${row.snippet}</td>
+      <td>${row.module_name}</td>
+      <td>${row.group_name}</td>
+      <td>${row.criticality}</td>
+    </tr>
+  `).join('');
+  document.getElementById('observationsSummary').textContent = `${result.count} best matches for "${q}"`;
+  document.getElementById('loadMoreObservations').classList.add('d-none');
+  document.getElementById('observationsTableContainer').classList.remove('d-none');
+}
+
+async function loadMoreObservations() {
+  const query = observationsQuery;
+  if (!query) return;
+
+  const response = await fetch('/api/observations/range', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      from_date: query.from_date,
+      to_date: query.to_date,
+      cursor: query.cursor,
+      fields: 'id,observation,group_name,module_name,criticality,status',
+      format: 'columnar'
+    })
+  });
+
+  const result = await response.json();
+
+  if (!result.success) {
+    alert('Failed to fetch observations');
+    return;
+  }
+  if (query !== observationsQuery) return;  // a newer search replaced this one
+
+  const tbody = document.getElementById('observationsTableBody');
+  const container = document.getElementById('observationsTableContainer');
+
+  // columnar page: one array per field; names and levels are codes into result.dictionaries
+  const { count, columns } = result.data;
+  const dict = result.dictionaries;
+  const html = [];
+
+  for (let i = 0; i < count; i++) {
+    const status = dict.status[columns.status[i]];
+    const criticality = dict.criticality[columns.criticality[i]];
+    let rowClass = '';
+
+    if (status === 'CLOSED') {
+      rowClass = 'obs-closed';
+    } else if (status === 'RESURFACED') {
+      rowClass = 'obs-resurfaced';
+    } else if (criticality === 'Vital') {
+      rowClass = 'obs-vital';
+    } else if (criticality === 'Essential') {
+      rowClass = 'obs-essential';
+    } else if (criticality === 'Desirable') {
+      rowClass = 'obs-desirable';
+    }
+
+    html.push(`
+      <tr class="${rowClass}">
+        <td>${query.loaded + i + 1}</td>
+        <td>${columns.id[i]}</td>
+        <td>${columns.observation[i]}</td>
+        <td>${dict.module_name[columns.module_name[i]]}</td>
+        <td>${dict.group_name[columns.group_name[i]]}</td>
+        <td>${criticality}</td>
+      </tr>
+    `);
+  }
+
+  tbody.insertAdjacentHTML('beforeend', html.join(''));
+  query.loaded += count;
+  query.cursor = result.next_cursor;
+
+  const total = response.headers.get('X-Total-Count');
+  document.getElementById('observationsSummary').textContent = `Showing ${query.loaded} of ${total} observations`;
+  document.getElementById('loadMoreObservations').classList.toggle('d-none', !query.cursor);
+  container.classList.remove('d-none');
+}
+
+let currentSortKey = null;
+let currentSortAsc = true;
+
+document.addEventListener('click', function (e) {
+  if (!e.target.classList.contains('sortable')) return;
+
+  const key = e.target.dataset.key;
+  const tbody = document.getElementById('observationsTableBody');
+  const rows = Array.from(tbody.querySelectorAll('tr'));
+
+  // Toggle sort direction
+  if (currentSortKey === key) {
+    currentSortAsc = !currentSortAsc;
+  } else {
+    currentSortKey = key;
+    currentSortAsc = true;
+  }
+
+  rows.sort((a, b) => {
+    let valA, valB;
+
+    if (key === 'module') {
+      valA = a.cells[3].innerText;
+      valB = b.cells[3].innerText;
+    } else if (key === 'group') {
+      valA = a.cells[4].innerText;
+      valB = b.cells[4].innerText;
+    } else if (key === 'criticality') {
+      valA = a.cells[5].innerText;
+      valB = b.cells[5].innerText;
+    }
+
+    if (valA < valB) return currentSortAsc ? -1 : 1;
+    if (valA > valB) return currentSortAsc ? 1 : -1;
+    return 0;
+  });
+
+  // Re-render rows and re-number Ser
+  tbody.innerHTML = '';
+  rows.forEach((row, index) => {
+    row.cells[0].innerText = index + 1;
+    tbody.appendChild(row);
+  });
+});
+
+function generatePDF() {
+    const fromDate = document.getElementById('reportFromDate').value;
+    const toDate = document.getElementById('reportToDate').value;
+    if (!fromDate || !toDate) { alert("Select both dates"); return; }
+    const button = document.getElementById('generatePdfButton');
+    button.disabled = true;
+    button.textContent = 'Generating...';
+    fetch('/api/reports/jobs', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ from_date: fromDate, to_date: toDate, appendix: document.getElementById('reportAppendix').checked }) })
+        .then(response => response.json())
+        .then(waitForReportJob)
+        .then(job => fetch(job.download_url))
+        .then(response => response.blob())
+        .then(blob => {
+            const url = window.URL.createObjectURL(blob);
+            const win = window.open(url);
+            win.onload = () => win.print();
+        })
+        .catch(error => alert('PDF failed: ' + error.message))
+        .finally(() => {
+            button.disabled = false;
+            button.textContent = 'Generate PDF';
+        });
+}
+async function waitForReportJob(job) {
+    while (true) {
+        if (!job.success) throw new Error(job.error);
+        if (job.status === 'done') return job;
+        if (job.status === 'failed') throw new Error(job.error);
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = await (await fetch(job.status_url)).json();
+    }
+}
+// Lifecycle JS (modals)
+async function loadModuleGroups() {
+    try {
+        const response = await fetch('/api/module-groups');
+        const data = await response.json();
+        if (data.success) {
+            window.moduleGroups = data.data;
+            populateGroupDropdowns();
+            setupGroupChangeListeners();
+        }
+    } catch (error) { console.error('Groups load error:', error); }
+}
+function populateGroupDropdowns() {
+    const groups = window.moduleGroups || [];
+    const observationModule = document.getElementById('observationModule');
+    observationModule.innerHTML = '<option value="">Select a module</option>';
+    groups.forEach(group => {
+        const optgroup = document.createElement('optgroup');
+        optgroup.label = group.group_name;
+        group.modules.forEach(module => optgroup.appendChild(new Option(module.module_name, module.module_id)));
+        observationModule.appendChild(optgroup);
+    });
+    document.getElementById('moduleGroupCount').textContent = groups.length;
+    document.getElementById('moduleCount').textContent = groups.reduce((n, group) => n + group.modules.length, 0);
+    const resurfaceGroup = document.getElementById('resurfaceGroup');
+    resurfaceGroup.innerHTML = '<option value="">Select Group</option>';
+    const closeGroup = document.getElementById('closeGroup');
+    closeGroup.innerHTML = '<option value="">Select Group</option>';
+    groups.forEach(group => {
+        const option = document.createElement('option');
+        option.value = group.group_id;
+        option.textContent = group.group_name;
+        resurfaceGroup.appendChild(option.cloneNode(true));
+        closeGroup.appendChild(option.cloneNode(true));
+    });
+}
+function setupGroupChangeListeners() {
+    document.getElementById('resurfaceGroup').addEventListener('change', function() {
+        const groupId = this.value;
+        const moduleSelect = document.getElementById('resurfaceModule');
+        moduleSelect.innerHTML = '<option value="">Select Module</option>';
+        if (!groupId) return;
+        const group = window.moduleGroups.find(g => g.group_id == groupId);
+        if (group && group.modules) group.modules.forEach(module => {
+            const option = document.createElement('option');
+            option.value = module.module_id;
+            option.textContent = module.module_name;
+            moduleSelect.appendChild(option);
+        });
+    });
+    document.getElementById('closeGroup').addEventListener('change', function() {
+        const groupId = this.value;
+        const moduleSelect = document.getElementById('closeModule');
+        moduleSelect.innerHTML = '<option value="">Select Module</option>';
+        if (!groupId) return;
+        const group = window.moduleGroups.find(g => g.group_id == groupId);
+        if (group && group.modules) group.modules.forEach(module => {
+            const option = document.createElement('option');
+            option.value = module.module_id;
+            option.textContent = module.module_name;
+            moduleSelect.appendChild(option);
+        });
+    });
+    document.getElementById('resurfaceModule').addEventListener('change', async function() {
+        const moduleId = this.value;
+        const listDiv = document.getElementById('resurfaceList');
+        if (!moduleId) { listDiv.innerHTML = ''; return; }
+        try {
+            const response = await fetch('/api/observations/closed', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ module_id: moduleId }) });
+            const result = await response.json();
+            if (result.success) {
+                const observations = result.data;
+                if (observations.length === 0) listDiv.innerHTML = '<p class="text-muted text-center">No CLOSED observations.</p>';
+                else {
+                    let html = '<div class="list-group">';
+                    observations.forEach(obs => {
+                        const date = new Date(obs.timestamp).toLocaleDateString('en-IN');
+                        html += `<div class="list-group-item"><input class="form-check-input me-2" type="checkbox" value="${obs.id}" id="resurface_${obs.id}"><label class="form-check-label w-100" for="resurface_${obs.id}"><div class="d-flex justify-content-between"><span>${obs.observation}</span><span class="badge bg-secondary">${date}</span></div><small class="text-muted d-block">Criticality: ${obs.criticality}</small></label></div>`;
+                    });
+                    html += '</div>';
+                    listDiv.innerHTML = html;
+                }
+            } else listDiv.innerHTML = '<p class="text-danger">Load failed.</p>';
+        } catch (error) { console.error('Load error:', error); listDiv.innerHTML = '<p class="text-danger">Error loading.</p>'; }
+    });
+    document.getElementById('closeModule').addEventListener('change', async function() {
+        const moduleId = this.value;
+        const listDiv = document.getElementById('closeList');
+        if (!moduleId) { listDiv.innerHTML = ''; return; }
+        try {
+            const response = await fetch('/api/observations/open-resurfaced', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ module_id: moduleId }) });
+            const result = await response.json();
+            if (result.success) {
+                const observations = result.data;
+                if (observations.length === 0) listDiv.innerHTML = '<p class="text-muted text-center">No OPEN or RESURFACED observations.</p>';
+                else {
+                    let html = '<div class="list-group">';
+                    observations.forEach(obs => {
+                        const date = new Date(obs.timestamp).toLocaleDateString('en-IN');
+                        const statusClass = obs.status === 'OPEN' ? 'bg-primary' : 'bg-warning';
+                        html += `<div class="list-group-item"><input class="form-check-input me-2" type="checkbox" value="${obs.id}" id="close_${obs.id}"><label class="form-check-label w-100" for="close_${obs.id}"><div class="d-flex justify-content-between"><span>${obs.observation}</span><div><span class="badge ${statusClass} me-2">${obs.status}</span><span class="badge bg-secondary">${date}</span></div></div><small class="text-muted d-block">Criticality: ${obs.criticality}</small></label></div>`;
+                    });
+                    html += '</div>';
+                    listDiv.innerHTML = html;
+                }
+            } else listDiv.innerHTML = '<p class="text-danger">Load failed.</p>';
+        } catch (error) { console.error('Load error:', error); listDiv.innerHTML = '<p class="text-danger">Error loading.</p>'; }
+    });
+}
+async function submitResurface() {
+    const checkboxes = document.querySelectorAll('#resurfaceList input[type="checkbox"]:checked');
+    const ids = Array.from(checkboxes).map(cb => cb.value);
+    if (ids.length === 0) { alert('Select at least one.'); return; }
+    try {
+        const response = await fetch('/api/observations/resurface', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ ids }) });
+        const result = await response.json();
+        if (result.success) { alert('Resurfaced!'); document.getElementById('resurfaceModule').dispatchEvent(new Event('change')); updateTotalCount(); } else alert('Failed: ' + (result.error || 'Unknown'));
+    } catch (error) { console.error('Error:', error); alert('Error.'); }
+}
+async function submitClose() {
+    const checkboxes = document.querySelectorAll('#closeList input[type="checkbox"]:checked');
+    const ids = Array.from(checkboxes).map(cb => cb.value);
+    if (ids.length === 0) { alert('Select at least one.'); return; }
+    try {
+        const response = await fetch('/api/observations/close', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ ids }) });
+        const result = await response.json();
+        if (result.success) { alert('Closed!'); document.getElementById('closeModule').dispatchEvent(new Event('change')); updateTotalCount(); } else alert('Failed: ' + (result.error || 'Unknown'));
+    } catch (error) { console.error('Error:', error); alert('Error.'); }
+}
+document.addEventListener('DOMContentLoaded', function() {
+    loadModuleGroups();
+    document.getElementById('resurfaceModal').addEventListener('show.bs.modal', () => {
+        document.getElementById('resurfaceGroup').value = ''; document.getElementById('resurfaceModule').innerHTML = '<option value="">Select Module</option>'; document.getElementById('resurfaceList').innerHTML = '';
+    });
+    document.getElementById('closeModal').addEventListener('show.bs.modal', () => {
+        document.getElementById('closeGroup').value = ''; document.getElementById('closeModule').innerHTML = '<option value="">Select Module</option>'; document.getElementById('closeList').innerHTML = '';
+    });
+});
+
+const trendCharts = {};
+
+async function loadCharts() {
+  const chartWindow = document.getElementById('chartWindow').value;
+  const [critRes, modRes] = await Promise.all([
+    fetch(`/api/charts/criticality-trend?window=${chartWindow}`),
+    fetch(`/api/charts/vital-module-trend?window=${chartWindow}`)
+  ]);
+  Object.values(trendCharts).forEach(chart => chart.destroy());
+
+  // Chart 1 - Criticality Trend
+  const critData = await critRes.json();
+
+  trendCharts.criticality = new Chart(document.getElementById('criticalityTrendChart'), {
+    type: 'line',
+    data: {
+      labels: critData.labels,
+      datasets: [
+        { label: 'Vital', data: critData.vital, borderColor: '#e51f1f' },
+        { label: 'Essential', data: critData.essential, borderColor: '#f2a134' },
+        { label: 'Desirable', data: critData.desirable, borderColor: '#f7e379' }
+      ]
+    },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false
+    }
+  });
+
+  // Chart 2 - Vital by Module
+  const modData = await modRes.json();
+
+  trendCharts.moduleVital = new Chart(document.getElementById('moduleVitalTrendChart'), {
+    type: 'line',
+    data: {
+      labels: modData.labels,
+      datasets: modData.datasets
+    },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false
+    }
+  });
+}
+
+document.addEventListener('DOMContentLoaded', loadCharts);
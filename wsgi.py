@@ -0,0 +1,21 @@
+"""
+Production entry point for the ERP Monitoring Platform.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app    # multi-process (Linux)
+       python wsgi.py                            # threaded waitress server (any OS)
+"""
+
+import os
+
+from app import PORT, SERVER_THREADS, create_app
+
+app = application = create_app()
+
+if __name__ == '__main__':
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("waitress is not installed: pip install waitress, or run gunicorn -c gunicorn.conf.py wsgi:app")
+    # Live streams stay connected, so keep waitress's 100 spare connections on top of them
+    serve(app, host=os.environ.get('ERP_HOST', '0.0.0.0'), port=PORT, threads=SERVER_THREADS,
+          connection_limit=SERVER_THREADS + 100)